@@ -11,10 +11,11 @@ from pydantic import BaseModel
 from app.broadcaster_db import list_broadcaster_matches, save_broadcaster_match
 from app.fetch_openseries_full import get_full_openseries_data
 from app.fetch_openseries import get_openseries_data
+from app.response_format import NegotiatedRoute, ResponseFormat, format_rows
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(route_class=NegotiatedRoute)
 
 BROADCASTER_PIN = os.environ.get("BROADCASTER_PIN", "1234")
 
@@ -41,9 +42,10 @@ def get_standings():
 
 
 @router.get("/api/openseries/rankings")
-def get_rankings():
+def get_rankings(format: ResponseFormat = "rows"):
     data = get_full_openseries_data()
-    return data.get("rankings", {"player_rankings": [], "team_rankings": []})
+    rankings = data.get("rankings", {"player_rankings": [], "team_rankings": []})
+    return {key: format_rows(rows, format) for key, rows in rankings.items()}
 
 
 @router.get("/api/openseries/overview")
@@ -53,8 +55,8 @@ def get_overview():
 
 
 @router.get("/api/openseries/champions")
-def get_champions():
-    return get_openseries_data()
+def get_champions(format: ResponseFormat = "rows"):
+    return format_rows(get_openseries_data(), format)
 
 
 # ---------------------------------------------------------------------------
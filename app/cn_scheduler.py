@@ -0,0 +1,161 @@
+"""Asyncio token-bucket scheduler for outbound CN (qq.com / gtimg) requests.
+
+Callers ask for a slot with a priority. Slots are handed out at most
+``rate_per_second`` at a time (plus ``burst``), interactive callers first and
+FIFO within a priority. The scheduler runs its own event loop on a daemon
+thread so both sync code (``acquire_blocking``) and coroutines on any other
+loop (``acquire``) share one bucket and one queue. Async callers only park a
+future while they wait; nobody holds a lock while the bucket refills.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future as ConcurrentFuture
+from concurrent.futures import TimeoutError as ConcurrentTimeoutError
+from typing import Any, Literal
+
+Priority = Literal["interactive", "background"]
+
+PRIORITY_ORDER: dict[str, int] = {"interactive": 0, "background": 1}
+
+
+class RequestScheduler:
+    def __init__(self, rate_per_second: float, burst: int = 1) -> None:
+        if rate_per_second <= 0:
+            raise ValueError("rate_per_second must be positive")
+        self._rate = rate_per_second
+        self._burst = max(1, burst)
+        self._tokens = float(self._burst)
+        self._refilled_at = time.monotonic()
+        self._seq = itertools.count()
+        # (priority rank, sequence, enqueued_at, priority name, future)
+        self._waiters: list[tuple[int, int, float, str, asyncio.Future[float]]] = []
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wake: asyncio.Event | None = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._granted = {name: 0 for name in PRIORITY_ORDER}
+        self._wait_total = {name: 0.0 for name in PRIORITY_ORDER}
+        self._wait_max = {name: 0.0 for name in PRIORITY_ORDER}
+        self._last_wait: float | None = None
+
+    # -- loop management ----------------------------------------------------
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is not None:
+            return self._loop
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def _run() -> None:
+                    asyncio.set_event_loop(loop)
+                    self._wake = asyncio.Event()
+                    loop.create_task(self._dispatch())
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                threading.Thread(target=_run, name="cn-request-scheduler", daemon=True).start()
+                ready.wait()
+                self._loop = loop
+        return self._loop
+
+    # -- scheduling (runs on the scheduler loop) ----------------------------
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(float(self._burst), self._tokens + (now - self._refilled_at) * self._rate)
+        self._refilled_at = now
+
+    def _pop_cancelled(self) -> None:
+        while self._waiters and self._waiters[0][4].done():
+            heapq.heappop(self._waiters)
+
+    async def _dispatch(self) -> None:
+        assert self._wake is not None
+        while True:
+            self._pop_cancelled()
+            if not self._waiters:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+                continue
+
+            self._tokens -= 1
+            _, _, enqueued_at, name, future = heapq.heappop(self._waiters)
+            waited = time.monotonic() - enqueued_at
+            with self._stats_lock:
+                self._granted[name] += 1
+                self._wait_total[name] += waited
+                self._wait_max[name] = max(self._wait_max[name], waited)
+                self._last_wait = waited
+            future.set_result(waited)
+
+    async def _enqueue(self, priority: Priority) -> float:
+        if priority not in PRIORITY_ORDER:
+            raise ValueError(f"Unsupported priority: {priority}")
+        assert self._wake is not None
+        future: asyncio.Future[float] = asyncio.get_running_loop().create_future()
+        entry = (PRIORITY_ORDER[priority], next(self._seq), time.monotonic(), priority, future)
+        heapq.heappush(self._waiters, entry)
+        self._wake.set()
+        return await future
+
+    def _submit(self, priority: Priority) -> ConcurrentFuture[float]:
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self._enqueue(priority), loop)
+
+    # -- public API ---------------------------------------------------------
+
+    async def acquire(self, priority: Priority = "background", timeout: float | None = None) -> float:
+        """Wait for a request slot without blocking a thread. Returns seconds waited.
+
+        Raises ``TimeoutError`` (and gives up the queue position) if no slot is
+        granted within ``timeout`` seconds.
+        """
+        future = asyncio.wrap_future(self._submit(priority))
+        try:
+            return await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"No CN request slot within {timeout}s") from None
+
+    def acquire_blocking(self, priority: Priority = "background", timeout: float | None = None) -> float:
+        """Sync counterpart of :meth:`acquire` for code running in worker threads."""
+        future = self._submit(priority)
+        try:
+            return future.result(timeout=timeout)
+        except ConcurrentTimeoutError:
+            future.cancel()
+            raise TimeoutError(f"No CN request slot within {timeout}s") from None
+
+    def stats(self) -> dict[str, Any]:
+        """Queue depth, wait times and grant counts, per priority."""
+        now = time.monotonic()
+        waiting = [entry for entry in list(self._waiters) if not entry[4].done()]
+        queue_depth = {name: 0 for name in PRIORITY_ORDER}
+        for entry in waiting:
+            queue_depth[entry[3]] += 1
+        oldest = min((entry[2] for entry in waiting), default=None)
+        with self._stats_lock:
+            return {
+                "rate_per_second": self._rate,
+                "burst": self._burst,
+                "queue_depth": queue_depth,
+                "oldest_wait_seconds": round(now - oldest, 3) if oldest is not None else None,
+                "last_wait_seconds": round(self._last_wait, 3) if self._last_wait is not None else None,
+                "granted": dict(self._granted),
+                "avg_wait_seconds": {
+                    name: round(self._wait_total[name] / count, 3) if count else None
+                    for name, count in self._granted.items()
+                },
+                "max_wait_seconds": {name: round(value, 3) for name, value in self._wait_max.items()},
+            }
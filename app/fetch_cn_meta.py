@@ -1,16 +1,23 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
+import logging
+import os
 import re
-import threading
 import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 from urllib.parse import urljoin
 
+import httpx
 import requests
 
+from app.cn_scheduler import Priority, RequestScheduler
 from app.scoring import priority_score
 
 CN_PAGE_URL = "https://lolm.qq.com/act/a20220818raider/index.html"
@@ -22,8 +29,17 @@ RATE_LIMIT_SECONDS = 10
 MAX_RETRIES = 3
 BACKOFF_SECONDS = [2, 4, 8]
 
+DISCOVERY_INTERVAL_SECONDS = int(os.environ.get("CN_DISCOVERY_INTERVAL_SECONDS", str(24 * 60 * 60)))
+SCRIPT_RECHECK_SECONDS = 7 * 24 * 60 * 60
+# Wait after 1, 2, 3... consecutive failed discovery runs; capped at the last
+# value and at the interval.
+DISCOVERY_RETRY_SECONDS = [60, 5 * 60, 30 * 60, 2 * 60 * 60]
+
 CACHE_PATH = Path(__file__).resolve().parent.parent / "data" / "cn_meta_cache.json"
 HERO_MAP_CACHE_PATH = Path(__file__).resolve().parent.parent / "data" / "cn_hero_map.json"
+ENDPOINTS_CACHE_PATH = Path(__file__).resolve().parent.parent / "data" / "cn_endpoints_cache.json"
+
+logger = logging.getLogger(__name__)
 
 ROLE_TO_POSITION = {
     "top": 2,
@@ -56,31 +72,99 @@ DISPLAY_NAME_OVERRIDES: dict[str, str] = {
 }
 
 
-_rate_limit_lock = threading.Lock()
-_last_qq_request_ts = 0.0
+_CN_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36",
+    "Referer": CN_PAGE_URL,
+}
+
+# Every qq.com / gtimg request goes through this bucket: one slot per
+# RATE_LIMIT_SECONDS, interactive callers served before background ones.
+cn_scheduler = RequestScheduler(rate_per_second=1 / RATE_LIMIT_SECONDS)
+
+_request_priority: ContextVar[Priority] = ContextVar("cn_request_priority", default="background")
+# Monotonic timestamp by which CN requests issued in this context must finish.
+_request_deadline: ContextVar[float | None] = ContextVar("cn_request_deadline", default=None)
+
+REQUEST_TIMEOUT_SECONDS = 20
+
+
+class DeadlineExceeded(RuntimeError):
+    """The request's upstream time budget ran out before the CN call could finish."""
 
 
 def _iso_now() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
-def _request_with_rate_limit(url: str) -> requests.Response:
-    global _last_qq_request_ts
+@contextmanager
+def request_priority(priority: Priority) -> Iterator[None]:
+    """Run CN requests issued inside the block with the given scheduler priority."""
+    token = _request_priority.set(priority)
+    try:
+        yield
+    finally:
+        _request_priority.reset(token)
+
+
+@contextmanager
+def request_deadline(seconds: float | None) -> Iterator[None]:
+    """Bound the time CN requests issued inside the block may take, in total.
+
+    Nested budgets never extend an outer one. ``None`` leaves the current
+    budget unchanged.
+    """
+    deadline = _request_deadline.get()
+    if seconds is not None:
+        candidate = time.monotonic() + seconds
+        deadline = candidate if deadline is None else min(deadline, candidate)
+    token = _request_deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _request_deadline.reset(token)
 
-    with _rate_limit_lock:
-        elapsed = time.monotonic() - _last_qq_request_ts
-        if elapsed < RATE_LIMIT_SECONDS:
-            time.sleep(RATE_LIMIT_SECONDS - elapsed)
 
-    headers = {
-        "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36",
-        "Referer": CN_PAGE_URL,
-    }
+def remaining_budget() -> float | None:
+    """Seconds left in the current request budget, or ``None`` when unbounded."""
+    deadline = _request_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def _budget_or_raise(url: str) -> float | None:
+    remaining = remaining_budget()
+    if remaining is not None and remaining <= 0:
+        raise DeadlineExceeded(f"Request budget exhausted before fetching {url}")
+    return remaining
 
+
+def _request_timeout(url: str) -> float:
+    remaining = _budget_or_raise(url)
+    return REQUEST_TIMEOUT_SECONDS if remaining is None else min(REQUEST_TIMEOUT_SECONDS, remaining)
+
+
+def _backoff_or_raise(url: str, attempt: int) -> float:
+    backoff = BACKOFF_SECONDS[min(attempt, len(BACKOFF_SECONDS) - 1)]
+    remaining = remaining_budget()
+    if remaining is not None and remaining <= backoff:
+        raise DeadlineExceeded(f"Request budget too short to retry {url}")
+    return backoff
+
+
+def _request_with_rate_limit(url: str) -> requests.Response:
+    priority = _request_priority.get()
     for attempt in range(MAX_RETRIES):
-        response = requests.get(url, headers=headers, timeout=20)
-        with _rate_limit_lock:
-            _last_qq_request_ts = time.monotonic()
+        try:
+            cn_scheduler.acquire_blocking(priority, timeout=_budget_or_raise(url))
+        except TimeoutError as exc:
+            raise DeadlineExceeded(f"Request budget exhausted waiting for a slot to fetch {url}") from exc
+        try:
+            response = requests.get(url, headers=_CN_HEADERS, timeout=_request_timeout(url))
+        except requests.Timeout as exc:
+            if remaining_budget() is not None:
+                raise DeadlineExceeded(f"Request budget exhausted fetching {url}") from exc
+            raise
 
         if response.status_code not in (429, 503):
             response.raise_for_status()
@@ -89,7 +173,34 @@ def _request_with_rate_limit(url: str) -> requests.Response:
         if attempt >= MAX_RETRIES - 1:
             response.raise_for_status()
 
-        time.sleep(BACKOFF_SECONDS[min(attempt, len(BACKOFF_SECONDS) - 1)])
+        time.sleep(_backoff_or_raise(url, attempt))
+
+    raise RuntimeError("Unexpected request loop termination")
+
+
+async def request_with_rate_limit_async(url: str, priority: Priority = "background") -> httpx.Response:
+    """Async variant of ``_request_with_rate_limit``: waits on the scheduler without holding a thread."""
+    async with httpx.AsyncClient(headers=_CN_HEADERS) as client:
+        for attempt in range(MAX_RETRIES):
+            try:
+                await cn_scheduler.acquire(priority, timeout=_budget_or_raise(url))
+            except TimeoutError as exc:
+                raise DeadlineExceeded(f"Request budget exhausted waiting for a slot to fetch {url}") from exc
+            try:
+                response = await client.get(url, timeout=_request_timeout(url))
+            except httpx.TimeoutException as exc:
+                if remaining_budget() is not None:
+                    raise DeadlineExceeded(f"Request budget exhausted fetching {url}") from exc
+                raise
+
+            if response.status_code not in (429, 503):
+                response.raise_for_status()
+                return response
+
+            if attempt >= MAX_RETRIES - 1:
+                response.raise_for_status()
+
+            await asyncio.sleep(_backoff_or_raise(url, attempt))
 
     raise RuntimeError("Unexpected request loop termination")
 
@@ -99,29 +210,107 @@ def _extract_script_urls(html_text: str) -> list[str]:
     return [urljoin(CN_PAGE_URL, src) for src in script_urls]
 
 
-def discover_endpoints() -> dict[str, Any]:
-    html = _request_with_rate_limit(CN_PAGE_URL).text
+def _content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _extract_api_urls(script_text: str) -> list[str]:
+    found = re.findall(r'getJSON\(["\']([^"\']+)["\']', script_text)
+    return sorted({urljoin(CN_PAGE_URL, url) for url in found})
+
+
+def read_discovered_endpoints() -> dict[str, Any] | None:
+    return _read_json_cache(ENDPOINTS_CACHE_PATH)
+
+
+async def discover_endpoints_async(priority: Priority = "background") -> dict[str, Any]:
+    """Discover CN API URLs, re-fetching only scripts that are new or due for a recheck.
+
+    Each script's API URLs are cached together with the SHA-256 of the script
+    body. A script whose URL was seen within ``SCRIPT_RECHECK_SECONDS`` is not
+    downloaded again; a rechecked script with an unchanged hash reuses its
+    cached API URLs.
+    """
+    previous = read_discovered_endpoints() or {}
+    previous_scripts: dict[str, dict[str, Any]] = previous.get("scripts") or {}
+
+    html = (await request_with_rate_limit_async(CN_PAGE_URL, priority=priority)).text
     script_urls = _extract_script_urls(html)
 
-    api_urls: set[str] = set()
+    scripts: dict[str, dict[str, Any]] = {}
+    fetched: list[str] = []
     for script_url in script_urls:
         if "lolm.qq.com/act/a20220818raider/js/" not in script_url:
             continue
+        cached = previous_scripts.get(script_url)
+        if cached and _cache_age_from_fetched_at(cached.get("checked_at")) <= SCRIPT_RECHECK_SECONDS:
+            scripts[script_url] = cached
+            continue
         try:
-            script_text = _request_with_rate_limit(script_url).text
-        except requests.RequestException:
+            script_text = (await request_with_rate_limit_async(script_url, priority=priority)).text
+        except httpx.HTTPError:
+            if cached:
+                scripts[script_url] = cached
             continue
 
-        for found in re.findall(r'getJSON\(["\']([^"\']+)["\']', script_text):
-            api_urls.add(urljoin(CN_PAGE_URL, found))
+        fetched.append(script_url)
+        script_hash = _content_hash(script_text)
+        if cached and cached.get("sha256") == script_hash:
+            api_urls_for_script = cached.get("api_urls") or []
+        else:
+            api_urls_for_script = _extract_api_urls(script_text)
+        scripts[script_url] = {"sha256": script_hash, "api_urls": api_urls_for_script, "checked_at": _iso_now()}
 
+    api_urls = {url for entry in scripts.values() for url in entry.get("api_urls") or []}
     api_urls.add(HERO_STATS_URL)
-    return {
+    result = {
+        "discovered_at": _iso_now(),
         "page_url": CN_PAGE_URL,
+        "page_sha256": _content_hash(html),
         "hero_map_url": HERO_MAP_URL,
         "script_urls": script_urls,
+        "scripts": scripts,
+        "fetched_scripts": fetched,
         "api_urls": sorted(api_urls),
     }
+    ENDPOINTS_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with ENDPOINTS_CACHE_PATH.open("w", encoding="utf-8") as file:
+        json.dump(result, file, ensure_ascii=False, indent=2)
+    return result
+
+
+def discover_endpoints() -> dict[str, Any]:
+    return asyncio.run(discover_endpoints_async())
+
+
+async def run_discovery_job(interval_seconds: float = DISCOVERY_INTERVAL_SECONDS) -> None:
+    """Refresh the endpoint discovery cache every ``interval_seconds``, at background priority.
+
+    A failed run is retried after ``DISCOVERY_RETRY_SECONDS`` instead of a
+    full interval, so one network error does not hide new endpoints for a day.
+    """
+    failures = 0
+    while True:
+        cached = read_discovered_endpoints()
+        age = _cache_age_from_fetched_at(cached.get("discovered_at")) if cached else None
+        if age is not None and age < interval_seconds:
+            await asyncio.sleep(interval_seconds - age)
+            continue
+        try:
+            result = await discover_endpoints_async(priority="background")
+        except Exception as exc:
+            retry = min(DISCOVERY_RETRY_SECONDS[min(failures, len(DISCOVERY_RETRY_SECONDS) - 1)], interval_seconds)
+            failures += 1
+            logger.warning("CN endpoint discovery failed, retrying in %ds: %s", retry, exc)
+            await asyncio.sleep(retry)
+            continue
+        failures = 0
+        logger.info(
+            "CN endpoint discovery found %d API urls (%d scripts re-fetched)",
+            len(result["api_urls"]),
+            len(result["fetched_scripts"]),
+        )
+        await asyncio.sleep(interval_seconds)
 
 
 def _extract_hero_map(js_text: str) -> dict[str, dict[str, str]]:
@@ -282,28 +471,62 @@ def _cache_age_from_fetched_at(fetched_at: str | None) -> int:
     return int((datetime.now(timezone.utc) - parsed).total_seconds())
 
 
+def _fresh_cached_hero_map() -> dict[str, dict[str, str]] | None:
+    cache_payload = _read_json_cache(HERO_MAP_CACHE_PATH)
+    if cache_payload and _cache_age_from_fetched_at(cache_payload.get("fetched_at")) <= HERO_MAP_CACHE_TTL_SECONDS:
+        return (cache_payload.get("items") or {})
+    return None
+
+
+def _stale_cached_hero_map() -> dict[str, dict[str, str]] | None:
+    stale = _read_json_cache(HERO_MAP_CACHE_PATH)
+    if stale and stale.get("items"):
+        return stale["items"]
+    return None
+
+
+def _store_hero_map(js_text: str) -> dict[str, dict[str, str]]:
+    hero_map = _extract_hero_map(js_text)
+    payload = {
+        "fetched_at": _iso_now(),
+        "source_url": HERO_MAP_URL,
+        "items": hero_map,
+    }
+    HERO_MAP_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with HERO_MAP_CACHE_PATH.open("w", encoding="utf-8") as file:
+        json.dump(payload, file, ensure_ascii=False, indent=2)
+    return hero_map
+
+
 def fetch_hero_map_from_gtimg(force_refresh: bool = False) -> dict[str, dict[str, str]]:
     if not force_refresh:
-        cache_payload = _read_json_cache(HERO_MAP_CACHE_PATH)
-        if cache_payload and _cache_age_from_fetched_at(cache_payload.get("fetched_at")) <= HERO_MAP_CACHE_TTL_SECONDS:
-            return (cache_payload.get("items") or {})
+        cached = _fresh_cached_hero_map()
+        if cached is not None:
+            return cached
 
     try:
-        js_text = _request_with_rate_limit(HERO_MAP_URL).text
-        hero_map = _extract_hero_map(js_text)
-        payload = {
-            "fetched_at": _iso_now(),
-            "source_url": HERO_MAP_URL,
-            "items": hero_map,
-        }
-        HERO_MAP_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
-        with HERO_MAP_CACHE_PATH.open("w", encoding="utf-8") as file:
-            json.dump(payload, file, ensure_ascii=False, indent=2)
-        return hero_map
+        return _store_hero_map(_request_with_rate_limit(HERO_MAP_URL).text)
     except Exception:
-        stale = _read_json_cache(HERO_MAP_CACHE_PATH)
-        if stale and stale.get("items"):
-            return stale["items"]
+        stale = _stale_cached_hero_map()
+        if stale:
+            return stale
+        raise
+
+
+async def fetch_hero_map_from_gtimg_async(force_refresh: bool = False) -> dict[str, dict[str, str]]:
+    """Async ``fetch_hero_map_from_gtimg``, at the priority set by ``request_priority``."""
+    if not force_refresh:
+        cached = _fresh_cached_hero_map()
+        if cached is not None:
+            return cached
+
+    try:
+        response = await request_with_rate_limit_async(HERO_MAP_URL, priority=_request_priority.get())
+        return _store_hero_map(response.text)
+    except Exception:
+        stale = _stale_cached_hero_map()
+        if stale:
+            return stale
         raise
 
 
@@ -446,14 +669,26 @@ def _tier_candidate_nodes(payload: dict[str, Any], tier: str) -> list[Any]:
     return [data]
 
 
+def _check_cn_payload(payload: dict[str, Any]) -> dict[str, Any]:
+    if payload.get("result") != 0:
+        raise RuntimeError("CN API returned non-zero result")
+    return payload
+
+
 def fetch_cn_payload(tier: str) -> dict[str, Any]:
     if tier not in TIER_TO_CN_TIER:
         raise ValueError(f"Unsupported tier: {tier}")
 
-    payload = _request_with_rate_limit(HERO_STATS_URL).json()
-    if payload.get("result") != 0:
-        raise RuntimeError("CN API returned non-zero result")
-    return payload
+    return _check_cn_payload(_request_with_rate_limit(HERO_STATS_URL).json())
+
+
+async def fetch_cn_payload_async(tier: str) -> dict[str, Any]:
+    """Async ``fetch_cn_payload``, at the priority set by ``request_priority``."""
+    if tier not in TIER_TO_CN_TIER:
+        raise ValueError(f"Unsupported tier: {tier}")
+
+    response = await request_with_rate_limit_async(HERO_STATS_URL, priority=_request_priority.get())
+    return _check_cn_payload(response.json())
 
 
 def build_cn_rows_from_payload(payload: dict[str, Any], role: str, tier: str, hero_map: dict[str, dict[str, str]]) -> list[dict[str, Any]]:
@@ -505,11 +740,32 @@ def _split_lanes(lane_value: str | None) -> list[str]:
 
 
 def summarize_cn_positions(tier: str) -> dict[str, Any]:
+    """Per-position summary of the current CN snapshot for ``tier``.
+
+    Summaries are computed once when a snapshot is ingested (``update_cache``)
+    and stored next to it, so this is normally a lookup. Older caches without
+    a stored summary get one computed and saved on first use, and an expired
+    cache is refreshed and saved like a ``/meta`` fetch, so only the first
+    poll after expiry goes to the network.
+    """
+    stored = _stored_position_summary(tier)
+    if stored is not None:
+        return stored
+
+    hero_map = fetch_hero_map_from_gtimg()
     payload = get_cached_raw_payload(tier=tier)
     if payload is None:
         payload = fetch_cn_payload(tier=tier)
-    hero_map = fetch_hero_map_from_gtimg()
+        update_cache(tier=tier, source_url=CN_PAGE_URL, raw_payload=payload, hero_map=hero_map)
+        stored = _stored_position_summary(tier)
+        if stored is not None:
+            return stored
+    summary = build_position_summary(payload=payload, tier=tier, hero_map=hero_map)
+    _store_position_summary(tier, summary)
+    return summary
 
+
+def build_position_summary(payload: dict[str, Any], tier: str, hero_map: dict[str, dict[str, str]]) -> dict[str, Any]:
     grouped_entries: dict[str, list[dict[str, Any]]] = {}
 
     all_entries: list[dict[str, Any]] = []
@@ -593,14 +849,15 @@ def is_cache_fresh(cache_payload: dict[str, Any]) -> bool:
     return cache_age_seconds(cache_payload) <= CACHE_TTL_SECONDS
 
 
-def get_cached_meta(role: str, tier: str) -> list[dict[str, Any]] | None:
+def get_cached_meta(role: str, tier: str, hero_map: dict[str, dict[str, str]] | None = None) -> list[dict[str, Any]] | None:
     cache_payload = read_cache()
     if not cache_payload or not is_cache_fresh(cache_payload):
         return None
 
     raw_payload = (cache_payload.get("raw_payload_by_tier") or {}).get(tier)
     if raw_payload:
-        hero_map = fetch_hero_map_from_gtimg()
+        if hero_map is None:
+            hero_map = fetch_hero_map_from_gtimg()
         try:
             return build_cn_rows_from_payload(payload=raw_payload, role=role, tier=tier, hero_map=hero_map)
         except RuntimeError:
@@ -612,7 +869,7 @@ def get_cached_meta(role: str, tier: str) -> list[dict[str, Any]] | None:
     return rows or None
 
 
-def get_stale_cached_meta(role: str, tier: str) -> list[dict[str, Any]] | None:
+def get_stale_cached_meta(role: str, tier: str, hero_map: dict[str, dict[str, str]] | None = None) -> list[dict[str, Any]] | None:
     """Return cached meta even if stale (beyond TTL), for fallback use."""
     cache_payload = read_cache()
     if not cache_payload:
@@ -620,7 +877,8 @@ def get_stale_cached_meta(role: str, tier: str) -> list[dict[str, Any]] | None:
 
     raw_payload = (cache_payload.get("raw_payload_by_tier") or {}).get(tier)
     if raw_payload:
-        hero_map = fetch_hero_map_from_gtimg()
+        if hero_map is None:
+            hero_map = fetch_hero_map_from_gtimg()
         try:
             return build_cn_rows_from_payload(payload=raw_payload, role=role, tier=tier, hero_map=hero_map)
         except RuntimeError:
@@ -638,12 +896,86 @@ def get_cached_raw_payload(tier: str) -> dict[str, Any] | None:
     return (cache_payload.get("raw_payload_by_tier") or {}).get(tier)
 
 
-def update_cache(tier: str, source_url: str, raw_payload: dict[str, Any]) -> None:
+def update_cache(tier: str, source_url: str, raw_payload: dict[str, Any], hero_map: dict[str, dict[str, str]]) -> None:
+    """Store ``raw_payload`` for ``tier`` with its position summary, built from the caller's ``hero_map``."""
     payload = read_cache() or {}
     payload["fetched_at"] = _iso_now()
     payload["source_url"] = source_url
     payload.setdefault("raw_payload_by_tier", {})[tier] = raw_payload
 
+    summaries = payload.setdefault("position_summary_by_tier", {})
+    if hero_map:
+        summaries[tier] = build_position_summary(payload=raw_payload, tier=tier, hero_map=hero_map)
+    else:
+        # Without a hero map the lane split would be all "unknown"; compute it lazily instead.
+        summaries.pop(tier, None)
+
+    _write_cache(payload)
+
+
+def _write_cache(payload: dict[str, Any]) -> None:
     CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
     with CACHE_PATH.open("w", encoding="utf-8") as file:
         json.dump(payload, file, ensure_ascii=False, indent=2)
+
+
+async def refresh_expired_caches(tier: str) -> None:
+    """Renew the hero map and the CN snapshot for ``tier`` if they expired.
+
+    Runs at background priority with no deadline: ``/meta`` schedules it as
+    a task when its own budget runs out, so the caller still gets the
+    fallback right away and the next one finds fresh caches.
+    """
+    token = _request_deadline.set(None)
+    try:
+        with request_priority("background"):
+            hero_map = await fetch_hero_map_from_gtimg_async()
+            if await asyncio.to_thread(get_cached_raw_payload, tier=tier) is not None:
+                return
+            payload = await fetch_cn_payload_async(tier=tier)
+        await asyncio.to_thread(update_cache, tier=tier, source_url=CN_PAGE_URL, raw_payload=payload, hero_map=hero_map)
+        logger.info("Background refresh renewed the CN cache for tier=%s", tier)
+    except Exception as exc:
+        logger.warning("Background CN refresh for tier=%s failed: %s", tier, exc)
+    finally:
+        _request_deadline.reset(token)
+
+
+# tier -> ((cache path, mtime), fetched_at, summary); avoids re-parsing the
+# whole cache file on every poll of the positions endpoint.
+_position_summary_memo: dict[str, tuple[tuple[str, int], str | None, dict[str, Any]]] = {}
+
+
+def _cache_file_version() -> tuple[str, int] | None:
+    try:
+        return str(CACHE_PATH), CACHE_PATH.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def _stored_position_summary(tier: str) -> dict[str, Any] | None:
+    version = _cache_file_version()
+    if version is None:
+        return None
+
+    memo = _position_summary_memo.get(tier)
+    if memo is not None and memo[0] == version:
+        _, fetched_at, summary = memo
+        return summary if _cache_age_from_fetched_at(fetched_at) <= CACHE_TTL_SECONDS else None
+
+    cache_payload = read_cache()
+    if not cache_payload:
+        return None
+    summary = (cache_payload.get("position_summary_by_tier") or {}).get(tier)
+    if summary is None:
+        return None
+    _position_summary_memo[tier] = (version, cache_payload.get("fetched_at"), summary)
+    return summary if is_cache_fresh(cache_payload) else None
+
+
+def _store_position_summary(tier: str, summary: dict[str, Any]) -> None:
+    cache_payload = read_cache()
+    if not cache_payload:
+        return
+    cache_payload.setdefault("position_summary_by_tier", {})[tier] = summary
+    _write_cache(cache_payload)
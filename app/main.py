@@ -1,39 +1,56 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
+import os
+from contextlib import contextmanager
 from math import sqrt
 from pathlib import Path
-from typing import Any, Literal
+from typing import Any, Iterator, Literal
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 from starlette.middleware.base import BaseHTTPMiddleware
 
 from app.fetch_cn_meta import (
     CACHE_TTL_SECONDS,
     CN_PAGE_URL,
+    DISCOVERY_INTERVAL_SECONDS,
+    DeadlineExceeded,
     build_cn_rows_from_payload,
     cache_age_seconds,
-    fetch_cn_payload,
-    fetch_hero_map_from_gtimg,
+    fetch_cn_payload_async,
+    fetch_hero_map_from_gtimg_async,
     get_cached_meta,
     get_stale_cached_meta,
     hero_map_cache_age_seconds,
     is_cache_fresh,
+    cn_scheduler,
     read_cache,
+    read_discovered_endpoints,
+    refresh_expired_caches,
+    remaining_budget,
+    request_deadline,
+    request_priority,
+    run_discovery_job,
     summarize_cn_positions,
     update_cache,
 )
+from app.response_format import NegotiatedRoute, ResponseFormat, format_rows
 from app.scoring import EPSILON, power_score, priority_score, zscore
 from app.broadcaster_db import init_broadcaster_db
 from app.broadcaster_routes import router as broadcaster_router
-from app.scrim_db import init_db
+from app.scrim_db import close_db, init_db
+from app.scrim_routes import analytics_router as scrim_analytics_router
 from app.scrim_routes import router as scrim_router
 
 app = FastAPI(title="ScrimVault")
+app.router.route_class = NegotiatedRoute
 app.include_router(scrim_router)
+app.include_router(scrim_analytics_router)
 app.include_router(broadcaster_router)
 logger = logging.getLogger(__name__)
 
@@ -41,6 +58,13 @@ DATA_PATH = Path(__file__).resolve().parent.parent / "data" / "sample_cn_meta.js
 STATIC_DIR = Path(__file__).resolve().parent / "static"
 STATIC_INDEX_PATH = STATIC_DIR / "index.html"
 
+# Time budget for upstream CN calls made by one /meta request. When it runs
+# out the fetch stops and the stale-cache/sample fallback answers instead.
+META_DEADLINE_MS = int(os.environ.get("META_DEADLINE_MS", "800"))
+# refresh=force is an explicit request to wait for fresh data.
+META_FORCE_REFRESH_DEADLINE_MS = int(os.environ.get("META_FORCE_REFRESH_DEADLINE_MS", "20000"))
+MAX_META_DEADLINE_MS = 25000
+
 class NoCacheStaticMiddleware(BaseHTTPMiddleware):
     """Prevent browser from caching static assets so code changes appear immediately."""
 
@@ -61,6 +85,25 @@ def startup() -> None:
     init_db()
     init_broadcaster_db()
 
+
+@app.on_event("startup")
+async def start_background_jobs() -> None:
+    if DISCOVERY_INTERVAL_SECONDS > 0:
+        app.state.discovery_task = asyncio.create_task(run_discovery_job(DISCOVERY_INTERVAL_SECONDS))
+
+
+@app.on_event("shutdown")
+async def stop_background_jobs() -> None:
+    task = getattr(app.state, "discovery_task", None)
+    if task is not None:
+        task.cancel()
+
+
+@app.on_event("shutdown")
+def shutdown_db() -> None:
+    close_db()
+
+
 Role = Literal["top", "jungle", "mid", "adc", "support"]
 Tier = Literal["diamond_plus", "master", "monarch", "rift_peak"]
 Source = Literal["auto", "sample", "cn"]
@@ -151,28 +194,77 @@ def _with_champion_lang(rows: list[dict], name_lang: NameLang) -> list[dict]:
     return localized
 
 
-def _force_refresh_cn(role: Role, tier: Tier) -> tuple[list[dict] | None, str | None]:
+def _meta_items(rows: list[dict], name_lang: NameLang, format: ResponseFormat) -> list[dict] | dict[str, list]:
+    return format_rows(_with_champion_lang(rows, name_lang=name_lang), format)
+
+
+def _meta_deadline_seconds(refresh: str | None, deadline_ms: int | None) -> float:
+    if deadline_ms is None:
+        deadline_ms = META_FORCE_REFRESH_DEADLINE_MS if refresh == "force" else META_DEADLINE_MS
+    return min(deadline_ms, MAX_META_DEADLINE_MS) / 1000
+
+
+# CN fetches await the request scheduler on the event loop; only file and
+# cache work is handed to the threadpool, so a request queued behind the
+# rate limit does not hold a worker thread.
+
+async def _force_refresh_cn(role: Role, tier: Tier) -> tuple[list[dict] | None, str | None]:
     """Bypass cache and fetch fresh data from CN API."""
     logger.info("Force-refreshing CN data for tier=%s role=%s", tier, role)
-    payload = fetch_cn_payload(tier=tier)
-    hero_map = fetch_hero_map_from_gtimg(force_refresh=True)
+    with request_priority("interactive"):
+        payload = await fetch_cn_payload_async(tier=tier)
+        hero_map = await fetch_hero_map_from_gtimg_async(force_refresh=True)
     rows = build_cn_rows_from_payload(payload=payload, role=role, tier=tier, hero_map=hero_map)
-    update_cache(tier=tier, source_url=CN_PAGE_URL, raw_payload=payload)
+    await run_in_threadpool(update_cache, tier=tier, source_url=CN_PAGE_URL, raw_payload=payload, hero_map=hero_map)
     return rows, "cn_fresh"
 
 
-def _load_cn_with_cache(role: Role, tier: Tier) -> tuple[list[dict] | None, str | None]:
-    cached_rows = get_cached_meta(role=role, tier=tier)
-    if cached_rows:
-        return cached_rows, "cn_cache"
+# tier -> background refresh queued by a /meta request that ran out of budget;
+# concurrent timeouts share one.
+_background_refreshes: dict[str, asyncio.Task] = {}
+
 
-    payload = fetch_cn_payload(tier=tier)
-    hero_map = fetch_hero_map_from_gtimg()
+def _schedule_background_refresh(tier: Tier) -> None:
+    task = _background_refreshes.get(tier)
+    if task is None or task.done():
+        _background_refreshes[tier] = asyncio.create_task(refresh_expired_caches(tier))
+
+
+@contextmanager
+def _refresh_in_background_when_budget_runs_out(tier: Tier) -> Iterator[None]:
+    """Queue ``refresh_expired_caches`` when the CN calls in the block run out of budget.
+
+    Without it an expired hero map or snapshot would be fetched (and time out)
+    again on every call, and only ``refresh=force`` would renew it.
+    """
+    try:
+        yield
+    except DeadlineExceeded:
+        _schedule_background_refresh(tier)
+        raise
+    remaining = remaining_budget()
+    # The hero map swallows its timeout and falls back to the stale copy.
+    if remaining is not None and remaining <= 0:
+        _schedule_background_refresh(tier)
+
+
+async def _load_cn_with_cache(role: Role, tier: Tier) -> tuple[list[dict] | None, str | None]:
+    with request_priority("interactive"), _refresh_in_background_when_budget_runs_out(tier):
+        hero_map = await fetch_hero_map_from_gtimg_async()
+        cached_rows = await run_in_threadpool(get_cached_meta, role=role, tier=tier, hero_map=hero_map)
+        if cached_rows:
+            return cached_rows, "cn_cache"
+        payload = await fetch_cn_payload_async(tier=tier)
     rows = build_cn_rows_from_payload(payload=payload, role=role, tier=tier, hero_map=hero_map)
-    update_cache(tier=tier, source_url=CN_PAGE_URL, raw_payload=payload)
+    await run_in_threadpool(update_cache, tier=tier, source_url=CN_PAGE_URL, raw_payload=payload, hero_map=hero_map)
     return rows, "cn_cache"
 
 
+async def _load_stale_cn(role: Role, tier: Tier) -> list[dict] | None:
+    hero_map = await fetch_hero_map_from_gtimg_async()
+    return await run_in_threadpool(get_stale_cached_meta, role=role, tier=tier, hero_map=hero_map)
+
+
 def _cached_cn_last_fetch() -> str | None:
     cache_payload = read_cache()
     if not cache_payload:
@@ -208,7 +300,7 @@ def health() -> dict[str, str]:
 
 
 @app.get("/meta")
-def meta(
+async def meta(
     role: Role,
     tier: Tier,
     source: Source = "auto",
@@ -217,79 +309,86 @@ def meta(
     sort: SortField | None = None,
     dir: SortDir = "desc",
     refresh: str | None = None,
+    format: ResponseFormat = "rows",
+    deadline_ms: int | None = Query(default=None, ge=50, le=MAX_META_DEADLINE_MS),
 ) -> dict[str, Any]:
     sort_field: SortField = sort or ("draft_score" if view == "draft" else "power_score")
 
     if source == "sample":
         rows = _filter_and_score(_load_meta_data(), role=role, tier=tier, sort=sort_field, direction=dir)
-        return {"items": _with_champion_lang(rows, name_lang=name_lang), "source": "sample", "last_fetch": None}
-
-    if source == "cn":
+        return {"items": _meta_items(rows, name_lang=name_lang, format=format), "source": "sample", "last_fetch": None}
+
+    with request_deadline(_meta_deadline_seconds(refresh, deadline_ms)):
+        if source == "cn":
+            try:
+                if refresh == "force":
+                    cn_rows, used_source = await _force_refresh_cn(role=role, tier=tier)
+                else:
+                    cn_rows, used_source = await _load_cn_with_cache(role=role, tier=tier)
+                if not cn_rows:
+                    raise RuntimeError("CN source returned empty data")
+                selected_position = {"top": 2, "jungle": 5, "mid": 1, "adc": 3, "support": 4}[role]
+                preview = [
+                    {"hero_id": row.get("hero_id"), "position": row.get("position")}
+                    for row in cn_rows[:3]
+                ]
+                logger.info(
+                    "CN meta debug role=%s selected_position=%s first_entries=%s",
+                    role,
+                    selected_position,
+                    preview,
+                )
+                rows = _filter_and_score(cn_rows, role=role, tier=tier, sort=sort_field, direction=dir)
+                return {
+                    "items": _meta_items(rows, name_lang=name_lang, format=format),
+                    "source": used_source or "cn_cache",
+                    "last_fetch": await run_in_threadpool(_cached_cn_last_fetch),
+                }
+            except Exception as exc:
+                raise HTTPException(status_code=502, detail=f"CN source unavailable: {exc}") from exc
+
+        warning = ""
         try:
             if refresh == "force":
-                cn_rows, used_source = _force_refresh_cn(role=role, tier=tier)
+                cn_rows, used_source = await _force_refresh_cn(role=role, tier=tier)
             else:
-                cn_rows, used_source = _load_cn_with_cache(role=role, tier=tier)
-            if not cn_rows:
-                raise RuntimeError("CN source returned empty data")
-            selected_position = {"top": 2, "jungle": 5, "mid": 1, "adc": 3, "support": 4}[role]
-            preview = [
-                {"hero_id": row.get("hero_id"), "position": row.get("position")}
-                for row in cn_rows[:3]
-            ]
-            logger.info(
-                "CN meta debug role=%s selected_position=%s first_entries=%s",
-                role,
-                selected_position,
-                preview,
-            )
-            rows = _filter_and_score(cn_rows, role=role, tier=tier, sort=sort_field, direction=dir)
-            return {
-                "items": _with_champion_lang(rows, name_lang=name_lang),
-                "source": used_source or "cn_cache",
-                "last_fetch": _cached_cn_last_fetch(),
-            }
+                cn_rows, used_source = await _load_cn_with_cache(role=role, tier=tier)
+            if cn_rows:
+                selected_position = {"top": 2, "jungle": 5, "mid": 1, "adc": 3, "support": 4}[role]
+                preview = [
+                    {"hero_id": row.get("hero_id"), "position": row.get("position")}
+                    for row in cn_rows[:3]
+                ]
+                logger.info(
+                    "CN meta debug role=%s selected_position=%s first_entries=%s",
+                    role,
+                    selected_position,
+                    preview,
+                )
+                rows = _filter_and_score(cn_rows, role=role, tier=tier, sort=sort_field, direction=dir)
+                return {
+                    "items": _meta_items(rows, name_lang=name_lang, format=format),
+                    "source": used_source or "cn_cache",
+                    "last_fetch": await run_in_threadpool(_cached_cn_last_fetch),
+                }
         except Exception as exc:
-            raise HTTPException(status_code=502, detail=f"CN source unavailable: {exc}") from exc
-
-    warning = ""
-    try:
-        if refresh == "force":
-            cn_rows, used_source = _force_refresh_cn(role=role, tier=tier)
-        else:
-            cn_rows, used_source = _load_cn_with_cache(role=role, tier=tier)
-        if cn_rows:
-            selected_position = {"top": 2, "jungle": 5, "mid": 1, "adc": 3, "support": 4}[role]
-            preview = [
-                {"hero_id": row.get("hero_id"), "position": row.get("position")}
-                for row in cn_rows[:3]
-            ]
-            logger.info(
-                "CN meta debug role=%s selected_position=%s first_entries=%s",
-                role,
-                selected_position,
-                preview,
-            )
-            rows = _filter_and_score(cn_rows, role=role, tier=tier, sort=sort_field, direction=dir)
-            return {
-                "items": _with_champion_lang(rows, name_lang=name_lang),
-                "source": used_source or "cn_cache",
-                "last_fetch": _cached_cn_last_fetch(),
-            }
-    except Exception as exc:
-        logger.warning("CN source failed in auto mode, trying stale cache: %s", exc)
-        stale_rows = get_stale_cached_meta(role=role, tier=tier)
-        if stale_rows:
-            rows = _filter_and_score(stale_rows, role=role, tier=tier, sort=sort_field, direction=dir)
-            return {
-                "items": _with_champion_lang(rows, name_lang=name_lang),
-                "source": "cn_stale_cache",
-                "last_fetch": _cached_cn_last_fetch(),
-            }
-        warning = f"Dados CN indisponíveis ({exc}). Usando dados sample como fallback."
+            logger.warning("CN source failed in auto mode, trying stale cache: %s", exc)
+            try:
+                stale_rows = await _load_stale_cn(role=role, tier=tier)
+            except Exception as stale_exc:
+                logger.warning("Stale CN cache unavailable: %s", stale_exc)
+                stale_rows = None
+            if stale_rows:
+                rows = _filter_and_score(stale_rows, role=role, tier=tier, sort=sort_field, direction=dir)
+                return {
+                    "items": _meta_items(rows, name_lang=name_lang, format=format),
+                    "source": "cn_stale_cache",
+                    "last_fetch": await run_in_threadpool(_cached_cn_last_fetch),
+                }
+            warning = f"Dados CN indisponíveis ({exc}). Usando dados sample como fallback."
 
     rows = _filter_and_score(_load_meta_data(), role=role, tier=tier, sort=sort_field, direction=dir)
-    result: dict[str, Any] = {"items": _with_champion_lang(rows, name_lang=name_lang), "source": "sample", "last_fetch": None}
+    result: dict[str, Any] = {"items": _meta_items(rows, name_lang=name_lang, format=format), "source": "sample", "last_fetch": None}
     if warning:
         result["warning"] = warning
     return result
@@ -328,7 +427,24 @@ def meta_source() -> dict[str, str | int | bool | None]:
 @app.get("/meta/debug/cn_positions")
 def meta_debug_cn_positions(tier: Tier) -> dict[str, dict | str]:
     try:
-        summary = summarize_cn_positions(tier=tier)
+        # A debug poll should not take rate-limit slots ahead of /meta.
+        with request_priority("background"):
+            summary = summarize_cn_positions(tier=tier)
         return summary
     except Exception as exc:
         raise HTTPException(status_code=502, detail=f"CN source unavailable: {exc}") from exc
+
+
+@app.get("/meta/debug/cn_scheduler")
+def meta_debug_cn_scheduler() -> dict[str, Any]:
+    """Queue depth and wait times of the outbound CN request scheduler."""
+    return cn_scheduler.stats()
+
+
+@app.get("/meta/debug/cn_endpoints")
+def meta_debug_cn_endpoints() -> dict[str, Any]:
+    """Last result of the background CN endpoint discovery job (no network access)."""
+    discovered = read_discovered_endpoints()
+    if not discovered:
+        raise HTTPException(status_code=404, detail="CN endpoint discovery has not run yet")
+    return discovered
@@ -0,0 +1,154 @@
+"""Mergeable quantile sketches (DDSketch) for per-champion stat distributions.
+
+A sketch counts values in logarithmic buckets: bucket ``i`` holds values in
+``(gamma**(i-1), gamma**i]`` with ``gamma = (1 + a) / (1 - a)``, so any
+quantile it returns is within relative accuracy ``a`` of a real value from
+the input. Counts are plain integers, which makes sketches exact to merge
+(add the counts) and to subtract from (a deleted row takes its count back
+out), and a few dozen buckets cover kills as well as damage.
+"""
+from __future__ import annotations
+
+import math
+from typing import Iterable
+
+RELATIVE_ACCURACY = 0.01
+
+# Values at or below this are counted as zero (log would be undefined).
+MIN_POSITIVE = 1e-9
+
+_FORMAT_VERSION = 1
+
+
+class QuantileSketch:
+    """DDSketch over non-negative values, with ``RELATIVE_ACCURACY``."""
+
+    gamma = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+    _log_gamma = math.log(gamma)
+
+    def __init__(self) -> None:
+        self.bins: dict[int, int] = {}
+        self.zero_count = 0
+
+    @property
+    def count(self) -> int:
+        return self.zero_count + sum(self.bins.values())
+
+    def add(self, value: float | None, weight: int = 1) -> None:
+        """Count ``value`` ``weight`` times; a negative weight removes it again. ``None`` is skipped."""
+        if value is None:
+            return
+        if value < 0:
+            raise ValueError(f"QuantileSketch only takes non-negative values, got {value}")
+        if value <= MIN_POSITIVE:
+            self.zero_count += weight
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        count = self.bins.get(index, 0) + weight
+        if count:
+            self.bins[index] = count
+        else:
+            del self.bins[index]
+
+    def update(self, values: Iterable[float | None], weight: int = 1) -> None:
+        for value in values:
+            self.add(value, weight)
+
+    def merge(self, other: QuantileSketch) -> None:
+        """Add ``other``'s counts to this sketch."""
+        self.zero_count += other.zero_count
+        for index, count in other.bins.items():
+            merged = self.bins.get(index, 0) + count
+            if merged:
+                self.bins[index] = merged
+            else:
+                self.bins.pop(index, None)
+
+    def quantile(self, q: float) -> float | None:
+        """Estimated ``q``-quantile (0 <= q <= 1), or ``None`` for an empty sketch."""
+        return self.quantiles([q])[0]
+
+    def quantiles(self, qs: list[float]) -> list[float | None]:
+        """``quantile`` of each of ``qs`` (ascending), in one pass over the buckets."""
+        total = self.count
+        if total <= 0:
+            return [None] * len(qs)
+        results: list[float | None] = []
+        buckets = iter(sorted(self.bins.items()))
+        seen, value = self.zero_count, 0.0
+        for q in qs:
+            rank = q * (total - 1)
+            while seen <= rank:
+                # rank < total, so the buckets cannot run out first.
+                index, count = next(buckets)
+                seen += count
+                # Midpoint (in relative terms) of the bucket's range.
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+            results.append(value)
+        return results
+
+    # -- storage ---------------------------------------------------------------
+
+    def to_bytes(self) -> bytes:
+        """Compact encoding: varint counts, bucket indexes as zigzag deltas."""
+        out = bytearray([_FORMAT_VERSION])
+        _write_varint(out, self.zero_count)
+        _write_varint(out, len(self.bins))
+        previous = 0
+        for index in sorted(self.bins):
+            delta = index - previous
+            _write_varint(out, (delta << 1) ^ (delta >> 63))
+            _write_varint(out, self.bins[index])
+            previous = index
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes | None) -> QuantileSketch:
+        """Decode ``to_bytes`` output; ``None`` gives an empty sketch."""
+        sketch = cls()
+        sketch.merge_bytes(data)
+        return sketch
+
+    def merge_bytes(self, data: bytes | None) -> None:
+        """``merge`` an encoded sketch without building it first."""
+        if not data:
+            return
+        if data[0] != _FORMAT_VERSION:
+            raise ValueError(f"Unknown sketch format {data[0]}")
+        zero_count, position = _read_varint(data, 1)
+        size, position = _read_varint(data, position)
+        self.zero_count += zero_count
+        bins = self.bins
+        index = 0
+        for _ in range(size):
+            zigzag, position = _read_varint(data, position)
+            index += (zigzag >> 1) ^ -(zigzag & 1)
+            count, position = _read_varint(data, position)
+            merged = bins.get(index, 0) + count
+            if merged:
+                bins[index] = merged
+            else:
+                bins.pop(index, None)
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    if value < 0:
+        raise ValueError(f"Cannot encode negative count {value}")
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, position: int) -> tuple[int, int]:
+    byte = data[position]
+    if byte < 0x80:
+        return byte, position + 1
+    value = shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
@@ -0,0 +1,76 @@
+"""Size-capped LRU cache for query results, with per-function hit stats."""
+from __future__ import annotations
+
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable
+
+MISSING = object()
+
+
+class QueryCache:
+    """LRU cache that stores results pickled, so its memory use is measurable.
+
+    Every hit unpickles a fresh copy, so callers can mutate what they get
+    back without corrupting the cache. Entries are evicted least recently
+    used first once the pickled sizes add up to more than ``max_bytes``.
+    Keys are ``(function name, ...)`` tuples; stats are kept per function name.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple, bytes] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats: dict[str, dict[str, int]] = {}
+
+    def _counter(self, name: str) -> dict[str, int]:
+        return self._stats.setdefault(name, {"hits": 0, "misses": 0, "evictions": 0})
+
+    def get(self, key: tuple[Hashable, ...]) -> Any:
+        """Cached value for ``key``, or ``MISSING``."""
+        with self._lock:
+            blob = self._entries.get(key)
+            if blob is None:
+                self._counter(key[0])["misses"] += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self._counter(key[0])["hits"] += 1
+        return pickle.loads(blob)
+
+    def put(self, key: tuple[Hashable, ...], value: Any) -> None:
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = blob
+            self._bytes += len(blob)
+            while self._bytes > self.max_bytes:
+                evicted_key, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self._counter(evicted_key[0])["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            functions = {}
+            for name, counts in sorted(self._stats.items()):
+                lookups = counts["hits"] + counts["misses"]
+                functions[name] = {
+                    **counts,
+                    "hit_rate": round(counts["hits"] / lookups, 3) if lookups else None,
+                }
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "functions": functions,
+            }
@@ -0,0 +1,109 @@
+"""Alternate encodings for API responses: columnar tables and MessagePack."""
+from __future__ import annotations
+
+from typing import Any, Callable, Coroutine, Literal
+
+from fastapi.routing import APIRoute
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional at runtime, listed in requirements.txt
+    msgpack = None
+
+ResponseFormat = Literal["rows", "columnar"]
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+
+def to_columnar(rows: list[dict[str, Any]]) -> dict[str, list[Any]]:
+    """Turn a list of row dicts into ``{"columns": [...], "values": [[...], ...]}``.
+
+    ``values[i]`` holds the ``columns[i]`` value of every row, in row order, so
+    key names are sent once per table instead of once per row. Columns follow
+    first-seen key order; a row missing a key contributes ``None``.
+    """
+    columns: dict[str, None] = {}
+    for row in rows:
+        for key in row:
+            if key not in columns:
+                columns[key] = None
+    names = list(columns)
+    return {"columns": names, "values": [[row.get(name) for row in rows] for name in names]}
+
+
+def format_rows(rows: list[dict[str, Any]], format: ResponseFormat) -> list[dict[str, Any]] | dict[str, list[Any]]:
+    """Return ``rows`` unchanged for ``format="rows"``, columnar otherwise."""
+    if format == "columnar":
+        return to_columnar(rows)
+    return rows
+
+
+# ---------------------------------------------------------------------------
+# MessagePack content negotiation
+# ---------------------------------------------------------------------------
+
+class MsgPackResponse(Response):
+    media_type = "application/msgpack"
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content, use_bin_type=True)
+
+
+def _accept_quality(accept: str) -> dict[str, float]:
+    qualities: dict[str, float] = {}
+    for part in accept.split(","):
+        media_type, _, params = part.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qualities[media_type.strip().lower()] = q
+    return qualities
+
+
+def prefers_msgpack(accept: str | None) -> bool:
+    """True when the Accept header ranks MessagePack at least as high as JSON."""
+    if not accept or msgpack is None:
+        return False
+    qualities = _accept_quality(accept)
+    msgpack_q = max((qualities.get(media_type, 0.0) for media_type in MSGPACK_MEDIA_TYPES), default=0.0)
+    if msgpack_q <= 0:
+        return False
+    return msgpack_q >= qualities.get("application/json", 0.0)
+
+
+class NegotiatedRoute(APIRoute):
+    """APIRoute that encodes the endpoint result as MessagePack when the client asks for it.
+
+    Two request handlers are built per route, one per response class, so the
+    payload goes through FastAPI's encoder once and is serialized directly into
+    the negotiated format. Endpoints returning a ``Response`` are untouched.
+    """
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        json_handler = super().get_route_handler()
+        if msgpack is None:
+            return json_handler
+
+        original_response_class = self.response_class
+        self.response_class = MsgPackResponse
+        try:
+            msgpack_handler = super().get_route_handler()
+        finally:
+            self.response_class = original_response_class
+
+        async def negotiated_handler(request: Request) -> Response:
+            if prefers_msgpack(request.headers.get("accept")):
+                response = await msgpack_handler(request)
+            else:
+                response = await json_handler(request)
+            response.headers.setdefault("Vary", "Accept")
+            return response
+
+        return negotiated_handler
@@ -3,10 +3,24 @@
 from __future__ import annotations
 
 import atexit
+import functools
+import html
+import inspect
+import json
 import os
 import sqlite3
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
-from typing import Any
+from typing import Any, AsyncIterator, Callable, Iterable, Iterator
+
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+
+from app.quantile_sketch import QuantileSketch
+from app.query_cache import MISSING, QueryCache
 
 _default_db = Path(__file__).resolve().parent.parent / "data" / "scrims.db"
 DB_PATH = Path(os.environ.get("DB_PATH", str(_default_db)))
@@ -57,6 +71,63 @@ CREATE TABLE IF NOT EXISTS bans (
     ban_order   INTEGER NOT NULL
 );
 
+-- Pre-aggregated player rows, maintained by insert/update/delete_match in
+-- the same transaction. Sums of nullable stats keep their own count so
+-- averages match AVG() over the raw rows.
+CREATE TABLE IF NOT EXISTS champion_role_stats (
+    patch           TEXT NOT NULL,
+    opponent        TEXT NOT NULL,
+    team            TEXT NOT NULL,
+    role            TEXT NOT NULL,
+    champion        TEXT NOT NULL,
+    games           INTEGER NOT NULL,
+    wins            INTEGER NOT NULL,
+    kills           INTEGER NOT NULL,
+    deaths          INTEGER NOT NULL,
+    assists         INTEGER NOT NULL,
+    mvp             INTEGER NOT NULL,
+    svp             INTEGER NOT NULL,
+    kp_sum          REAL NOT NULL,
+    kp_count        INTEGER NOT NULL,
+    gold_sum        REAL NOT NULL,
+    gold_count      INTEGER NOT NULL,
+    gpm_sum         REAL NOT NULL,
+    gpm_count       INTEGER NOT NULL,
+    dmg_dealt_sum   REAL NOT NULL,
+    dmg_dealt_count INTEGER NOT NULL,
+    dmg_taken_sum   REAL NOT NULL,
+    dmg_taken_count INTEGER NOT NULL,
+    dmg_share_sum   REAL NOT NULL,
+    dmg_share_count INTEGER NOT NULL,
+    PRIMARY KEY (patch, opponent, team, role, champion)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS champion_ban_stats (
+    patch       TEXT NOT NULL,
+    opponent    TEXT NOT NULL,
+    team        TEXT NOT NULL,
+    champion    TEXT NOT NULL,
+    bans        INTEGER NOT NULL,
+    PRIMARY KEY (patch, opponent, team, champion)
+) WITHOUT ROWID;
+
+-- Quantile sketches (app/quantile_sketch.py) of per-game stats, one BLOB per
+-- stat, maintained with champion_role_stats. Not split by opponent: one
+-- sketch per patch stays small however many scrims are logged, and
+-- opponent-filtered distributions are built from the raw rows instead.
+CREATE TABLE IF NOT EXISTS champion_role_sketches (
+    patch        TEXT NOT NULL,
+    team         TEXT NOT NULL,
+    role         TEXT NOT NULL,
+    champion     TEXT NOT NULL,
+    kills        BLOB,
+    deaths       BLOB,
+    damage_dealt BLOB,
+    damage_taken BLOB,
+    gold_earned  BLOB,
+    PRIMARY KEY (patch, team, role, champion)
+) WITHOUT ROWID;
+
 CREATE TABLE IF NOT EXISTS team_rosters (
     id          INTEGER PRIMARY KEY AUTOINCREMENT,
     team_name   TEXT NOT NULL,
@@ -64,18 +135,366 @@ CREATE TABLE IF NOT EXISTS team_rosters (
     updated_at  TEXT NOT NULL DEFAULT (datetime('now')),
     UNIQUE(team_name, player_nick)
 );
+
+-- Full-text index behind /api/scrims/search: one document per match (rowid =
+-- matches.id) with the opponent, the notes and the picked champions. Kept in
+-- sync by the triggers below; backfilled by the add_match_search migration.
+CREATE VIRTUAL TABLE IF NOT EXISTS match_search USING fts5(
+    opponent, notes, champions,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+-- import_matches sets deferred = 1 inside its transaction and indexes the new
+-- matches once at the end, instead of rewriting each document once per player.
+CREATE TABLE IF NOT EXISTS search_sync (
+    id       INTEGER PRIMARY KEY CHECK (id = 1),
+    deferred INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO search_sync (id, deferred) VALUES (1, 0);
+CREATE TRIGGER IF NOT EXISTS trg_matches_insert_search AFTER INSERT ON matches
+WHEN (SELECT deferred FROM search_sync) = 0
+BEGIN
+    INSERT INTO match_search (rowid, opponent, notes) VALUES (NEW.id, NEW.opponent, NEW.notes);
+END;
+CREATE TRIGGER IF NOT EXISTS trg_matches_update_search AFTER UPDATE OF opponent, notes ON matches
+BEGIN
+    UPDATE match_search SET opponent = NEW.opponent, notes = NEW.notes WHERE rowid = NEW.id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_matches_delete_search AFTER DELETE ON matches
+BEGIN
+    DELETE FROM match_search WHERE rowid = OLD.id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_match_players_insert_search AFTER INSERT ON match_players
+WHEN (SELECT deferred FROM search_sync) = 0
+BEGIN
+    UPDATE match_search
+    SET champions = (SELECT group_concat(champion, ' ') FROM match_players WHERE match_id = NEW.match_id)
+    WHERE rowid = NEW.match_id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_match_players_update_search AFTER UPDATE OF champion ON match_players
+BEGIN
+    UPDATE match_search
+    SET champions = (SELECT group_concat(champion, ' ') FROM match_players WHERE match_id = NEW.match_id)
+    WHERE rowid = NEW.match_id;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_match_players_delete_search AFTER DELETE ON match_players
+BEGIN
+    UPDATE match_search
+    SET champions = (SELECT group_concat(champion, ' ') FROM match_players WHERE match_id = OLD.match_id)
+    WHERE rowid = OLD.match_id;
+END;
 """
 
 
-def _connect() -> sqlite3.Connection:
+# ---------------------------------------------------------------------------
+# Connections
+# ---------------------------------------------------------------------------
+
+# Page cache (KiB) and mmap window of each reader connection. Analytics scan
+# the same match tables over and over, so readers keep far more of them in
+# memory than the writer connections do.
+READER_CACHE_KIB = int(os.environ.get("SCRIM_READER_CACHE_KIB", "65536"))
+READER_MMAP_BYTES = int(os.environ.get("SCRIM_READER_MMAP_BYTES", str(256 * 1024 * 1024)))
+
+
+def _open_connection(read_only: bool = False) -> sqlite3.Connection:
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(str(DB_PATH))
+    # Session connections are checked out on the event loop and used from a
+    # worker thread, one request at a time, so the same-thread check is off.
+    if read_only:
+        # WAL mode is persistent in the file, so readers see committed writes
+        # without setting it (which a mode=ro connection could not do).
+        conn = sqlite3.connect(f"{DB_PATH.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False)
+        conn.execute("PRAGMA query_only=ON")
+        conn.execute(f"PRAGMA cache_size=-{READER_CACHE_KIB}")
+        conn.execute(f"PRAGMA mmap_size={READER_MMAP_BYTES}")
+    else:
+        conn = sqlite3.connect(str(DB_PATH), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA foreign_keys=ON")
     conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL")
-    conn.execute("PRAGMA foreign_keys=ON")
     return conn
 
 
+class _ConnectionPool:
+    """Long-lived connections with PRAGMAs applied once.
+
+    Code running outside a request gets a per-thread connection. Request
+    sessions check out a connection exclusively for the whole request.
+    Connections opened for a different ``DB_PATH`` are discarded. A
+    ``read_only`` pool opens ``mode=ro`` connections.
+    """
+
+    def __init__(self, read_only: bool = False) -> None:
+        self.read_only = read_only
+        self._local = threading.local()
+        self._idle: list[tuple[str, sqlite3.Connection]] = []
+        self._lock = threading.Lock()
+
+    def thread_connection(self) -> sqlite3.Connection:
+        path = str(DB_PATH)
+        cached = getattr(self._local, "entry", None)
+        if cached is None or cached[0] != path:
+            if cached is not None:
+                cached[1].close()
+            cached = (path, _open_connection(self.read_only))
+            self._local.entry = cached
+        return cached[1]
+
+    def checkout(self) -> sqlite3.Connection:
+        path = str(DB_PATH)
+        with self._lock:
+            while self._idle:
+                idle_path, conn = self._idle.pop()
+                if idle_path == path:
+                    return conn
+                conn.close()
+        return _open_connection(self.read_only)
+
+    def checkin(self, conn: sqlite3.Connection) -> None:
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            self._idle.append((str(DB_PATH), conn))
+
+
+_pool = _ConnectionPool()
+# Analytics requests only read, so they get their own connections: they never
+# queue behind a writer's connection and, under WAL, run alongside writes.
+_readers = _ConnectionPool(read_only=True)
+
+# Connection bound to the current request by ``db_session``.
+_session_conn: ContextVar[sqlite3.Connection | None] = ContextVar("scrim_session_conn", default=None)
+
+
+@contextmanager
+def _connect() -> Iterator[sqlite3.Connection]:
+    """Yield a pooled connection.
+
+    Inside a request session every call shares the session's connection and
+    transaction (committed when the request ends). Elsewhere the calling
+    thread's connection is used and each block commits on success.
+    """
+    session_conn = _session_conn.get()
+    if session_conn is not None:
+        yield session_conn
+        return
+    conn = _pool.thread_connection()
+    with conn:
+        yield conn
+
+
+async def db_session(request: Request) -> AsyncIterator[sqlite3.Connection]:
+    """FastAPI dependency: one connection and one transaction for the whole request.
+
+    GET requests read from a single snapshot. Other methods let sqlite3 open
+    the transaction at the first write, so the write lock is only held from
+    the first write to the end of the request and a write never has to
+    upgrade a stale read snapshot.
+    """
+    conn = _pool.checkout()
+    version_token = None
+    if request.method in ("GET", "HEAD"):
+        # Read before BEGIN: the snapshot is then at least as new as the version.
+        version_token = _session_version.set(_data_version)
+        conn.execute("BEGIN")
+    changes_before = conn.total_changes
+    rosters_before = _roster_generation
+    token = _session_conn.set(conn)
+    try:
+        yield conn
+    except BaseException:
+        await run_in_threadpool(conn.rollback)
+        raise
+    else:
+        await run_in_threadpool(conn.commit)
+    finally:
+        _session_conn.reset(token)
+        if version_token is not None:
+            _session_version.reset(version_token)
+        _pool.checkin(conn)
+    if conn.total_changes != changes_before:
+        _data_changed()
+    if _roster_generation != rosters_before:
+        # The roster index may have been rebuilt from pre-commit data.
+        _rosters_changed()
+
+
+async def db_read_session() -> AsyncIterator[sqlite3.Connection]:
+    """FastAPI dependency for analytics routes: a read-only connection and one snapshot.
+
+    Like a GET ``db_session``, but the connection comes from the reader pool
+    and ``PRAGMA query_only`` turns any write into an error.
+    """
+    conn = _readers.checkout()
+    # Read before BEGIN: the snapshot is then at least as new as the version.
+    version_token = _session_version.set(_data_version)
+    conn.execute("BEGIN")
+    token = _session_conn.set(conn)
+    try:
+        yield conn
+    finally:
+        _session_conn.reset(token)
+        _session_version.reset(version_token)
+        await run_in_threadpool(_readers.checkin, conn)
+
+
+def end_read_session() -> None:
+    """End the current analytics request's read transaction early.
+
+    For slow work at the end of a request that does not read the database
+    (a network fetch), so the WAL snapshot is not held while it runs. Reads
+    after this run in autocommit and bypass the result cache.
+    """
+    conn = _session_conn.get()
+    if conn is not None and conn.in_transaction:
+        conn.rollback()
+    _session_version.set(None)
+
+
+# ---------------------------------------------------------------------------
+# WAL checkpoints
+# ---------------------------------------------------------------------------
+
+# A PASSIVE checkpoint runs once the WAL grows past this size, or on the next
+# tick of the interval if anything was written since the last one.
+CHECKPOINT_WAL_BYTES = int(os.environ.get("SCRIM_CHECKPOINT_WAL_BYTES", str(4 * 1024 * 1024)))
+CHECKPOINT_INTERVAL_SECONDS = float(os.environ.get("SCRIM_CHECKPOINT_INTERVAL_SECONDS", "30"))
+
+
+def _wal_size() -> int:
+    try:
+        return os.path.getsize(f"{DB_PATH}-wal")
+    except OSError:
+        return 0
+
+
+class _Checkpointer:
+    """Daemon thread that folds the WAL back into the DB file off the write path.
+
+    Commits are already durable in the WAL, so writers only signal that there
+    is something to checkpoint. PASSIVE checkpoints never wait on readers or
+    writers; ``stop`` runs the final TRUNCATE.
+    """
+
+    def __init__(self) -> None:
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+        self._dirty = False
+        self.checkpoints = 0
+        self.last_result: tuple[int, int, int] | None = None
+
+    def notify_write(self) -> None:
+        with self._lock:
+            self._dirty = True
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="scrim-wal-checkpointer", daemon=True)
+                self._thread.start()
+        if _wal_size() >= CHECKPOINT_WAL_BYTES:
+            self._wake.set()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(CHECKPOINT_INTERVAL_SECONDS)
+            self._wake.clear()
+            with self._lock:
+                if self._stopping:
+                    return
+                dirty, self._dirty = self._dirty, False
+            if dirty:
+                self._passive()
+
+    def _passive(self) -> None:
+        try:
+            row = _pool.thread_connection().execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+        except sqlite3.Error:
+            with self._lock:
+                self._dirty = True
+            return
+        self.checkpoints += 1
+        self.last_result = tuple(row)
+
+    def stop(self) -> None:
+        """Stop the thread and TRUNCATE the WAL. Safe to call more than once."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            self._stopping = True
+        self._wake.set()
+        if thread is not None:
+            thread.join()
+        _checkpoint()
+
+
+_checkpointer = _Checkpointer()
+
+
+# ---------------------------------------------------------------------------
+# Result cache
+# ---------------------------------------------------------------------------
+
+RESULT_CACHE_MAX_BYTES = int(os.environ.get("SCRIM_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+_result_cache = QueryCache(RESULT_CACHE_MAX_BYTES)
+
+# Bumped after every committed write and part of every cache key, so a write
+# makes all older entries unreachable (they age out through the LRU).
+_data_version = 0
+_data_version_lock = threading.Lock()
+
+# Data version seen when the current GET request's read transaction began.
+_session_version: ContextVar[int | None] = ContextVar("scrim_session_version", default=None)
+
+
+def _data_changed() -> None:
+    """Call after a write commits: invalidates cached results and schedules a checkpoint."""
+    global _data_version
+    with _data_version_lock:
+        _data_version += 1
+    _checkpointer.notify_write()
+
+
+def _blank_to_none(value: Any) -> Any:
+    """``""`` -> ``None``; every other value (``0``, ``False``) is kept as is."""
+    return None if value == "" else value
+
+
+def _cached(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Cache ``func`` by (name, normalized arguments, data version, DB path).
+
+    Empty-string filters normalize to ``None`` like in ``_build_where``.
+    Calls inside a write request bypass the cache: they may see
+    uncommitted rows.
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        version = _session_version.get()
+        if version is None:
+            if _session_conn.get() is not None:
+                return func(*args, **kwargs)
+            version = _data_version
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = tuple(_blank_to_none(value) for value in bound.arguments.values())
+        key = (func.__name__, arguments, version, str(DB_PATH))
+        value = _result_cache.get(key)
+        if value is MISSING:
+            value = func(*args, **kwargs)
+            _result_cache.put(key, value)
+        return value
+
+    return wrapper
+
+
+def cache_stats() -> dict[str, Any]:
+    """Entries, memory use and per-function hit rates of the result cache."""
+    return {**_result_cache.stats(), "data_version": _data_version}
+
+
 def _checkpoint() -> None:
     """Force WAL checkpoint so all data is written to the main DB file."""
     try:
@@ -86,39 +505,138 @@ def _checkpoint() -> None:
         pass
 
 
+def close_db() -> None:
+    """Stop the background checkpointer and leave an empty WAL behind."""
+    _checkpointer.stop()
+
+
 # Checkpoint WAL on process exit to prevent data loss
-atexit.register(_checkpoint)
+atexit.register(close_db)
 
 
-def _migrate(conn: sqlite3.Connection) -> None:
-    """Add columns that may be missing in older databases."""
+# ---------------------------------------------------------------------------
+# Migrations
+# ---------------------------------------------------------------------------
+
+def _add_mvp_svp_columns(conn: sqlite3.Connection) -> None:
     cursor = conn.execute("PRAGMA table_info(match_players)")
     existing = {row["name"] for row in cursor.fetchall()}
     if "is_mvp" not in existing:
         conn.execute("ALTER TABLE match_players ADD COLUMN is_mvp INTEGER NOT NULL DEFAULT 0")
     if "is_svp" not in existing:
         conn.execute("ALTER TABLE match_players ADD COLUMN is_svp INTEGER NOT NULL DEFAULT 0")
-    # Normalize champion names (e.g. MonkeyKing -> Wukong)
+
+
+def _normalize_monkeyking(conn: sqlite3.Connection) -> None:
+    # Saves are normalized by the routes, so this only fixes legacy rows.
     conn.execute("UPDATE match_players SET champion = 'Wukong' WHERE champion = 'MonkeyKing'")
     conn.execute("UPDATE bans SET champion = 'Wukong' WHERE champion = 'MonkeyKing'")
-    # Correct patch versions by date range — guarded so it only runs once.
-    # Without the guard the open-ended WHERE date >= '2026-03-25' would overwrite
-    # future patches (e.g. 7.1) every time init_db() is called.
-    already_ran = conn.execute(
-        "SELECT 1 FROM migrations WHERE name = 'patch_correction_7.0fg'"
-    ).fetchone()
-    if not already_ran:
-        conn.execute(
-            "UPDATE matches SET patch = '7.0f' "
-            "WHERE date >= '2026-03-18' AND date <= '2026-03-24'"
-        )
-        conn.execute(
-            "UPDATE matches SET patch = '7.0g' "
-            "WHERE date >= '2026-03-25'"
-        )
-        conn.execute(
-            "INSERT INTO migrations (name) VALUES ('patch_correction_7.0fg')"
-        )
+
+
+def _correct_patches_7_0fg(conn: sqlite3.Connection) -> None:
+    # Must only run once: the open-ended WHERE date >= '2026-03-25' would
+    # otherwise overwrite future patches (e.g. 7.1).
+    conn.execute(
+        "UPDATE matches SET patch = '7.0f' "
+        "WHERE date >= '2026-03-18' AND date <= '2026-03-24'"
+    )
+    conn.execute(
+        "UPDATE matches SET patch = '7.0g' "
+        "WHERE date >= '2026-03-25'"
+    )
+
+
+def _add_core_indexes(conn: sqlite3.Connection) -> None:
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_match_players_match ON match_players(match_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_match_players_team_role_champion ON match_players(team, role, champion)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_bans_match ON bans(match_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_matches_date_patch_opponent ON matches(date, patch, opponent)")
+
+
+def _add_derived_stat_columns(conn: sqlite3.Connection) -> None:
+    match_columns = {row["name"] for row in conn.execute("PRAGMA table_info(matches)")}
+    if "duration_s" not in match_columns:
+        conn.execute("ALTER TABLE matches ADD COLUMN duration_s INTEGER")
+    player_columns = {row["name"] for row in conn.execute("PRAGMA table_info(match_players)")}
+    for column in ("gpm", "kda", "dmg_share"):
+        if column not in player_columns:
+            conn.execute(f"ALTER TABLE match_players ADD COLUMN {column} REAL")
+
+    durations = {}
+    for row in conn.execute("SELECT id, duration FROM matches").fetchall():
+        durations[row["id"]] = _duration_seconds(row["duration"])
+    conn.executemany(
+        "UPDATE matches SET duration_s = ? WHERE id = ?",
+        [(duration_s, match_id) for match_id, duration_s in durations.items()],
+    )
+
+    players_by_match: dict[int, list[dict[str, Any]]] = {}
+    for row in conn.execute("SELECT * FROM match_players ORDER BY match_id, id").fetchall():
+        players_by_match.setdefault(row["match_id"], []).append(dict(row))
+    updates = []
+    for match_id, players in players_by_match.items():
+        derived = _derived_player_stats(players, durations.get(match_id))
+        updates.extend((*stats, p["id"]) for p, stats in zip(players, derived))
+    conn.executemany("UPDATE match_players SET gpm = ?, kda = ?, dmg_share = ? WHERE id = ?", updates)
+
+
+def _build_summary_tables(conn: sqlite3.Connection) -> None:
+    _rebuild_summaries(conn)
+
+
+def _add_match_history_index(conn: sqlite3.Connection) -> None:
+    # Serves the keyset pagination in list_matches: ORDER BY date DESC, id DESC.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_matches_date_id ON matches(date, id)")
+
+
+def _add_match_search(conn: sqlite3.Connection) -> None:
+    # The table and its triggers come from _SCHEMA; index the existing matches.
+    conn.execute("DELETE FROM match_search")
+    _index_for_search(conn, "1=1", ())
+
+
+def _build_stat_sketches(conn: sqlite3.Connection) -> None:
+    conn.execute("DELETE FROM champion_role_sketches")
+    _apply_players_to_sketches(conn, "1 = 1", (), 1)
+
+
+def _add_player_match_dates(conn: sqlite3.Connection) -> None:
+    # Copy of matches.date, so per-role recent-form windows read the players
+    # of one team and role in date order straight off an index.
+    player_columns = {row["name"] for row in conn.execute("PRAGMA table_info(match_players)")}
+    if "match_date" not in player_columns:
+        conn.execute("ALTER TABLE match_players ADD COLUMN match_date TEXT")
+    conn.execute("UPDATE match_players SET match_date = (SELECT date FROM matches WHERE id = match_id)")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_match_players_team_role_date ON match_players(team, role, match_date)"
+    )
+
+
+# Applied in order; each name is recorded in ``migrations`` once it has run.
+# Never rename or reorder entries, only append.
+_MIGRATIONS: list[tuple[str, Callable[[sqlite3.Connection], None]]] = [
+    ("add_mvp_svp_columns", _add_mvp_svp_columns),
+    ("normalize_monkeyking", _normalize_monkeyking),
+    ("patch_correction_7.0fg", _correct_patches_7_0fg),
+    ("add_core_indexes", _add_core_indexes),
+    ("add_match_history_index", _add_match_history_index),
+    ("add_derived_stat_columns", _add_derived_stat_columns),
+    ("build_summary_tables", _build_summary_tables),
+    ("add_match_search", _add_match_search),
+    ("build_stat_sketches", _build_stat_sketches),
+    ("add_player_match_dates", _add_player_match_dates),
+]
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    """Run pending migrations, then refresh planner statistics if any ran."""
+    applied = {row["name"] for row in conn.execute("SELECT name FROM migrations")}
+    pending = [(name, step) for name, step in _MIGRATIONS if name not in applied]
+    for name, step in pending:
+        step(conn)
+        conn.execute("INSERT INTO migrations (name) VALUES (?)", (name,))
+    if pending:
+        conn.execute("ANALYZE")
 
 
 def init_db() -> None:
@@ -128,16 +646,185 @@ def init_db() -> None:
         _migrate(conn)
 
 
+# ---------------------------------------------------------------------------
+# Summary tables
+# ---------------------------------------------------------------------------
+
+_TEAM_WON = """CASE
+                WHEN p.team = 'ours' AND m.result = 'win' THEN 1
+                WHEN p.team = 'theirs' AND m.result = 'loss' THEN 1
+                ELSE 0
+            END"""
+
+_PLAYER_SUMMARY_COLUMNS = """games, wins, kills, deaths, assists, mvp, svp,
+    kp_sum, kp_count, gold_sum, gold_count, gpm_sum, gpm_count,
+    dmg_dealt_sum, dmg_dealt_count, dmg_taken_sum, dmg_taken_count,
+    dmg_share_sum, dmg_share_count"""
+
+
+def _apply_to_summaries(conn: sqlite3.Connection, where: str, params: tuple, sign: int) -> None:
+    """Add (``sign=1``) or subtract (``sign=-1``) the selected matches' rows."""
+    _apply_players_to_summaries(conn, where, params, sign)
+    _apply_bans_to_summaries(conn, where, params, sign)
+
+
+def _apply_players_to_summaries(conn: sqlite3.Connection, where: str, params: tuple, sign: int) -> None:
+    increments = ", ".join(
+        f"{column} = {column} + excluded.{column}"
+        for column in (c.strip() for c in _PLAYER_SUMMARY_COLUMNS.split(","))
+    )
+    conn.execute(
+        f"""INSERT INTO champion_role_stats (patch, opponent, team, role, champion, {_PLAYER_SUMMARY_COLUMNS})
+            SELECT m.patch, m.opponent, p.team, p.role, p.champion,
+                {sign} * COUNT(*), {sign} * SUM({_TEAM_WON}),
+                {sign} * SUM(p.kills), {sign} * SUM(p.deaths), {sign} * SUM(p.assists),
+                {sign} * SUM(p.is_mvp), {sign} * SUM(p.is_svp),
+                {sign} * TOTAL(p.kp_percent), {sign} * COUNT(p.kp_percent),
+                {sign} * TOTAL(p.gold_earned), {sign} * COUNT(p.gold_earned),
+                {sign} * TOTAL(p.gpm), {sign} * COUNT(p.gpm),
+                {sign} * TOTAL(p.damage_dealt), {sign} * COUNT(p.damage_dealt),
+                {sign} * TOTAL(p.damage_taken), {sign} * COUNT(p.damage_taken),
+                {sign} * TOTAL(p.dmg_share), {sign} * COUNT(p.dmg_share)
+            FROM match_players p
+            JOIN matches m ON p.match_id = m.id
+            WHERE {where}
+            GROUP BY m.patch, m.opponent, p.team, p.role, p.champion
+            ON CONFLICT (patch, opponent, team, role, champion) DO UPDATE SET {increments}""",
+        params,
+    )
+    if sign < 0:
+        conn.execute("DELETE FROM champion_role_stats WHERE games <= 0")
+    _apply_players_to_sketches(conn, where, params, sign)
+
+
+# Player columns with a distribution in champion_role_sketches.
+_SKETCH_STATS = ("kills", "deaths", "damage_dealt", "damage_taken", "gold_earned")
+_SKETCH_KEY = ("patch", "team", "role", "champion")
+
+
+def _apply_players_to_sketches(conn: sqlite3.Connection, where: str, params: tuple, sign: int) -> None:
+    """Add or take the selected player rows' stats into/out of their key's sketches."""
+    deltas: dict[tuple, list[QuantileSketch]] = {}
+    for row in conn.execute(
+        f"""SELECT m.patch, p.team, p.role, p.champion, {", ".join(f"p.{column}" for column in _SKETCH_STATS)}
+            FROM match_players p
+            JOIN matches m ON p.match_id = m.id
+            WHERE {where}""",
+        params,
+    ):
+        key = tuple(row[:4])
+        sketches = deltas.get(key)
+        if sketches is None:
+            sketches = deltas[key] = [QuantileSketch() for _ in _SKETCH_STATS]
+        for sketch, value in zip(sketches, row[4:]):
+            sketch.add(value, sign)
+    if not deltas:
+        return
+
+    key_match = " AND ".join(f"{column} = ?" for column in _SKETCH_KEY)
+    upserts, deletes = [], []
+    for key, sketches in deltas.items():
+        stored = conn.execute(
+            f"SELECT {', '.join(_SKETCH_STATS)} FROM champion_role_sketches WHERE {key_match}", key
+        ).fetchone()
+        if stored is not None:
+            for sketch, blob in zip(sketches, stored):
+                sketch.merge_bytes(blob)
+        # kills is NOT NULL, so its sketch counts the key's games.
+        if sketches[0].count <= 0:
+            deletes.append(key)
+        else:
+            upserts.append((*key, *(sketch.to_bytes() for sketch in sketches)))
+    conn.executemany(
+        f"""INSERT OR REPLACE INTO champion_role_sketches ({", ".join(_SKETCH_KEY + _SKETCH_STATS)})
+            VALUES ({", ".join("?" * (len(_SKETCH_KEY) + len(_SKETCH_STATS)))})""",
+        upserts,
+    )
+    conn.executemany(f"DELETE FROM champion_role_sketches WHERE {key_match}", deletes)
+
+
+def _apply_bans_to_summaries(conn: sqlite3.Connection, where: str, params: tuple, sign: int) -> None:
+    conn.execute(
+        f"""INSERT INTO champion_ban_stats (patch, opponent, team, champion, bans)
+            SELECT m.patch, m.opponent, b.team, b.champion, {sign} * COUNT(*)
+            FROM bans b
+            JOIN matches m ON b.match_id = m.id
+            WHERE {where}
+            GROUP BY m.patch, m.opponent, b.team, b.champion
+            ON CONFLICT (patch, opponent, team, champion) DO UPDATE SET bans = bans + excluded.bans""",
+        params,
+    )
+    if sign < 0:
+        conn.execute("DELETE FROM champion_ban_stats WHERE bans <= 0")
+
+
+def _add_match_to_summaries(conn: sqlite3.Connection, match_id: int) -> None:
+    _apply_to_summaries(conn, "m.id = ?", (match_id,), 1)
+
+
+def _remove_match_from_summaries(conn: sqlite3.Connection, match_id: int) -> None:
+    _apply_to_summaries(conn, "m.id = ?", (match_id,), -1)
+
+
+def _rebuild_summaries(conn: sqlite3.Connection) -> None:
+    conn.execute("DELETE FROM champion_role_stats")
+    conn.execute("DELETE FROM champion_ban_stats")
+    conn.execute("DELETE FROM champion_role_sketches")
+    _apply_to_summaries(conn, "1 = 1", (), 1)
+
+
+# ---------------------------------------------------------------------------
+# Derived stats (stored so aggregates run on plain numeric columns)
+# ---------------------------------------------------------------------------
+
+def _duration_seconds(duration: str | None) -> int | None:
+    """``"MM:SS"`` -> seconds. ``None`` when missing or malformed."""
+    if not duration:
+        return None
+    minutes, sep, seconds = duration.strip().partition(":")
+    if not sep:
+        return None
+    try:
+        return int(minutes) * 60 + int(seconds)
+    except ValueError:
+        return None
+
+
+def _derived_player_stats(
+    players: list[dict[str, Any]], duration_s: int | None
+) -> list[tuple[float | None, float, float | None]]:
+    """``(gpm, kda, dmg_share)`` for each player, in order.
+
+    ``dmg_share`` is the player's percentage of their own team's damage.
+    """
+    team_damage: dict[str, float] = {}
+    for p in players:
+        if p.get("damage_dealt") is not None:
+            team_damage[p["team"]] = team_damage.get(p["team"], 0) + p["damage_dealt"]
+
+    derived = []
+    for p in players:
+        gold = p.get("gold_earned")
+        damage = p.get("damage_dealt")
+        total = team_damage.get(p["team"], 0)
+        gpm = gold / (duration_s / 60.0) if duration_s and gold is not None else None
+        kda = ((p.get("kills") or 0) + (p.get("assists") or 0)) / max(p.get("deaths") or 0, 1)
+        dmg_share = damage * 100.0 / total if total > 0 and damage is not None else None
+        derived.append((gpm, kda, dmg_share))
+    return derived
+
+
 # ---------------------------------------------------------------------------
 # CRUD – matches
 # ---------------------------------------------------------------------------
 
 def insert_match(data: dict[str, Any]) -> int:
     """Insert a match with players and bans. Returns the new match id."""
+    duration_s = _duration_seconds(data.get("duration"))
     with _connect() as conn:
         cur = conn.execute(
-            """INSERT INTO matches (patch, date, opponent, side, result, duration, notes)
-               VALUES (:patch, :date, :opponent, :side, :result, :duration, :notes)""",
+            """INSERT INTO matches (patch, date, opponent, side, result, duration, duration_s, notes)
+               VALUES (:patch, :date, :opponent, :side, :result, :duration, :duration_s, :notes)""",
             {
                 "patch": data["patch"],
                 "date": data["date"],
@@ -145,50 +832,160 @@ def insert_match(data: dict[str, Any]) -> int:
                 "side": data["side"],
                 "result": data["result"],
                 "duration": data.get("duration"),
+                "duration_s": duration_s,
                 "notes": data.get("notes"),
             },
         )
         match_id = cur.lastrowid
 
-        _insert_players(conn, match_id, data.get("players", []))
+        _insert_players(conn, match_id, data["date"], data.get("players", []), duration_s)
         _insert_bans(conn, match_id, data.get("bans", []))
-    _checkpoint()
+        _add_match_to_summaries(conn, match_id)
+    _data_changed()
     return match_id
 
 
-def _insert_players(conn: sqlite3.Connection, match_id: int, players: list[dict]) -> None:
-    for p in players:
-        conn.execute(
-            """INSERT INTO match_players
-               (match_id, role, team, champion, pick_order, kills, deaths, assists,
-                kp_percent, damage_dealt, damage_taken, gold_earned, is_mvp, is_svp)
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-            (
-                match_id,
-                p["role"],
-                p["team"],
-                p["champion"],
-                p.get("pick_order"),
-                p.get("kills", 0),
-                p.get("deaths", 0),
-                p.get("assists", 0),
-                p.get("kp_percent"),
-                p.get("damage_dealt"),
-                p.get("damage_taken"),
-                p.get("gold_earned"),
-                1 if p.get("is_mvp") else 0,
-                1 if p.get("is_svp") else 0,
-            ),
+# Column order of the tuples built by _player_rows / _ban_rows.
+_PLAYER_COLUMNS = (
+    "match_id", "role", "team", "champion", "pick_order", "kills", "deaths", "assists",
+    "kp_percent", "damage_dealt", "damage_taken", "gold_earned", "is_mvp", "is_svp",
+    "gpm", "kda", "dmg_share", "match_date",
+)
+_BAN_COLUMNS = ("match_id", "champion", "team", "ban_order")
+
+_INSERT_PLAYER_SQL = """INSERT INTO match_players
+    (match_id, role, team, champion, pick_order, kills, deaths, assists,
+     kp_percent, damage_dealt, damage_taken, gold_earned, is_mvp, is_svp,
+     gpm, kda, dmg_share, match_date)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+_INSERT_BAN_SQL = """INSERT INTO bans (match_id, champion, team, ban_order)
+    VALUES (?, ?, ?, ?)"""
+
+
+def _player_rows(match_id: int, match_date: str, players: list[dict], duration_s: int | None) -> list[tuple]:
+    return [
+        (
+            match_id,
+            p["role"],
+            p["team"],
+            p["champion"],
+            p.get("pick_order"),
+            p.get("kills", 0),
+            p.get("deaths", 0),
+            p.get("assists", 0),
+            p.get("kp_percent"),
+            p.get("damage_dealt"),
+            p.get("damage_taken"),
+            p.get("gold_earned"),
+            1 if p.get("is_mvp") else 0,
+            1 if p.get("is_svp") else 0,
+            gpm,
+            kda,
+            dmg_share,
+            match_date,
         )
+        for p, (gpm, kda, dmg_share) in zip(players, _derived_player_stats(players, duration_s))
+    ]
+
+
+def _ban_rows(match_id: int, bans: list[dict]) -> list[tuple]:
+    return [(match_id, b["champion"], b["team"], b["ban_order"]) for b in bans]
+
+
+def _insert_players(
+    conn: sqlite3.Connection, match_id: int, match_date: str, players: list[dict], duration_s: int | None
+) -> None:
+    conn.executemany(_INSERT_PLAYER_SQL, _player_rows(match_id, match_date, players, duration_s))
 
 
 def _insert_bans(conn: sqlite3.Connection, match_id: int, bans: list[dict]) -> None:
-    for b in bans:
-        conn.execute(
-            """INSERT INTO bans (match_id, champion, team, ban_order)
-               VALUES (?, ?, ?, ?)""",
-            (match_id, b["champion"], b["team"], b["ban_order"]),
+    conn.executemany(_INSERT_BAN_SQL, _ban_rows(match_id, bans))
+
+
+def _insert_import_batch(conn: sqlite3.Connection, batch: list[dict[str, Any]], first_id: int) -> None:
+    """Write ``batch`` with ids from ``first_id`` on, all or nothing (one savepoint)."""
+    match_rows: list[tuple] = []
+    player_rows: list[tuple] = []
+    ban_rows: list[tuple] = []
+    for match_id, data in enumerate(batch, start=first_id):
+        duration_s = _duration_seconds(data.get("duration"))
+        match_rows.append((
+            match_id, data["patch"], data["date"], data["opponent"], data["side"],
+            data["result"], data.get("duration"), duration_s, data.get("notes"),
+        ))
+        player_rows.extend(_player_rows(match_id, data["date"], data.get("players", []), duration_s))
+        ban_rows.extend(_ban_rows(match_id, data.get("bans", [])))
+    conn.execute("SAVEPOINT import_batch")
+    try:
+        conn.executemany(
+            """INSERT INTO matches (id, patch, date, opponent, side, result, duration, duration_s, notes)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            match_rows,
         )
+        conn.executemany(_INSERT_PLAYER_SQL, player_rows)
+        conn.executemany(_INSERT_BAN_SQL, ban_rows)
+    except BaseException:
+        conn.execute("ROLLBACK TO import_batch")
+        raise
+    finally:
+        conn.execute("RELEASE import_batch")
+
+
+def import_matches(
+    batches: Iterable[list[dict[str, Any]]],
+    on_rejected: Callable[[int, int, sqlite3.IntegrityError], None] | None = None,
+) -> int:
+    """Insert already-validated matches in a single transaction. Returns how many.
+
+    ``batches`` may be a lazy iterator: each batch is written with one
+    ``executemany`` per table as soon as it arrives, so callers can validate
+    the next batch while memory stays bounded by the batch size. Ids are
+    assigned up front under the write lock, and the summary tables and the
+    search index are updated once for the whole import.
+
+    A batch the database rejects (``IntegrityError``) is rolled back and, with
+    ``on_rejected``, retried one match at a time; each match that still fails
+    is skipped and reported as ``on_rejected(batch number, position, error)``.
+    Without ``on_rejected`` the error propagates.
+    """
+    imported = 0
+    with _connect() as conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        last_id = conn.execute(
+            """SELECT MAX(
+                   COALESCE((SELECT MAX(id) FROM matches), 0),
+                   COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'matches'), 0)
+               )"""
+        ).fetchone()[0]
+        first_id = last_id + 1
+        conn.execute("UPDATE search_sync SET deferred = 1")
+        for batch_number, batch in enumerate(batches):
+            try:
+                _insert_import_batch(conn, batch, last_id + 1)
+            except sqlite3.IntegrityError:
+                if on_rejected is None:
+                    raise
+            else:
+                last_id += len(batch)
+                imported += len(batch)
+                continue
+            for position, data in enumerate(batch):
+                try:
+                    _insert_import_batch(conn, [data], last_id + 1)
+                except sqlite3.IntegrityError as exc:
+                    on_rejected(batch_number, position, exc)
+                    continue
+                last_id += 1
+                imported += 1
+        if imported:
+            _apply_to_summaries(conn, "m.id BETWEEN ? AND ?", (first_id, last_id), 1)
+            _index_for_search(conn, "m.id BETWEEN ? AND ?", (first_id, last_id))
+        conn.execute("UPDATE search_sync SET deferred = 0")
+    if imported:
+        _data_changed()
+    return imported
 
 
 def get_match(match_id: int) -> dict[str, Any] | None:
@@ -199,63 +996,143 @@ def get_match(match_id: int) -> dict[str, Any] | None:
             return None
 
         match = dict(row)
-        match["players"] = [
-            dict(r)
-            for r in conn.execute(
-                "SELECT * FROM match_players WHERE match_id = ? ORDER BY team, role",
-                (match_id,),
-            ).fetchall()
-        ]
-        match["bans"] = [
-            dict(r)
-            for r in conn.execute(
-                "SELECT * FROM bans WHERE match_id = ? ORDER BY team, ban_order",
-                (match_id,),
-            ).fetchall()
-        ]
+        _attach_players_and_bans(conn, [match])
         return match
 
 
 def delete_match(match_id: int) -> bool:
     """Delete a match and cascade to players/bans. Returns True if deleted."""
     with _connect() as conn:
+        _remove_match_from_summaries(conn, match_id)
         cur = conn.execute("DELETE FROM matches WHERE id = ?", (match_id,))
         deleted = cur.rowcount > 0
     if deleted:
-        _checkpoint()
+        _data_changed()
     return deleted
 
 
-def update_match(match_id: int, data: dict[str, Any]) -> bool:
-    """Replace a match's data. Returns True if the match existed."""
-    with _connect() as conn:
-        existing = conn.execute("SELECT id FROM matches WHERE id = ?", (match_id,)).fetchone()
-        if not existing:
-            return False
+_MATCH_FIELDS = ("patch", "date", "opponent", "side", "result", "duration", "duration_s", "notes")
+
+# Changing any of these moves every row of the match to another summary key
+# (or flips its win), so the whole match is re-aggregated.
+_SUMMARY_KEY_FIELDS = {"patch", "opponent", "result"}
+
+
+def _diff_rows(
+    columns: tuple[str, ...],
+    key: tuple[str, ...],
+    old_rows: list[sqlite3.Row],
+    new_rows: list[tuple],
+) -> dict[str, list]:
+    """Plan the minimal changes turning ``old_rows`` into ``new_rows``.
 
+    Rows are paired by ``key`` (in order, when a key repeats). Returns
+    ``{"insert": [row tuples], "update": [(id, {column: value})], "delete":
+    [ids], "report": {...}}``, where the report lists each change by key.
+    """
+    old_by_key: dict[tuple, list[sqlite3.Row]] = {}
+    for row in old_rows:
+        old_by_key.setdefault(tuple(row[k] for k in key), []).append(row)
+
+    plan: dict[str, list] = {"insert": [], "update": [], "delete": []}
+    report: dict[str, list[dict[str, Any]]] = {"updated": [], "inserted": [], "deleted": []}
+    for values in new_rows:
+        new = dict(zip(columns, values))
+        label = {k: new[k] for k in key}
+        candidates = old_by_key.get(tuple(label.values()))
+        if not candidates:
+            plan["insert"].append(values)
+            report["inserted"].append(label)
+            continue
+        old = candidates.pop(0)
+        changed = {column: new[column] for column in columns if old[column] != new[column]}
+        if changed:
+            plan["update"].append((old["id"], changed))
+            report["updated"].append({**label, "fields": list(changed)})
+    for rows in old_by_key.values():
+        for row in rows:
+            plan["delete"].append(row["id"])
+            report["deleted"].append({k: row[k] for k in key})
+    plan["report"] = report
+    return plan
+
+
+def _apply_row_diff(conn: sqlite3.Connection, table: str, insert_sql: str, plan: dict[str, list]) -> list[int]:
+    """Run a ``_diff_rows`` plan against ``table``; returns the inserted ids."""
+    for row_id, changed in plan["update"]:
         conn.execute(
-            """UPDATE matches SET patch=:patch, date=:date, opponent=:opponent,
-               side=:side, result=:result, duration=:duration, notes=:notes
-               WHERE id=:id""",
-            {
-                "id": match_id,
-                "patch": data["patch"],
-                "date": data["date"],
-                "opponent": data["opponent"],
-                "side": data["side"],
-                "result": data["result"],
-                "duration": data.get("duration"),
-                "notes": data.get("notes"),
-            },
+            f"UPDATE {table} SET {', '.join(f'{column} = ?' for column in changed)} WHERE id = ?",
+            [*changed.values(), row_id],
         )
+    conn.executemany(f"DELETE FROM {table} WHERE id = ?", [(row_id,) for row_id in plan["delete"]])
+    return [conn.execute(insert_sql, values).lastrowid for values in plan["insert"]]
 
-        conn.execute("DELETE FROM match_players WHERE match_id = ?", (match_id,))
-        conn.execute("DELETE FROM bans WHERE match_id = ?", (match_id,))
 
-        _insert_players(conn, match_id, data.get("players", []))
-        _insert_bans(conn, match_id, data.get("bans", []))
-    _checkpoint()
-    return True
+def update_match(match_id: int, data: dict[str, Any]) -> dict[str, Any] | None:
+    """Bring a match in line with ``data``, touching only rows that changed.
+
+    Players are paired by ``(team, role)`` and bans by ``(team, ban_order)``;
+    only changed columns are updated, and only unpaired rows are inserted or
+    deleted. The summary tables are adjusted for the touched rows alone.
+    Returns what changed, or ``None`` if the match does not exist::
+
+        {"changed": bool, "match": [fields],
+         "players": {"updated": [...], "inserted": [...], "deleted": [...]},
+         "bans": {...}}
+    """
+    duration_s = _duration_seconds(data.get("duration"))
+    new_match = {field: data.get(field) for field in _MATCH_FIELDS}
+    new_match["duration_s"] = duration_s
+    with _connect() as conn:
+        old_match = conn.execute("SELECT * FROM matches WHERE id = ?", (match_id,)).fetchone()
+        if not old_match:
+            return None
+
+        match_changes = [field for field in _MATCH_FIELDS if old_match[field] != new_match[field]]
+        old_players = conn.execute(
+            "SELECT * FROM match_players WHERE match_id = ? ORDER BY id", (match_id,)
+        ).fetchall()
+        old_bans = conn.execute("SELECT * FROM bans WHERE match_id = ? ORDER BY id", (match_id,)).fetchall()
+        players = _diff_rows(
+            _PLAYER_COLUMNS, ("team", "role"), old_players,
+            _player_rows(match_id, data["date"], data.get("players", []), duration_s),
+        )
+        bans = _diff_rows(_BAN_COLUMNS, ("team", "ban_order"), old_bans, _ban_rows(match_id, data.get("bans", [])))
+
+        # Rows leave the summaries before they change and rejoin afterwards.
+        by_ids = "{}.id IN (SELECT value FROM json_each(?))"
+        regroup = bool(_SUMMARY_KEY_FIELDS.intersection(match_changes))
+        if regroup:
+            _remove_match_from_summaries(conn, match_id)
+        else:
+            stale_players = [row_id for row_id, _ in players["update"]] + players["delete"]
+            stale_bans = [row_id for row_id, _ in bans["update"]] + bans["delete"]
+            _apply_players_to_summaries(conn, by_ids.format("p"), (json.dumps(stale_players),), -1)
+            _apply_bans_to_summaries(conn, by_ids.format("b"), (json.dumps(stale_bans),), -1)
+
+        if match_changes:
+            conn.execute(
+                f"UPDATE matches SET {', '.join(f'{field} = ?' for field in match_changes)} WHERE id = ?",
+                [new_match[field] for field in match_changes] + [match_id],
+            )
+        new_player_ids = _apply_row_diff(conn, "match_players", _INSERT_PLAYER_SQL, players)
+        new_ban_ids = _apply_row_diff(conn, "bans", _INSERT_BAN_SQL, bans)
+
+        if regroup:
+            _add_match_to_summaries(conn, match_id)
+        else:
+            fresh_players = [row_id for row_id, _ in players["update"]] + new_player_ids
+            fresh_bans = [row_id for row_id, _ in bans["update"]] + new_ban_ids
+            _apply_players_to_summaries(conn, by_ids.format("p"), (json.dumps(fresh_players),), 1)
+            _apply_bans_to_summaries(conn, by_ids.format("b"), (json.dumps(fresh_bans),), 1)
+
+    report = {"match": match_changes, "players": players["report"], "bans": bans["report"]}
+    report["changed"] = bool(match_changes) or any(
+        entries for section in (players["report"], bans["report"]) for entries in section.values()
+    )
+    if report["changed"]:
+        _data_changed()
+    return report
 
 
 def list_matches(
@@ -265,8 +1142,75 @@ def list_matches(
     patch: str | None = None,
     side: str | None = None,
     result: str | None = None,
+    limit: int | None = None,
+    after: tuple[str, int] | None = None,
 ) -> list[dict[str, Any]]:
-    """List matches with optional filters. Returns matches with nested players/bans."""
+    """List matches with optional filters. Returns matches with nested players/bans.
+
+    Matches come newest first, ordered by ``(date, id)``. ``after`` is the
+    ``(date, id)`` of the last match of the previous page; together with
+    ``limit`` it seeks through ``idx_matches_date_id`` instead of skipping
+    rows, so every page costs the same.
+    """
+    clauses, params = _match_list_filters(opponent, date_from, date_to, patch, side, result)
+    if after is not None:
+        clauses.append("(date, id) < (?, ?)")
+        params.extend(after)
+
+    where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+    query = f"SELECT * FROM matches{where} ORDER BY date DESC, id DESC"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    with _connect() as conn:
+        matches = [dict(row) for row in conn.execute(query, params).fetchall()]
+        _attach_players_and_bans(conn, matches)
+        return matches
+
+
+EXPORT_CHUNK_SIZE = 200
+
+
+def iter_matches(
+    opponent: str | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    patch: str | None = None,
+    side: str | None = None,
+    result: str | None = None,
+) -> Iterator[dict[str, Any]]:
+    """Yield matches like ``list_matches``, one at a time, with flat memory use.
+
+    Runs on its own connection and read transaction (it usually outlives the
+    request that created it, e.g. as a streaming response body). Matches are
+    read from one cursor ``EXPORT_CHUNK_SIZE`` rows at a time and each chunk
+    gets its players and bans in bulk.
+    """
+    clauses, params = _match_list_filters(opponent, date_from, date_to, patch, side, result)
+    where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+    conn = _open_connection()
+    try:
+        conn.execute("BEGIN")
+        cursor = conn.execute(f"SELECT * FROM matches{where} ORDER BY date DESC, id DESC", params)
+        while True:
+            chunk = [dict(row) for row in cursor.fetchmany(EXPORT_CHUNK_SIZE)]
+            if not chunk:
+                break
+            _attach_players_and_bans(conn, chunk)
+            yield from chunk
+    finally:
+        conn.close()
+
+
+def _match_list_filters(
+    opponent: str | None,
+    date_from: str | None,
+    date_to: str | None,
+    patch: str | None,
+    side: str | None,
+    result: str | None,
+) -> tuple[list[str], list[Any]]:
     clauses: list[str] = []
     params: list[Any] = []
 
@@ -288,31 +1232,110 @@ def list_matches(
     if result:
         clauses.append("result = ?")
         params.append(result)
+    return clauses, params
+
+
+def _attach_players_and_bans(conn: sqlite3.Connection, matches: list[dict[str, Any]]) -> None:
+    """Fill ``players`` and ``bans`` on each match with one query per table.
+
+    The match ids go in as a single JSON array parameter, so the page size is
+    not bounded by SQLite's host-parameter limit.
+    """
+    by_id: dict[int, dict[str, Any]] = {}
+    for m in matches:
+        m["players"] = []
+        m["bans"] = []
+        by_id[m["id"]] = m
+    if not by_id:
+        return
+    ids = json.dumps(list(by_id))
+    for r in conn.execute(
+        "SELECT * FROM match_players WHERE match_id IN (SELECT value FROM json_each(?)) "
+        "ORDER BY match_id, team, role, id",
+        (ids,),
+    ):
+        by_id[r["match_id"]]["players"].append(dict(r))
+    for r in conn.execute(
+        "SELECT * FROM bans WHERE match_id IN (SELECT value FROM json_each(?)) "
+        "ORDER BY match_id, team, ban_order, id",
+        (ids,),
+    ):
+        by_id[r["match_id"]]["bans"].append(dict(r))
+
+
+# ---------------------------------------------------------------------------
+# Search
+# ---------------------------------------------------------------------------
+
+# bm25 weight of each match_search column: opponent, notes, champions.
+SEARCH_WEIGHTS = (2.0, 1.0, 1.0)
+# Marks FTS5 puts around matched terms; swapped for <mark> after escaping.
+_MARK_START, _MARK_END = "\x02", "\x03"
+
+
+def _index_for_search(conn: sqlite3.Connection, where: str, params: tuple) -> None:
+    """Add the selected matches (alias ``m``) to ``match_search``."""
+    conn.execute(
+        f"""INSERT INTO match_search (rowid, opponent, notes, champions)
+            SELECT m.id, m.opponent, m.notes,
+                   (SELECT group_concat(p.champion, ' ') FROM match_players p WHERE p.match_id = m.id)
+            FROM matches m
+            WHERE {where}""",
+        params,
+    )
+
+
+def _fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query: every word must match, the last one as a prefix.
+
+    Words are quoted, so FTS5 operators and punctuation typed by the user
+    are searched for literally instead of raising syntax errors.
+    """
+    words = ['"' + word.replace('"', '""') + '"' for word in text.split()]
+    if words:
+        words[-1] += "*"
+    return " ".join(words)
+
+
+def _marked_html(text: str | None) -> str | None:
+    if text is None:
+        return None
+    return html.escape(text).replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>")
 
-    where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
-    query = f"SELECT * FROM matches{where} ORDER BY date DESC, id DESC"
 
+def search_matches(query: str, limit: int = 20) -> list[dict[str, Any]]:
+    """Matches whose opponent, notes or picked champions match ``query``, best first.
+
+    ``opponent``, ``notes`` and ``champions`` come back HTML-escaped with the
+    matched terms wrapped in ``<mark>``; ``notes`` is cut to a snippet around
+    the matches.
+    """
+    fts_query = _fts_query(query)
+    if not fts_query:
+        return []
+    marks = f"'{_MARK_START}', '{_MARK_END}'"
+    weights = ", ".join(str(weight) for weight in SEARCH_WEIGHTS)
     with _connect() as conn:
-        rows = conn.execute(query, params).fetchall()
-        matches = []
-        for row in rows:
-            m = dict(row)
-            m["players"] = [
-                dict(r)
-                for r in conn.execute(
-                    "SELECT * FROM match_players WHERE match_id = ? ORDER BY team, role",
-                    (m["id"],),
-                ).fetchall()
-            ]
-            m["bans"] = [
-                dict(r)
-                for r in conn.execute(
-                    "SELECT * FROM bans WHERE match_id = ? ORDER BY team, ban_order",
-                    (m["id"],),
-                ).fetchall()
-            ]
-            matches.append(m)
-        return matches
+        rows = conn.execute(
+            f"""SELECT m.id, m.date, m.patch, m.side, m.result,
+                       highlight(match_search, 0, {marks}) AS opponent,
+                       snippet(match_search, 1, {marks}, '…', 24) AS notes,
+                       highlight(match_search, 2, {marks}) AS champions,
+                       -bm25(match_search, {weights}) AS score
+                FROM match_search
+                JOIN matches m ON m.id = match_search.rowid
+                WHERE match_search MATCH ?
+                ORDER BY bm25(match_search, {weights}), m.date DESC, m.id DESC
+                LIMIT ?""",
+            (fts_query, limit),
+        ).fetchall()
+    results = []
+    for row in rows:
+        match = dict(row)
+        for column in ("opponent", "notes", "champions"):
+            match[column] = _marked_html(match[column])
+        results.append(match)
+    return results
 
 
 # ---------------------------------------------------------------------------
@@ -343,43 +1366,152 @@ def _build_where(
     return where, params
 
 
-def get_stat_summary(
+# metric -> (expression over raw player rows, expression over champion_role_stats)
+_PLAYER_METRICS: dict[str, tuple[str, str]] = {
+    "games": ("COUNT(*)", "SUM(s.games)"),
+    "wins": (f"SUM({_TEAM_WON})", "SUM(s.wins)"),
+    "avg_kills": ("ROUND(AVG(p.kills), 1)", "ROUND(SUM(s.kills) * 1.0 / SUM(s.games), 1)"),
+    "avg_deaths": ("ROUND(AVG(p.deaths), 1)", "ROUND(SUM(s.deaths) * 1.0 / SUM(s.games), 1)"),
+    "avg_assists": ("ROUND(AVG(p.assists), 1)", "ROUND(SUM(s.assists) * 1.0 / SUM(s.games), 1)"),
+    "avg_kp": ("ROUND(AVG(p.kp_percent), 1)", "ROUND(SUM(s.kp_sum) / SUM(s.kp_count), 1)"),
+    "avg_gold": ("ROUND(AVG(p.gold_earned), 0)", "ROUND(SUM(s.gold_sum) / SUM(s.gold_count), 0)"),
+    "avg_gpm": ("ROUND(AVG(p.gpm), 0)", "ROUND(SUM(s.gpm_sum) / SUM(s.gpm_count), 0)"),
+    "avg_damage_dealt": ("ROUND(AVG(p.damage_dealt), 0)", "ROUND(SUM(s.dmg_dealt_sum) / SUM(s.dmg_dealt_count), 0)"),
+    "avg_damage_taken": ("ROUND(AVG(p.damage_taken), 0)", "ROUND(SUM(s.dmg_taken_sum) / SUM(s.dmg_taken_count), 0)"),
+    "avg_dmg_share": ("ROUND(AVG(p.dmg_share), 1)", "ROUND(SUM(s.dmg_share_sum) / SUM(s.dmg_share_count), 1)"),
+    "mvp_count": ("SUM(p.is_mvp)", "SUM(s.mvp)"),
+    "svp_count": ("SUM(p.is_svp)", "SUM(s.svp)"),
+    "total_awards": ("SUM(p.is_mvp + p.is_svp)", "SUM(s.mvp + s.svp)"),
+}
+
+_PER_GAME_METRICS = ["games", "wins", "avg_kills", "avg_deaths", "avg_assists", "avg_kp"]
+
+
+def _aggregate_players(
+    keys: list[str],
+    metrics: list[str],
+    order_by: str,
+    team: str | None = None,
     opponent: str | None = None,
     date_from: str | None = None,
     date_to: str | None = None,
     patch: str | None = None,
-) -> dict[str, Any]:
-    """Aggregated stats per role for our team: top champion, games, winrate, KDA, KP%."""
-    extra_where, params = _build_where(opponent, date_from, date_to, patch)
+    having: str = "",
+) -> list[sqlite3.Row]:
+    """``GROUP BY keys`` over player rows, optionally for one team.
 
+    Without a date filter this reads the pre-aggregated ``champion_role_stats``
+    rows; date filters need per-match dates, so they scan ``match_players``.
+    ``order_by`` and ``having`` refer to output column names.
+    """
+    query, params = _aggregate_players_query(
+        keys, metrics, order_by, team, opponent, date_from, date_to, patch, having
+    )
+    with _connect() as conn:
+        return conn.execute(query, params).fetchall()
+
+
+def _aggregate_players_query(
+    keys: list[str],
+    metrics: list[str],
+    order_by: str,
+    team: str | None = None,
+    opponent: str | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    patch: str | None = None,
+    having: str = "",
+) -> tuple[str, list[Any]]:
+    """SQL and parameters for ``_aggregate_players``, for use as a subquery."""
+    if date_from or date_to:
+        alias, source = "p", 0
+        extra_where, params = _build_where(opponent, date_from, date_to, patch)
+        from_clause = "match_players p JOIN matches m ON p.match_id = m.id"
+    else:
+        alias, source = "s", 1
+        extra_where, params = "", []
+        if opponent:
+            extra_where += " AND s.opponent = ?"
+            params.append(opponent)
+        if patch:
+            extra_where += " AND s.patch = ?"
+            params.append(patch)
+        from_clause = "champion_role_stats s"
+    if team:
+        extra_where = f" AND {alias}.team = ?{extra_where}"
+        params.insert(0, team)
+
+    columns = [f"{alias}.{key}" for key in keys]
+    columns += [f"{_PLAYER_METRICS[name][source]} as {name}" for name in metrics]
     query = f"""
-        SELECT
-            p.role,
-            p.champion,
-            COUNT(*) as games,
-            SUM(CASE WHEN m.result = 'win' THEN 1 ELSE 0 END) as wins,
-            ROUND(AVG(p.kills), 1) as avg_kills,
-            ROUND(AVG(p.deaths), 1) as avg_deaths,
-            ROUND(AVG(p.assists), 1) as avg_assists,
-            ROUND(AVG(p.kp_percent), 1) as avg_kp,
-            ROUND(AVG(p.gold_earned), 0) as avg_gold,
-            ROUND(AVG(
-                CASE WHEN m.duration IS NOT NULL AND p.gold_earned IS NOT NULL
-                THEN p.gold_earned / (
-                    CAST(SUBSTR(m.duration, 1, INSTR(m.duration, ':') - 1) AS REAL)
-                    + CAST(SUBSTR(m.duration, INSTR(m.duration, ':') + 1) AS REAL) / 60.0
-                )
-                END
-            ), 0) as avg_gpm
-        FROM match_players p
-        JOIN matches m ON p.match_id = m.id
-        WHERE p.team = 'ours'{extra_where}
-        GROUP BY p.role, p.champion
-        ORDER BY p.role, games DESC
+        SELECT {", ".join(columns)}
+        FROM {from_clause}
+        WHERE 1=1{extra_where}
+        GROUP BY {", ".join(f"{alias}.{key}" for key in keys)}
+        {f"HAVING {having}" if having else ""}
+        ORDER BY {order_by}
     """
+    return query, params
 
+
+def _aggregate_bans(
+    opponent: str | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    patch: str | None = None,
+) -> list[sqlite3.Row]:
+    """Ban counts per (champion, team); from ``champion_ban_stats`` unless date-filtered."""
+    query, params = _aggregate_bans_query(opponent, date_from, date_to, patch)
     with _connect() as conn:
-        rows = conn.execute(query, params).fetchall()
+        return conn.execute(query, params).fetchall()
+
+
+def _aggregate_bans_query(
+    opponent: str | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    patch: str | None = None,
+) -> tuple[str, list[Any]]:
+    """SQL and parameters for ``_aggregate_bans``, for use as a subquery."""
+    if date_from or date_to:
+        extra_where, params = _build_where(opponent, date_from, date_to, patch)
+        query = f"""
+            SELECT b.champion, b.team, COUNT(*) as ban_count
+            FROM bans b
+            JOIN matches m ON b.match_id = m.id
+            WHERE 1=1{extra_where}
+            GROUP BY b.champion, b.team
+        """
+    else:
+        extra_where, params = "", []
+        if opponent:
+            extra_where += " AND s.opponent = ?"
+            params.append(opponent)
+        if patch:
+            extra_where += " AND s.patch = ?"
+            params.append(patch)
+        query = f"""
+            SELECT s.champion, s.team, SUM(s.bans) as ban_count
+            FROM champion_ban_stats s
+            WHERE 1=1{extra_where}
+            GROUP BY s.champion, s.team
+        """
+    return query, params
+
+
+@_cached
+def get_stat_summary(
+    opponent: str | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    patch: str | None = None,
+) -> dict[str, Any]:
+    """Aggregated stats per role for our team: top champion, games, winrate, KDA, KP%."""
+    rows = _aggregate_players(
+        ["role", "champion"], [*_PER_GAME_METRICS, "avg_gold", "avg_gpm"], "role, games DESC, champion",
+        team="ours", opponent=opponent, date_from=date_from, date_to=date_to, patch=patch,
+    )
+    extra_where, params = _build_where(opponent, date_from, date_to, patch)
 
     result: dict[str, list[dict]] = {}
     for row in rows:
@@ -431,14 +1563,8 @@ def get_stat_summary(
     # Duration averages by result
     duration_query = f"""
         SELECT
-            AVG(CASE WHEN m.result = 'win' AND m.duration IS NOT NULL AND m.duration LIKE '%:%'
-                THEN CAST(SUBSTR(m.duration, 1, INSTR(m.duration, ':') - 1) AS INTEGER) * 60
-                   + CAST(SUBSTR(m.duration, INSTR(m.duration, ':') + 1) AS INTEGER)
-                END) as avg_win_duration_s,
-            AVG(CASE WHEN m.result = 'loss' AND m.duration IS NOT NULL AND m.duration LIKE '%:%'
-                THEN CAST(SUBSTR(m.duration, 1, INSTR(m.duration, ':') - 1) AS INTEGER) * 60
-                   + CAST(SUBSTR(m.duration, INSTR(m.duration, ':') + 1) AS INTEGER)
-                END) as avg_loss_duration_s
+            AVG(CASE WHEN m.result = 'win' THEN m.duration_s END) as avg_win_duration_s,
+            AVG(CASE WHEN m.result = 'loss' THEN m.duration_s END) as avg_loss_duration_s
         FROM matches m
         WHERE 1=1{extra_where}
     """
@@ -451,6 +1577,7 @@ def get_stat_summary(
     return {"roles": result, "overall": overall, "side_stats": side_stats}
 
 
+@_cached
 def get_role_averages(
     opponent: str | None = None,
     date_from: str | None = None,
@@ -458,45 +1585,13 @@ def get_role_averages(
     patch: str | None = None,
 ) -> list[dict[str, Any]]:
     """Aggregate stats per role (across all champions) for our team."""
-    extra_where, params = _build_where(opponent, date_from, date_to, patch)
-    query = f"""
-        SELECT
-            p.role,
-            COUNT(*) as games,
-            ROUND(AVG(p.kills), 1) as avg_kills,
-            ROUND(AVG(p.deaths), 1) as avg_deaths,
-            ROUND(AVG(p.assists), 1) as avg_assists,
-            ROUND(AVG(p.kp_percent), 1) as avg_kp,
-            ROUND(AVG(p.gold_earned), 0) as avg_gold,
-            ROUND(AVG(
-                CASE WHEN m.duration IS NOT NULL AND p.gold_earned IS NOT NULL
-                THEN p.gold_earned / (
-                    CAST(SUBSTR(m.duration, 1, INSTR(m.duration, ':') - 1) AS REAL)
-                    + CAST(SUBSTR(m.duration, INSTR(m.duration, ':') + 1) AS REAL) / 60.0
-                )
-                END
-            ), 0) as avg_gpm,
-            ROUND(AVG(p.damage_dealt), 0) as avg_damage_dealt,
-            ROUND(AVG(p.damage_taken), 0) as avg_damage_taken,
-            ROUND(AVG(
-                CASE WHEN td.total_dmg > 0 AND p.damage_dealt IS NOT NULL
-                THEN p.damage_dealt * 100.0 / td.total_dmg
-                END
-            ), 1) as avg_dmg_share
-        FROM match_players p
-        JOIN matches m ON p.match_id = m.id
-        JOIN (
-            SELECT match_id, SUM(damage_dealt) as total_dmg
-            FROM match_players
-            WHERE team = 'ours'
-            GROUP BY match_id
-        ) td ON p.match_id = td.match_id
-        WHERE p.team = 'ours'{extra_where}
-        GROUP BY p.role
-        ORDER BY p.role
-    """
-    with _connect() as conn:
-        rows = conn.execute(query, params).fetchall()
+    rows = _aggregate_players(
+        ["role"],
+        ["games", "avg_kills", "avg_deaths", "avg_assists", "avg_kp", "avg_gold", "avg_gpm",
+         "avg_damage_dealt", "avg_damage_taken", "avg_dmg_share"],
+        "role",
+        team="ours", opponent=opponent, date_from=date_from, date_to=date_to, patch=patch,
+    )
     result = []
     for row in rows:
         r = dict(row)
@@ -507,6 +1602,7 @@ def get_role_averages(
     return result
 
 
+@_cached
 def get_all_champions_by_role(
     opponent: str | None = None,
     date_from: str | None = None,
@@ -514,37 +1610,10 @@ def get_all_champions_by_role(
     patch: str | None = None,
 ) -> dict[str, list[dict[str, Any]]]:
     """Stats per champion per role for ALL teams (ours + theirs)."""
-    extra_where, params = _build_where(opponent, date_from, date_to, patch)
-    query = f"""
-        SELECT
-            p.role,
-            p.champion,
-            COUNT(*) as games,
-            SUM(CASE
-                WHEN p.team = 'ours' AND m.result = 'win' THEN 1
-                WHEN p.team = 'theirs' AND m.result = 'loss' THEN 1
-                ELSE 0
-            END) as wins,
-            ROUND(AVG(p.kills), 1) as avg_kills,
-            ROUND(AVG(p.deaths), 1) as avg_deaths,
-            ROUND(AVG(p.assists), 1) as avg_assists,
-            ROUND(AVG(p.kp_percent), 1) as avg_kp,
-            ROUND(AVG(
-                CASE WHEN m.duration IS NOT NULL AND p.gold_earned IS NOT NULL
-                THEN p.gold_earned / (
-                    CAST(SUBSTR(m.duration, 1, INSTR(m.duration, ':') - 1) AS REAL)
-                    + CAST(SUBSTR(m.duration, INSTR(m.duration, ':') + 1) AS REAL) / 60.0
-                )
-                END
-            ), 0) as avg_gpm
-        FROM match_players p
-        JOIN matches m ON p.match_id = m.id
-        WHERE 1=1{extra_where}
-        GROUP BY p.role, p.champion
-        ORDER BY p.role, games DESC
-    """
-    with _connect() as conn:
-        rows = conn.execute(query, params).fetchall()
+    rows = _aggregate_players(
+        ["role", "champion"], [*_PER_GAME_METRICS, "avg_gpm"], "role, games DESC, champion",
+        opponent=opponent, date_from=date_from, date_to=date_to, patch=patch,
+    )
     result: dict[str, list[dict]] = {}
     for row in rows:
         r = dict(row)
@@ -557,6 +1626,7 @@ def get_all_champions_by_role(
     return result
 
 
+@_cached
 def get_enemy_champions_by_role(
     opponent: str | None = None,
     date_from: str | None = None,
@@ -564,33 +1634,10 @@ def get_enemy_champions_by_role(
     patch: str | None = None,
 ) -> dict[str, list[dict[str, Any]]]:
     """Stats per champion per role for the enemy team (theirs) only."""
-    extra_where, params = _build_where(opponent, date_from, date_to, patch)
-    query = f"""
-        SELECT
-            p.role,
-            p.champion,
-            COUNT(*) as games,
-            SUM(CASE WHEN m.result = 'loss' THEN 1 ELSE 0 END) as wins,
-            ROUND(AVG(p.kills), 1) as avg_kills,
-            ROUND(AVG(p.deaths), 1) as avg_deaths,
-            ROUND(AVG(p.assists), 1) as avg_assists,
-            ROUND(AVG(p.kp_percent), 1) as avg_kp,
-            ROUND(AVG(
-                CASE WHEN m.duration IS NOT NULL AND p.gold_earned IS NOT NULL
-                THEN p.gold_earned / (
-                    CAST(SUBSTR(m.duration, 1, INSTR(m.duration, ':') - 1) AS REAL)
-                    + CAST(SUBSTR(m.duration, INSTR(m.duration, ':') + 1) AS REAL) / 60.0
-                )
-                END
-            ), 0) as avg_gpm
-        FROM match_players p
-        JOIN matches m ON p.match_id = m.id
-        WHERE p.team = 'theirs'{extra_where}
-        GROUP BY p.role, p.champion
-        ORDER BY p.role, games DESC
-    """
-    with _connect() as conn:
-        rows = conn.execute(query, params).fetchall()
+    rows = _aggregate_players(
+        ["role", "champion"], [*_PER_GAME_METRICS, "avg_gpm"], "role, games DESC, champion",
+        team="theirs", opponent=opponent, date_from=date_from, date_to=date_to, patch=patch,
+    )
     result: dict[str, list[dict]] = {}
     for row in rows:
         r = dict(row)
@@ -603,6 +1650,7 @@ def get_enemy_champions_by_role(
     return result
 
 
+@_cached
 def get_enemy_champions_general(
     opponent: str | None = None,
     date_from: str | None = None,
@@ -610,32 +1658,10 @@ def get_enemy_champions_general(
     patch: str | None = None,
 ) -> list[dict[str, Any]]:
     """Stats per champion across all roles for enemy team only (general enemy tier list)."""
-    extra_where, params = _build_where(opponent, date_from, date_to, patch)
-    query = f"""
-        SELECT
-            p.champion,
-            COUNT(*) as games,
-            SUM(CASE WHEN m.result = 'loss' THEN 1 ELSE 0 END) as wins,
-            ROUND(AVG(p.kills), 1) as avg_kills,
-            ROUND(AVG(p.deaths), 1) as avg_deaths,
-            ROUND(AVG(p.assists), 1) as avg_assists,
-            ROUND(AVG(p.kp_percent), 1) as avg_kp,
-            ROUND(AVG(
-                CASE WHEN m.duration IS NOT NULL AND p.gold_earned IS NOT NULL
-                THEN p.gold_earned / (
-                    CAST(SUBSTR(m.duration, 1, INSTR(m.duration, ':') - 1) AS REAL)
-                    + CAST(SUBSTR(m.duration, INSTR(m.duration, ':') + 1) AS REAL) / 60.0
-                )
-                END
-            ), 0) as avg_gpm
-        FROM match_players p
-        JOIN matches m ON p.match_id = m.id
-        WHERE p.team = 'theirs'{extra_where}
-        GROUP BY p.champion
-        ORDER BY games DESC
-    """
-    with _connect() as conn:
-        rows = conn.execute(query, params).fetchall()
+    rows = _aggregate_players(
+        ["champion"], [*_PER_GAME_METRICS, "avg_gpm"], "games DESC, champion",
+        team="theirs", opponent=opponent, date_from=date_from, date_to=date_to, patch=patch,
+    )
     result = []
     for row in rows:
         r = dict(row)
@@ -647,6 +1673,7 @@ def get_enemy_champions_general(
     return result
 
 
+@_cached
 def get_all_champions_general(
     opponent: str | None = None,
     date_from: str | None = None,
@@ -654,36 +1681,10 @@ def get_all_champions_general(
     patch: str | None = None,
 ) -> list[dict[str, Any]]:
     """Stats per champion across ALL roles and ALL teams (general tier list)."""
-    extra_where, params = _build_where(opponent, date_from, date_to, patch)
-    query = f"""
-        SELECT
-            p.champion,
-            COUNT(*) as games,
-            SUM(CASE
-                WHEN p.team = 'ours' AND m.result = 'win' THEN 1
-                WHEN p.team = 'theirs' AND m.result = 'loss' THEN 1
-                ELSE 0
-            END) as wins,
-            ROUND(AVG(p.kills), 1) as avg_kills,
-            ROUND(AVG(p.deaths), 1) as avg_deaths,
-            ROUND(AVG(p.assists), 1) as avg_assists,
-            ROUND(AVG(p.kp_percent), 1) as avg_kp,
-            ROUND(AVG(
-                CASE WHEN m.duration IS NOT NULL AND p.gold_earned IS NOT NULL
-                THEN p.gold_earned / (
-                    CAST(SUBSTR(m.duration, 1, INSTR(m.duration, ':') - 1) AS REAL)
-                    + CAST(SUBSTR(m.duration, INSTR(m.duration, ':') + 1) AS REAL) / 60.0
-                )
-                END
-            ), 0) as avg_gpm
-        FROM match_players p
-        JOIN matches m ON p.match_id = m.id
-        WHERE 1=1{extra_where}
-        GROUP BY p.champion
-        ORDER BY games DESC
-    """
-    with _connect() as conn:
-        rows = conn.execute(query, params).fetchall()
+    rows = _aggregate_players(
+        ["champion"], [*_PER_GAME_METRICS, "avg_gpm"], "games DESC, champion",
+        opponent=opponent, date_from=date_from, date_to=date_to, patch=patch,
+    )
     result = []
     for row in rows:
         r = dict(row)
@@ -695,135 +1696,160 @@ def get_all_champions_general(
     return result
 
 
+@_cached
 def get_champion_stats(
     opponent: str | None = None,
     date_from: str | None = None,
     date_to: str | None = None,
     patch: str | None = None,
 ) -> list[dict[str, Any]]:
-    """Per-champion aggregated stats across all roles."""
-    extra_where, params = _build_where(opponent, date_from, date_to, patch)
+    """Per-champion aggregated stats across all roles.
 
+    One statement (and one snapshot): per (champion, team, role) aggregates
+    rolled up per champion, joined with ban counts and the filtered match
+    count for presence.
+    """
+    roles_query, roles_params = _aggregate_players_query(
+        ["champion", "team", "role"], [*_PER_GAME_METRICS, "avg_gold", "avg_gpm"], "champion, team, role",
+        opponent=opponent, date_from=date_from, date_to=date_to, patch=patch,
+    )
+    bans_query, bans_params = _aggregate_bans_query(opponent, date_from, date_to, patch)
+    extra_where, match_params = _build_where(opponent, date_from, date_to, patch)
     query = f"""
+        WITH roles AS ({roles_query}),
+        ban_counts AS (
+            SELECT
+                champion,
+                SUM(CASE WHEN team = 'ours' THEN ban_count ELSE 0 END) AS our_bans,
+                SUM(CASE WHEN team = 'theirs' THEN ban_count ELSE 0 END) AS their_bans
+            FROM ({bans_query})
+            GROUP BY champion
+        ),
+        -- roles is ordered by (champion, team, role), so the GROUP BY streams.
+        per_champion AS (
+            SELECT
+                champion,
+                SUM(games) AS total_games,
+                SUM(wins) AS total_wins,
+                SUM(CASE WHEN team = 'ours' THEN games ELSE 0 END) AS our_picks,
+                SUM(CASE WHEN team = 'ours' THEN 0 ELSE games END) AS their_picks,
+                -- Weighted by games, over the roles that have GPM data.
+                SUM(CASE WHEN avg_gpm THEN avg_gpm * games END)
+                    / SUM(CASE WHEN avg_gpm THEN games END) AS avg_gpm,
+                json_group_object(team || '_' || role, json_object(
+                    'games', games,
+                    'wins', wins,
+                    'winrate', CASE WHEN games > 0 THEN wins * 1.0 / games * 100 ELSE 0 END,
+                    'avg_kills', avg_kills,
+                    'avg_deaths', avg_deaths,
+                    'avg_assists', avg_assists,
+                    'avg_kp', avg_kp
+                )) AS by_role
+            FROM roles
+            GROUP BY champion
+        )
         SELECT
-            p.champion,
-            p.team,
-            p.role,
-            COUNT(*) as games,
-            SUM(CASE
-                WHEN p.team = 'ours' AND m.result = 'win' THEN 1
-                WHEN p.team = 'theirs' AND m.result = 'loss' THEN 1
-                ELSE 0
-            END) as wins,
-            ROUND(AVG(p.kills), 1) as avg_kills,
-            ROUND(AVG(p.deaths), 1) as avg_deaths,
-            ROUND(AVG(p.assists), 1) as avg_assists,
-            ROUND(AVG(p.kp_percent), 1) as avg_kp,
-            ROUND(AVG(p.gold_earned), 0) as avg_gold,
-            ROUND(AVG(
-                CASE WHEN m.duration IS NOT NULL AND p.gold_earned IS NOT NULL
-                THEN p.gold_earned / (
-                    CAST(SUBSTR(m.duration, 1, INSTR(m.duration, ':') - 1) AS REAL)
-                    + CAST(SUBSTR(m.duration, INSTR(m.duration, ':') + 1) AS REAL) / 60.0
-                )
-                END
-            ), 0) as avg_gpm
-        FROM match_players p
-        JOIN matches m ON p.match_id = m.id
-        WHERE 1=1{extra_where}
-        GROUP BY p.champion, p.team, p.role
-        ORDER BY p.champion, p.team, p.role
+            c.champion,
+            c.total_games,
+            c.total_wins,
+            c.our_picks,
+            c.their_picks,
+            COALESCE(b.our_bans, 0) AS our_bans,
+            COALESCE(b.their_bans, 0) AS their_bans,
+            c.by_role,
+            CASE WHEN c.total_games > 0 THEN c.total_wins * 1.0 / c.total_games * 100 ELSE 0 END AS winrate,
+            (c.total_games + COALESCE(b.our_bans + b.their_bans, 0)) * 1.0
+                / MAX((SELECT COUNT(*) FROM matches m WHERE 1=1{extra_where}), 1) * 100 AS presence,
+            c.avg_gpm
+        FROM per_champion c
+        LEFT JOIN ban_counts b ON b.champion = c.champion
+        ORDER BY c.total_games DESC, c.champion
     """
-
     with _connect() as conn:
-        rows = conn.execute(query, params).fetchall()
-
-    # Also get ban counts
-    ban_query = f"""
-        SELECT b.champion, b.team, COUNT(*) as ban_count
-        FROM bans b
-        JOIN matches m ON b.match_id = m.id
-        WHERE 1=1{extra_where}
-        GROUP BY b.champion, b.team
-    """
-    with _connect() as conn:
-        ban_rows = conn.execute(ban_query, params).fetchall()
+        rows = conn.execute(query, [*roles_params, *bans_params, *match_params]).fetchall()
+    # Rounded here, like every other winrate, so values match across tabs.
+    result = []
+    for row in rows:
+        champion = dict(row)
+        # json_group_object keeps no promised order; keys are "team_role".
+        champion["by_role"] = dict(sorted(json.loads(champion["by_role"]).items()))
+        for role in champion["by_role"].values():
+            role["winrate"] = round(role["winrate"], 1)
+        champion["winrate"] = round(champion["winrate"], 1)
+        champion["presence"] = round(champion["presence"], 1)
+        champion["avg_gpm"] = round(champion["avg_gpm"]) if champion["avg_gpm"] is not None else None
+        result.append(champion)
+    return result
 
-    ban_map: dict[str, dict[str, int]] = {}
-    for br in ban_rows:
-        b = dict(br)
-        ban_map.setdefault(b["champion"], {})[b["team"]] = b["ban_count"]
 
-    # Total matches for presence calculation
-    total_query = f"""
-        SELECT COUNT(*) as total FROM matches m WHERE 1=1{extra_where}
-    """
-    with _connect() as conn:
-        total_matches = conn.execute(total_query, params).fetchone()["total"]
+# Quantiles reported by get_stat_distributions.
+DISTRIBUTION_QUANTILES = {"p25": 0.25, "median": 0.5, "p75": 0.75, "p90": 0.9}
 
-    # Aggregate by champion
-    champ_data: dict[str, dict] = {}
-    for row in rows:
-        r = dict(row)
-        champ = r["champion"]
-        if champ not in champ_data:
-            champ_data[champ] = {
-                "champion": champ,
-                "total_games": 0,
-                "total_wins": 0,
-                "our_picks": 0,
-                "their_picks": 0,
-                "our_bans": ban_map.get(champ, {}).get("ours", 0),
-                "their_bans": ban_map.get(champ, {}).get("theirs", 0),
-                "by_role": {},
-                "_gpm_sum": 0,
-                "_gpm_count": 0,
-            }
 
-        cd = champ_data[champ]
-        cd["total_games"] += r["games"]
-        cd["total_wins"] += r["wins"]
-        if r["avg_gpm"]:
-            cd["_gpm_sum"] += r["avg_gpm"] * r["games"]
-            cd["_gpm_count"] += r["games"]
-        if r["team"] == "ours":
-            cd["our_picks"] += r["games"]
-        else:
-            cd["their_picks"] += r["games"]
+@_cached
+def get_stat_distributions(
+    team: str | None = None,
+    role: str | None = None,
+    champion: str | None = None,
+    opponent: str | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    patch: str | None = None,
+) -> list[dict[str, Any]]:
+    """p25/median/p75/p90 of kills, deaths, damage and gold per (champion, team, role).
 
-        role_key = f"{r['team']}_{r['role']}"
-        cd["by_role"][role_key] = {
-            "games": r["games"],
-            "wins": r["wins"],
-            "winrate": round(r["wins"] / r["games"] * 100, 1) if r["games"] > 0 else 0,
-            "avg_kills": r["avg_kills"],
-            "avg_deaths": r["avg_deaths"],
-            "avg_assists": r["avg_assists"],
-            "avg_kp": r["avg_kp"],
-        }
+    Without a date or opponent filter the stored ``champion_role_sketches``
+    are merged across patches; otherwise the raw player rows are streamed
+    into fresh sketches. Quantiles are within 1% of a real value (see
+    ``app/quantile_sketch.py``). Rows come most played first.
+    """
+    filters = [(column, value) for column, value in (("team", team), ("role", role), ("champion", champion)) if value]
+    raw = bool(date_from or date_to or opponent)
+    if raw:
+        extra_where, params = _build_where(opponent, date_from, date_to, patch)
+        source, alias = "match_players p JOIN matches m ON p.match_id = m.id", "p"
+    else:
+        filters += [("patch", patch)] if patch else []
+        extra_where, params = "", []
+        source, alias = "champion_role_sketches s", "s"
+    extra_where += "".join(f" AND {alias}.{column} = ?" for column, _ in filters)
+    params += [value for _, value in filters]
+
+    merged: dict[tuple[str, str, str], list[QuantileSketch]] = {}
+    with _connect() as conn:
+        for row in conn.execute(
+            f"""SELECT {alias}.champion, {alias}.team, {alias}.role,
+                       {", ".join(f"{alias}.{column}" for column in _SKETCH_STATS)}
+                FROM {source}
+                WHERE 1=1{extra_where}""",
+            params,
+        ):
+            sketches = merged.get((row[0], row[1], row[2]))
+            if sketches is None:
+                sketches = merged[(row[0], row[1], row[2])] = [QuantileSketch() for _ in _SKETCH_STATS]
+            for sketch, value in zip(sketches, row[3:]):
+                if raw:
+                    sketch.add(value)
+                else:
+                    sketch.merge_bytes(value)
 
     result = []
-    for cd in champ_data.values():
-        cd["winrate"] = (
-            round(cd["total_wins"] / cd["total_games"] * 100, 1)
-            if cd["total_games"] > 0
-            else 0
-        )
-        total_bans = cd["our_bans"] + cd["their_bans"]
-        cd["presence"] = (
-            round((cd["total_games"] + total_bans) / max(total_matches, 1) * 100, 1)
-        )
-        cd["avg_gpm"] = (
-            round(cd["_gpm_sum"] / cd["_gpm_count"]) if cd["_gpm_count"] > 0 else None
-        )
-        del cd["_gpm_sum"]
-        del cd["_gpm_count"]
-        result.append(cd)
-
-    result.sort(key=lambda x: x["total_games"], reverse=True)
+    for (champ, team_name, role_name), sketches in merged.items():
+        entry: dict[str, Any] = {"champion": champ, "team": team_name, "role": role_name, "games": sketches[0].count}
+        for stat, sketch in zip(_SKETCH_STATS, sketches):
+            # Kills and deaths are integers, and an estimate within 1% of an
+            # integer below 50 rounds back to it; damage and gold are shown to
+            # the unit, like their averages.
+            values = sketch.quantiles(list(DISTRIBUTION_QUANTILES.values()))
+            entry[stat] = {
+                name: None if value is None else round(value) for name, value in zip(DISTRIBUTION_QUANTILES, values)
+            }
+        result.append(entry)
+    result.sort(key=lambda entry: (-entry["games"], entry["champion"], entry["team"], entry["role"]))
     return result
 
 
+@_cached
 def get_opponents() -> list[str]:
     """Return list of distinct opponent names."""
     with _connect() as conn:
@@ -833,6 +1859,7 @@ def get_opponents() -> list[str]:
         return [r["opponent"] for r in rows]
 
 
+@_cached
 def get_patches() -> list[str]:
     """Return list of distinct patches."""
     with _connect() as conn:
@@ -846,6 +1873,7 @@ def get_patches() -> list[str]:
 # Advanced stats
 # ---------------------------------------------------------------------------
 
+@_cached
 def get_matchups(
     opponent: str | None = None,
     date_from: str | None = None,
@@ -883,6 +1911,7 @@ def get_matchups(
     return result
 
 
+@_cached
 def get_duos(
     opponent: str | None = None,
     date_from: str | None = None,
@@ -921,6 +1950,7 @@ def get_duos(
     return result
 
 
+@_cached
 def get_mvp_svp_summary(
     opponent: str | None = None,
     date_from: str | None = None,
@@ -928,40 +1958,19 @@ def get_mvp_svp_summary(
     patch: str | None = None,
 ) -> dict[str, Any]:
     """Count MVP and SVP awards per role and per champion for our team."""
-    extra_where, params = _build_where(opponent, date_from, date_to, patch)
-    role_query = f"""
-        SELECT
-            p.role,
-            SUM(p.is_mvp) as mvp_count,
-            SUM(p.is_svp) as svp_count,
-            SUM(p.is_mvp + p.is_svp) as total_awards,
-            COUNT(*) as games
-        FROM match_players p
-        JOIN matches m ON p.match_id = m.id
-        WHERE p.team = 'ours'{extra_where}
-        GROUP BY p.role
-        ORDER BY total_awards DESC
-    """
-    champ_query = f"""
-        SELECT
-            p.champion,
-            p.role,
-            SUM(p.is_mvp) as mvp_count,
-            SUM(p.is_svp) as svp_count,
-            COUNT(*) as games
-        FROM match_players p
-        JOIN matches m ON p.match_id = m.id
-        WHERE p.team = 'ours'{extra_where}
-        GROUP BY p.champion, p.role
-        HAVING (mvp_count + svp_count) > 0
-        ORDER BY (mvp_count + svp_count) DESC, mvp_count DESC
-    """
-    with _connect() as conn:
-        role_rows = [dict(r) for r in conn.execute(role_query, params).fetchall()]
-        champ_rows = [dict(r) for r in conn.execute(champ_query, params).fetchall()]
-    return {"by_role": role_rows, "by_champion": champ_rows}
+    filters = dict(team="ours", opponent=opponent, date_from=date_from, date_to=date_to, patch=patch)
+    role_rows = _aggregate_players(
+        ["role"], ["mvp_count", "svp_count", "total_awards", "games"], "total_awards DESC, role", **filters
+    )
+    champ_rows = _aggregate_players(
+        ["champion", "role"], ["mvp_count", "svp_count", "games"],
+        "(mvp_count + svp_count) DESC, mvp_count DESC, champion, role",
+        having="(mvp_count + svp_count) > 0", **filters,
+    )
+    return {"by_role": [dict(r) for r in role_rows], "by_champion": [dict(r) for r in champ_rows]}
 
 
+@_cached
 def get_pick_priority(
     opponent: str | None = None,
     date_from: str | None = None,
@@ -995,6 +2004,141 @@ def get_pick_priority(
     return result
 
 
+# One row per (group, game) for each get_form grouping: grp, game_date, seq
+# (tie-break within a date), won, kills, deaths, assists, gpm. Role and
+# champion form follow one team's player; opponent form sums the team's
+# players per match.
+_FORM_GAMES = {
+    "role": f"""
+        SELECT p.role AS grp, p.match_date AS game_date, p.id AS seq, {_TEAM_WON} AS won,
+               p.kills, p.deaths, p.assists, p.gpm
+        FROM match_players p
+        JOIN matches m ON p.match_id = m.id
+        WHERE p.team = ?{{where}}""",
+    "champion": f"""
+        SELECT p.champion AS grp, p.match_date AS game_date, p.id AS seq, {_TEAM_WON} AS won,
+               p.kills, p.deaths, p.assists, p.gpm
+        FROM match_players p
+        JOIN matches m ON p.match_id = m.id
+        WHERE p.team = ?{{where}}""",
+    "opponent": f"""
+        SELECT m.opponent AS grp, m.date AS game_date, m.id AS seq, MAX({_TEAM_WON}) AS won,
+               SUM(p.kills) AS kills, SUM(p.deaths) AS deaths, SUM(p.assists) AS assists, AVG(p.gpm) AS gpm
+        FROM match_players p
+        JOIN matches m ON p.match_id = m.id
+        WHERE p.team = ?{{where}}
+        GROUP BY m.id""",
+}
+
+
+@_cached
+def get_form(
+    by: str = "role",
+    window: int = 10,
+    points: int = 20,
+    team: str = "ours",
+    role: str | None = None,
+    opponent: str | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    patch: str | None = None,
+) -> list[dict[str, Any]]:
+    """Recent form per role, champion or opponent (``by``) over the last ``window`` games.
+
+    ``form`` holds the last-``window`` winrate, KDA, kills/deaths/assists and
+    GPM next to the all-time ``winrate``. ``series`` holds the latest
+    ``points`` games oldest first: date, result, and the rolling winrate and
+    KDA over the ``window`` games ending at each one, for sparklines. All of
+    it comes out of window functions in one statement; role windows walk
+    ``idx_match_players_team_role_date`` in order.
+    """
+    if by not in _FORM_GAMES:
+        raise ValueError(f"Unknown form grouping: {by}")
+    extra_where, filter_params = _build_where(opponent, date_from, date_to, patch)
+    if role:
+        extra_where += " AND p.role = ?"
+        filter_params.append(role)
+    games = _FORM_GAMES[by].format(where=extra_where)
+    query = f"""
+        WITH games AS ({games}),
+        ranked AS (
+            SELECT
+                *,
+                ROW_NUMBER() OVER newest_first AS recency,
+                COUNT(*) OVER whole_history AS total_games,
+                AVG(won) OVER whole_history AS overall_winrate
+            FROM games
+            WINDOW newest_first AS (PARTITION BY grp ORDER BY game_date DESC, seq DESC),
+                   whole_history AS (newest_first ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING)
+        ),
+        -- Only the games that feed the last ``points`` windows are rolled.
+        rolling AS (
+            SELECT
+                grp, game_date, seq, won, recency, total_games, overall_winrate,
+                COUNT(*) OVER last_games AS window_games,
+                AVG(won) OVER last_games AS rolling_winrate,
+                SUM(kills + assists) OVER last_games * 1.0 / MAX(SUM(deaths) OVER last_games, 1) AS rolling_kda,
+                AVG(kills) OVER last_games AS rolling_kills,
+                AVG(deaths) OVER last_games AS rolling_deaths,
+                AVG(assists) OVER last_games AS rolling_assists,
+                AVG(gpm) OVER last_games AS rolling_gpm
+            FROM ranked
+            WHERE recency < ? + ?
+            WINDOW last_games AS (PARTITION BY grp ORDER BY recency DESC ROWS BETWEEN ? PRECEDING AND CURRENT ROW)
+        ),
+        series AS (
+            SELECT * FROM rolling WHERE recency <= ?
+        )
+        SELECT
+            grp,
+            MAX(total_games) AS games,
+            ROUND(MAX(overall_winrate) * 100, 1) AS winrate,
+            MAX(CASE WHEN recency = 1 THEN window_games END) AS window_games,
+            ROUND(MAX(CASE WHEN recency = 1 THEN rolling_winrate END) * 100, 1) AS form_winrate,
+            ROUND(MAX(CASE WHEN recency = 1 THEN rolling_kda END), 2) AS form_kda,
+            ROUND(MAX(CASE WHEN recency = 1 THEN rolling_kills END), 1) AS form_kills,
+            ROUND(MAX(CASE WHEN recency = 1 THEN rolling_deaths END), 1) AS form_deaths,
+            ROUND(MAX(CASE WHEN recency = 1 THEN rolling_assists END), 1) AS form_assists,
+            ROUND(MAX(CASE WHEN recency = 1 THEN rolling_gpm END), 0) AS form_gpm,
+            -- json_group_array's order is unspecified; each point carries its
+            -- recency and is sorted oldest first below.
+            json_group_array(
+                json_array(recency, game_date, won, ROUND(rolling_winrate * 100, 1), ROUND(rolling_kda, 2))
+            ) AS series
+        FROM series
+        GROUP BY grp
+        ORDER BY games DESC, grp
+    """
+    with _connect() as conn:
+        rows = conn.execute(query, [team, *filter_params, window, points, window - 1, points]).fetchall()
+    series = {
+        r["grp"]: sorted(json.loads(r["series"]), key=lambda point: point[0], reverse=True) for r in rows
+    }
+    return [
+        {
+            by: r["grp"],
+            "games": r["games"],
+            "winrate": r["winrate"],
+            "window_games": r["window_games"],
+            "form": {
+                "winrate": r["form_winrate"],
+                "kda": r["form_kda"],
+                "kills": r["form_kills"],
+                "deaths": r["form_deaths"],
+                "assists": r["form_assists"],
+                "gpm": r["form_gpm"],
+            },
+            "series": {
+                "dates": [point[1] for point in series[r["grp"]]],
+                "results": [point[2] for point in series[r["grp"]]],
+                "winrate": [point[3] for point in series[r["grp"]]],
+                "kda": [point[4] for point in series[r["grp"]]],
+            },
+        }
+        for r in rows
+    ]
+
+
 # ---------- Team Rosters ---------- #
 
 
@@ -1009,9 +2153,11 @@ def upsert_team_roster(team_name: str, players: list[str]) -> None:
                     "INSERT INTO team_rosters (team_name, player_nick) VALUES (?, ?)",
                     (team_name, nick),
                 )
-        conn.commit()
+    _data_changed()
+    _rosters_changed()
 
 
+@_cached
 def get_all_rosters() -> dict[str, list[str]]:
     """Return {team_name: [player_nick, ...]}."""
     with _connect() as conn:
@@ -1024,6 +2170,86 @@ def get_all_rosters() -> dict[str, list[str]]:
     return result
 
 
+def _nick_base(nick: str) -> str:
+    """``nick`` without its ``#TAG``."""
+    return nick.split("#")[0].strip() if "#" in nick else nick
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class _RosterIndex:
+    """In-memory lookup over ``team_rosters`` for ``find_teams_by_players``.
+
+    Roster rows are numbered in table order. ``full`` and ``base`` map a
+    lowercased nick (with and without ``#TAG``) to its rows; ``trigrams`` maps
+    every 3-gram of a base nick (3+ chars) to its rows, so partial matches come
+    from intersecting a few small sets instead of scanning every roster.
+    """
+
+    def __init__(self, rows: Iterable[tuple[str, str]]) -> None:
+        self.teams: list[str] = []
+        self.bases: list[str] = []
+        self.full: dict[str, list[int]] = {}
+        self.base: dict[str, list[int]] = {}
+        self.trigrams: dict[str, set[int]] = {}
+        self.longest_base = 0
+        for i, (team, nick) in enumerate(rows):
+            nick = nick.strip().lower()
+            base = _nick_base(nick)
+            self.teams.append(team)
+            self.bases.append(base)
+            self.full.setdefault(nick, []).append(i)
+            if base:
+                self.base.setdefault(base, []).append(i)
+            if len(base) >= 3:
+                self.longest_base = max(self.longest_base, len(base))
+                for gram in _trigrams(base):
+                    self.trigrams.setdefault(gram, set()).add(i)
+
+    def match(self, nick: str) -> set[int]:
+        """Rows matching ``nick`` exactly, without tags, or partially (3+ chars)."""
+        base = _nick_base(nick)
+        rows = set(self.full.get(nick, ()))
+        if base:
+            rows.update(self.base.get(base, ()))
+        if len(base) < 3:
+            return rows
+        # Roster nicks containing the input: every input trigram must be there.
+        postings = sorted((self.trigrams.get(gram, set()) for gram in _trigrams(base)), key=len)
+        if postings[0]:
+            rows.update(i for i in postings[0].intersection(*postings[1:]) if base in self.bases[i])
+        # Roster nicks contained in the input: look up each substring.
+        for length in range(3, min(len(base), self.longest_base) + 1):
+            for start in range(len(base) - length + 1):
+                rows.update(self.base.get(base[start:start + length], ()))
+        return rows
+
+
+# Bumped on every roster write; the index is rebuilt when it falls behind.
+_roster_generation = 0
+_roster_index: tuple[tuple[str, int], _RosterIndex] | None = None
+_roster_index_lock = threading.Lock()
+
+
+def _rosters_changed() -> None:
+    global _roster_generation
+    with _roster_index_lock:
+        _roster_generation += 1
+
+
+def _get_roster_index() -> _RosterIndex:
+    global _roster_index
+    with _roster_index_lock:
+        key = (str(DB_PATH), _roster_generation)
+        if _roster_index is None or _roster_index[0] != key:
+            with _connect() as conn:
+                rows = conn.execute("SELECT team_name, player_nick FROM team_rosters").fetchall()
+            _roster_index = (key, _RosterIndex((row["team_name"], row["player_nick"]) for row in rows))
+        return _roster_index[1]
+
+
 def find_teams_by_players(nicks: list[str]) -> list[tuple[str, int]]:
     """Find teams matching given player nicks. Returns [(team_name, match_count)] sorted by matches desc.
 
@@ -1031,49 +2257,19 @@ def find_teams_by_players(nicks: list[str]) -> list[tuple[str, int]]:
     1. Exact match (case-insensitive)
     2. Match without #TAG (e.g. "Dokja" matches "Dokja#123")
     3. Nick contains or is contained in roster entry (partial match)
+
+    Each roster entry counts once, however many input nicks match it. Lookups
+    go through an in-memory index that is rebuilt only after roster writes.
     """
     if not nicks:
         return []
 
-    # Load all rosters
-    with _connect() as conn:
-        all_rows = conn.execute(
-            "SELECT team_name, player_nick FROM team_rosters"
-        ).fetchall()
-
-    if not all_rows:
-        return []
-
-    # Build lookup: team -> set of normalized nicks (with and without tag)
-    from collections import Counter
-    team_matches: Counter[str] = Counter()
-
-    # Normalize input nicks
-    input_nicks = [n.strip().lower() for n in nicks if n and n.strip()]
-    # Also strip #TAG from input nicks
-    input_nicks_base = []
-    for n in input_nicks:
-        input_nicks_base.append(n.split("#")[0].strip() if "#" in n else n)
-
-    for row in all_rows:
-        team = row["team_name"]
-        roster_nick = row["player_nick"].strip().lower()
-        roster_base = roster_nick.split("#")[0].strip() if "#" in roster_nick else roster_nick
-
-        for i, inp in enumerate(input_nicks):
-            inp_base = input_nicks_base[i]
-            # Exact match (full nick with tag)
-            if inp == roster_nick:
-                team_matches[team] += 1
-                break
-            # Base name match (without #TAG)
-            if inp_base and roster_base and inp_base == roster_base:
-                team_matches[team] += 1
-                break
-            # Partial match: input contains roster base or vice versa (min 3 chars)
-            if len(inp_base) >= 3 and len(roster_base) >= 3:
-                if inp_base in roster_base or roster_base in inp_base:
-                    team_matches[team] += 1
-                    break
+    index = _get_roster_index()
+    matched: set[int] = set()
+    for nick in nicks:
+        if nick and nick.strip():
+            matched |= index.match(nick.strip().lower())
 
+    # Count in table order so ties keep the order the table scan gave them.
+    team_matches: Counter[str] = Counter(index.teams[i] for i in sorted(matched))
     return team_matches.most_common()
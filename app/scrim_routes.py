@@ -2,17 +2,27 @@
 
 from __future__ import annotations
 
+import base64
+import csv
+import io
 import json
 import logging
 import os
+import sqlite3
+import time
 from pathlib import Path
-from typing import Any
+from typing import IO, Any, Callable, Iterator, Literal
 
-from fastapi import APIRouter, Depends, Form, Header, HTTPException, UploadFile, File
-from pydantic import BaseModel, field_validator
+from fastapi import APIRouter, Depends, Form, Header, HTTPException, Query, UploadFile, File
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError, field_validator
 
 from app.scrim_db import (
+    cache_stats,
+    db_read_session,
+    db_session,
     delete_match,
+    end_read_session,
     find_teams_by_players,
     get_all_champions_by_role,
     get_all_champions_general,
@@ -21,6 +31,7 @@ from app.scrim_db import (
     get_duos,
     get_enemy_champions_by_role,
     get_enemy_champions_general,
+    get_form,
     get_match,
     get_matchups,
     get_mvp_svp_summary,
@@ -28,18 +39,34 @@ from app.scrim_db import (
     get_patches,
     get_pick_priority,
     get_role_averages,
+    get_stat_distributions,
     get_stat_summary,
+    import_matches,
     insert_match,
+    iter_matches,
     list_matches,
+    search_matches,
     update_match,
     upsert_team_roster,
 )
-from app.fetch_cn_meta import DISPLAY_NAME_OVERRIDES, HERO_MAP_CACHE_PATH, fetch_hero_map_from_gtimg
+from app.fetch_cn_meta import (
+    DISPLAY_NAME_OVERRIDES,
+    HERO_MAP_CACHE_PATH,
+    fetch_hero_map_from_gtimg_async,
+    request_priority,
+)
+from app.response_format import NegotiatedRoute, ResponseFormat, format_rows
 
 logger = logging.getLogger(__name__)
 
 SCRIM_PIN = os.environ.get("SCRIM_PIN", "")
 
+DEFAULT_MATCH_PAGE_SIZE = 50
+MAX_MATCH_PAGE_SIZE = 200
+MAX_SEARCH_RESULTS = 100
+MAX_FORM_WINDOW = 50
+MAX_FORM_POINTS = 100
+
 
 def _check_pin(x_scrim_pin: str | None = Header(default=None)) -> None:
     if SCRIM_PIN and x_scrim_pin != SCRIM_PIN:
@@ -61,7 +88,11 @@ def _normalize_match_data(data: dict) -> dict:
             b["champion"] = _normalize_champion_name(b["champion"])
     return data
 
-router = APIRouter(dependencies=[Depends(_check_pin)])
+router = APIRouter(dependencies=[Depends(_check_pin), Depends(db_session)], route_class=NegotiatedRoute)
+# Aggregation and search routes only read: they run on the read-only connection pool.
+analytics_router = APIRouter(
+    dependencies=[Depends(_check_pin), Depends(db_read_session)], route_class=NegotiatedRoute
+)
 
 VALID_ROLES = {"top", "jungle", "mid", "bot", "support"}
 VALID_SIDES = {"blue", "red"}
@@ -146,7 +177,7 @@ class MatchInput(BaseModel):
 # Champions endpoint (reuses hero map)
 # ---------------------------------------------------------------------------
 
-def _load_hero_map() -> dict[str, Any]:
+async def _load_hero_map() -> dict[str, Any]:
     """Load hero map from cache or network."""
     if HERO_MAP_CACHE_PATH.exists():
         try:
@@ -157,24 +188,25 @@ def _load_hero_map() -> dict[str, Any]:
                 return hero_map
         except Exception:
             pass
-    return fetch_hero_map_from_gtimg()
+    return await fetch_hero_map_from_gtimg_async()
 
 
 @router.get("/api/champions")
-def api_champions() -> list[dict[str, str]]:
+async def api_champions() -> list[dict[str, str]]:
     """Return the list of Wild Rift champions from the hero map cache."""
     try:
-        hero_map = _load_hero_map()
+        hero_map = await _load_hero_map()
         return _hero_map_to_list(hero_map)
     except Exception as exc:
         raise HTTPException(status_code=502, detail=f"Could not load champion list: {exc}") from exc
 
 
 @router.get("/api/champions/refresh")
-def api_champions_refresh() -> dict[str, Any]:
+async def api_champions_refresh() -> dict[str, Any]:
     """Force refresh the hero map cache and return updated champion list."""
     try:
-        hero_map = fetch_hero_map_from_gtimg(force_refresh=True)
+        with request_priority("interactive"):
+            hero_map = await fetch_hero_map_from_gtimg_async(force_refresh=True)
         champions = _hero_map_to_list(hero_map)
         return {"message": f"Refreshed {len(champions)} champions", "champions": champions}
     except Exception as exc:
@@ -209,6 +241,22 @@ def create_match(body: MatchInput) -> dict[str, Any]:
     return {"id": match_id, "message": "Match created"}
 
 
+def _encode_match_cursor(match: dict[str, Any]) -> str:
+    raw = json.dumps([match["date"], match["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_match_cursor(cursor: str) -> tuple[str, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        date, match_id = json.loads(raw)
+        if not isinstance(date, str) or not isinstance(match_id, int):
+            raise ValueError
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return date, match_id
+
+
 @router.get("/api/scrims/matches")
 def api_list_matches(
     opponent: str | None = None,
@@ -217,15 +265,42 @@ def api_list_matches(
     patch: str | None = None,
     side: str | None = None,
     result: str | None = None,
+    page_size: int | None = Query(None, ge=1, le=MAX_MATCH_PAGE_SIZE),
+    cursor: str | None = None,
+) -> list[dict[str, Any]] | dict[str, Any]:
+    """All matching matches, or one page of them when ``page_size``/``cursor`` is given.
+
+    Paginated responses are ``{"items": [...], "next_cursor": ...}``; pass
+    ``next_cursor`` back (with the same filters) to get the following page.
+    ``next_cursor`` is ``null`` on the last page.
+    """
+    filters = dict(opponent=opponent, date_from=date_from, date_to=date_to, patch=patch, side=side, result=result)
+    if page_size is None and cursor is None:
+        return list_matches(**filters)
+
+    size = page_size or DEFAULT_MATCH_PAGE_SIZE
+    after = _decode_match_cursor(cursor) if cursor else None
+    items = list_matches(**filters, limit=size + 1, after=after)
+    has_more = len(items) > size
+    items = items[:size]
+    return {
+        "items": items,
+        "next_cursor": _encode_match_cursor(items[-1]) if has_more else None,
+    }
+
+
+@analytics_router.get("/api/scrims/search")
+def api_search_matches(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=MAX_SEARCH_RESULTS),
 ) -> list[dict[str, Any]]:
-    return list_matches(
-        opponent=opponent,
-        date_from=date_from,
-        date_to=date_to,
-        patch=patch,
-        side=side,
-        result=result,
-    )
+    """Matches whose notes, opponent or picked champions match ``q``, best first.
+
+    Every word must match (the last one as a prefix, for search-as-you-type).
+    ``opponent``, ``notes`` and ``champions`` are HTML-escaped with the hits
+    wrapped in ``<mark>``.
+    """
+    return search_matches(q, limit)
 
 
 @router.get("/api/scrims/matches/{match_id}")
@@ -237,11 +312,12 @@ def api_get_match(match_id: int) -> dict[str, Any]:
 
 
 @router.put("/api/scrims/matches/{match_id}")
-def api_update_match(match_id: int, body: MatchInput) -> dict[str, str]:
+def api_update_match(match_id: int, body: MatchInput) -> dict[str, Any]:
     data = _normalize_match_data(body.model_dump())
-    if not update_match(match_id, data):
+    changes = update_match(match_id, data)
+    if changes is None:
         raise HTTPException(status_code=404, detail="Match not found")
-    return {"message": "Match updated"}
+    return {"message": "Match updated", "changes": changes}
 
 
 @router.delete("/api/scrims/matches/{match_id}")
@@ -251,11 +327,174 @@ def api_delete_match(match_id: int) -> dict[str, str]:
     return {"message": "Match deleted"}
 
 
+# ---------------------------------------------------------------------------
+# Bulk import
+# ---------------------------------------------------------------------------
+
+# CSV layout shared by import and export: one match per row, players and bans
+# as JSON arrays in the same objects the match endpoints accept.
+MATCH_CSV_COLUMNS = ["patch", "date", "opponent", "side", "result", "duration", "notes", "players", "bans"]
+IMPORT_BATCH_SIZE = 500
+
+MatchFileFormat = Literal["ndjson", "csv"]
+
+
+def _import_records(stream: IO[bytes], format: MatchFileFormat) -> Iterator[tuple[int, Any]]:
+    """Yield ``(line number, raw record)``: a text line for NDJSON, a dict for CSV."""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if format == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_no, line in enumerate(text, start=1):
+            if line.strip():
+                yield line_no, line
+
+
+def _parse_import_record(raw: Any, format: MatchFileFormat) -> dict[str, Any]:
+    if format == "csv":
+        # csv.DictReader files the fields past the header under the key None.
+        if None in raw:
+            raise ValueError(f"row has {len(raw[None])} more field(s) than the header")
+        data: dict[str, Any] = {key: value or None for key, value in raw.items() if key not in ("players", "bans")}
+        data["players"] = json.loads(raw.get("players") or "[]")
+        data["bans"] = json.loads(raw.get("bans") or "[]")
+    else:
+        data = json.loads(raw)
+    return _normalize_match_data(MatchInput.model_validate(data).model_dump())
+
+
+def _describe_error(exc: ValueError) -> str:
+    if isinstance(exc, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}" for error in exc.errors()
+        )
+    return str(exc)
+
+
+@router.post("/api/scrims/import")
+def api_import_matches(
+    file: UploadFile = File(...),
+    format: MatchFileFormat | None = Form(None),
+) -> dict[str, Any]:
+    """Import many matches from NDJSON (one match object per line) or CSV.
+
+    Rows are validated in batches of ``IMPORT_BATCH_SIZE``; invalid rows are
+    skipped and reported, every valid row is inserted in one transaction.
+    Rows the database rejects (constraint errors) are skipped and reported
+    the same way. ``format`` defaults to CSV for ``.csv`` files and NDJSON
+    otherwise.
+    """
+    if format is None:
+        format = "csv" if (file.filename or "").lower().endswith(".csv") else "ndjson"
+
+    errors: list[dict[str, Any]] = []
+    # Line number of each row in each yielded batch, to report database errors.
+    batch_lines: list[list[int]] = []
+
+    def valid_batches() -> Iterator[list[dict[str, Any]]]:
+        batch: list[dict[str, Any]] = []
+        lines: list[int] = []
+        for line_no, raw in _import_records(file.file, format):
+            try:
+                batch.append(_parse_import_record(raw, format))
+            except ValueError as exc:
+                errors.append({"line": line_no, "error": _describe_error(exc)})
+                continue
+            lines.append(line_no)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                batch_lines.append(lines)
+                yield batch
+                batch, lines = [], []
+        if batch:
+            batch_lines.append(lines)
+            yield batch
+
+    def rejected(batch_number: int, position: int, exc: sqlite3.IntegrityError) -> None:
+        errors.append({"line": batch_lines[batch_number][position], "error": f"rejected by the database: {exc}"})
+
+    started = time.perf_counter()
+    try:
+        imported = import_matches(valid_batches(), on_rejected=rejected)
+    except UnicodeDecodeError as exc:
+        raise HTTPException(status_code=400, detail=f"File is not valid UTF-8: {exc}") from exc
+    except csv.Error as exc:
+        raise HTTPException(status_code=400, detail=f"Malformed CSV: {exc}") from exc
+    elapsed = time.perf_counter() - started
+    return {
+        "imported": imported,
+        "failed": len(errors),
+        "errors": sorted(errors, key=lambda error: error["line"]),
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round((imported + len(errors)) / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+def _ndjson_lines(matches: Iterator[dict[str, Any]]) -> Iterator[str]:
+    for match in matches:
+        yield json.dumps(match, ensure_ascii=False) + "\n"
+
+
+def _csv_lines(matches: Iterator[dict[str, Any]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush() -> str:
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text
+
+    writer.writerow(["id", *MATCH_CSV_COLUMNS])
+    yield flush()
+    for match in matches:
+        writer.writerow([
+            match["id"],
+            *(match[column] for column in MATCH_CSV_COLUMNS[:-2]),
+            json.dumps(match["players"], ensure_ascii=False),
+            json.dumps(match["bans"], ensure_ascii=False),
+        ])
+        yield flush()
+
+
+@router.get("/api/scrims/export")
+def api_export_matches(
+    format: MatchFileFormat = "ndjson",
+    opponent: str | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    patch: str | None = None,
+    side: str | None = None,
+    result: str | None = None,
+) -> StreamingResponse:
+    """Stream the match history (same filters as the list endpoint) as NDJSON or CSV.
+
+    Both formats can be fed back into ``/api/scrims/import``.
+    """
+    matches = iter_matches(
+        opponent=opponent, date_from=date_from, date_to=date_to, patch=patch, side=side, result=result
+    )
+    if format == "csv":
+        body, media_type = _csv_lines(matches), "text/csv; charset=utf-8"
+    else:
+        body, media_type = _ndjson_lines(matches), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="scrims.{format}"'},
+    )
+
+
 # ---------------------------------------------------------------------------
 # Aggregation endpoints
 # ---------------------------------------------------------------------------
 
-@router.get("/api/scrims/stats")
+@analytics_router.get("/api/scrims/stats")
 def api_scrim_stats(
     opponent: str | None = None,
     date_from: str | None = None,
@@ -267,19 +506,59 @@ def api_scrim_stats(
     )
 
 
-@router.get("/api/scrims/champion-stats")
+@analytics_router.get("/api/scrims/champion-stats")
 def api_champion_stats(
     opponent: str | None = None,
     date_from: str | None = None,
     date_to: str | None = None,
     patch: str | None = None,
-) -> list[dict[str, Any]]:
-    return get_champion_stats(
+    format: ResponseFormat = "rows",
+) -> list[dict[str, Any]] | dict[str, list[Any]]:
+    rows = get_champion_stats(
         opponent=opponent, date_from=date_from, date_to=date_to, patch=patch
     )
+    return format_rows(rows, format)
+
+
+@analytics_router.get("/api/scrims/distributions")
+def api_stat_distributions(
+    team: str | None = None,
+    role: str | None = None,
+    champion: str | None = None,
+    opponent: str | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    patch: str | None = None,
+    format: ResponseFormat = "rows",
+) -> list[dict[str, Any]] | dict[str, list[Any]]:
+    """p25/median/p75/p90 of kills, deaths, damage and gold per champion, team and role."""
+    rows = get_stat_distributions(
+        team=team, role=role, champion=champion,
+        opponent=opponent, date_from=date_from, date_to=date_to, patch=patch,
+    )
+    return format_rows(rows, format)
+
+
+@analytics_router.get("/api/scrims/form")
+def api_form(
+    by: Literal["role", "champion", "opponent"] = "role",
+    window: int = Query(10, ge=1, le=MAX_FORM_WINDOW),
+    points: int = Query(20, ge=1, le=MAX_FORM_POINTS),
+    team: Literal["ours", "theirs"] = "ours",
+    role: str | None = None,
+    opponent: str | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    patch: str | None = None,
+) -> list[dict[str, Any]]:
+    """Last-``window``-games form per role, champion or opponent, with sparkline series."""
+    return get_form(
+        by=by, window=window, points=points, team=team, role=role,
+        opponent=opponent, date_from=date_from, date_to=date_to, patch=patch,
+    )
 
 
-@router.get("/api/scrims/matchups")
+@analytics_router.get("/api/scrims/matchups")
 def api_matchups(
     opponent: str | None = None,
     date_from: str | None = None,
@@ -289,7 +568,7 @@ def api_matchups(
     return get_matchups(opponent=opponent, date_from=date_from, date_to=date_to, patch=patch)
 
 
-@router.get("/api/scrims/duos")
+@analytics_router.get("/api/scrims/duos")
 def api_duos(
     opponent: str | None = None,
     date_from: str | None = None,
@@ -299,7 +578,7 @@ def api_duos(
     return get_duos(opponent=opponent, date_from=date_from, date_to=date_to, patch=patch)
 
 
-@router.get("/api/scrims/pick-priority")
+@analytics_router.get("/api/scrims/pick-priority")
 def api_pick_priority(
     opponent: str | None = None,
     date_from: str | None = None,
@@ -309,7 +588,7 @@ def api_pick_priority(
     return get_pick_priority(opponent=opponent, date_from=date_from, date_to=date_to, patch=patch)
 
 
-@router.get("/api/scrims/mvp-svp")
+@analytics_router.get("/api/scrims/mvp-svp")
 def api_mvp_svp(
     opponent: str | None = None,
     date_from: str | None = None,
@@ -330,7 +609,13 @@ def api_scrim_filters() -> dict[str, list[str]]:
     }
 
 
-@router.get("/api/scrims/role-averages")
+@router.get("/api/scrims/debug/cache")
+def api_scrim_cache_stats() -> dict[str, Any]:
+    """Result cache size and per-function hit rates."""
+    return cache_stats()
+
+
+@analytics_router.get("/api/scrims/role-averages")
 def api_role_averages(
     opponent: str | None = None,
     date_from: str | None = None,
@@ -342,7 +627,7 @@ def api_role_averages(
     )
 
 
-@router.get("/api/scrims/all-champions-by-role")
+@analytics_router.get("/api/scrims/all-champions-by-role")
 def api_all_champions_by_role(
     opponent: str | None = None,
     date_from: str | None = None,
@@ -354,7 +639,7 @@ def api_all_champions_by_role(
     )
 
 
-@router.get("/api/scrims/enemy-champions-by-role")
+@analytics_router.get("/api/scrims/enemy-champions-by-role")
 def api_enemy_champions_by_role(
     opponent: str | None = None,
     date_from: str | None = None,
@@ -366,7 +651,7 @@ def api_enemy_champions_by_role(
     )
 
 
-@router.get("/api/scrims/enemy-champions-general")
+@analytics_router.get("/api/scrims/enemy-champions-general")
 def api_enemy_champions_general(
     opponent: str | None = None,
     date_from: str | None = None,
@@ -378,7 +663,7 @@ def api_enemy_champions_general(
     )
 
 
-@router.get("/api/scrims/all-champions-general")
+@analytics_router.get("/api/scrims/all-champions-general")
 def api_all_champions_general(
     opponent: str | None = None,
     date_from: str | None = None,
@@ -390,16 +675,73 @@ def api_all_champions_general(
     )
 
 
+# Sections of the stats tab served by /api/scrims/dashboard, in response order.
+DASHBOARD_SECTIONS: dict[str, Callable[..., Any]] = {
+    "stats": get_stat_summary,
+    "role_averages": get_role_averages,
+    "all_champions_by_role": get_all_champions_by_role,
+    "all_champions_general": get_all_champions_general,
+    "mvp_svp": get_mvp_svp_summary,
+    "enemy_champions_by_role": get_enemy_champions_by_role,
+    "enemy_champions_general": get_enemy_champions_general,
+}
+OPENSERIES_SECTION = "openseries_champions"
+
+
+@analytics_router.get("/api/scrims/dashboard")
+def api_dashboard(
+    sections: str | None = None,
+    opponent: str | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    patch: str | None = None,
+) -> dict[str, Any]:
+    """Every stats-tab section in one response, from one connection and read transaction.
+
+    ``sections`` is a comma-separated subset of the section names (all when
+    omitted). The Open Series scrape runs after the read transaction has
+    ended.
+    """
+    available = [*DASHBOARD_SECTIONS, OPENSERIES_SECTION]
+    if sections:
+        requested = [name.strip() for name in sections.split(",") if name.strip()]
+        unknown = [name for name in requested if name not in available]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown sections: {', '.join(unknown)}")
+    else:
+        requested = available
+
+    result: dict[str, Any] = {}
+    for name in requested:
+        if name in DASHBOARD_SECTIONS:
+            result[name] = DASHBOARD_SECTIONS[name](
+                opponent=opponent, date_from=date_from, date_to=date_to, patch=patch
+            )
+    end_read_session()
+    if OPENSERIES_SECTION in requested:
+        from app.fetch_openseries import get_openseries_data
+        try:
+            result[OPENSERIES_SECTION] = get_openseries_data()
+        except Exception:
+            # Same as the separate endpoint failing: the tab renders without it.
+            logger.warning("Could not load Open Series champions for the dashboard")
+            result[OPENSERIES_SECTION] = []
+    return result
+
+
 # ---------------------------------------------------------------------------
 # Open Series endpoints
 # ---------------------------------------------------------------------------
 
 
 @router.get("/api/openseries/champions")
-def api_openseries_champions(force_refresh: bool = False) -> list[dict[str, Any]]:
+def api_openseries_champions(
+    force_refresh: bool = False,
+    format: ResponseFormat = "rows",
+) -> list[dict[str, Any]] | dict[str, list[Any]]:
     """Return Open Series champion stats (cached, refreshed every 6h or on demand)."""
     from app.fetch_openseries import get_openseries_data
-    return get_openseries_data(force_refresh=force_refresh)
+    return format_rows(get_openseries_data(force_refresh=force_refresh), format)
 
 
 # ---------------------------------------------------------------------------
@@ -451,7 +793,7 @@ async def api_ocr(
     # Load known champion names for fuzzy matching
     champ_names: list[str] = []
     try:
-        hero_map = _load_hero_map()
+        hero_map = await _load_hero_map()
         champ_names = [c["name"] for c in _hero_map_to_list(hero_map)]
     except Exception:
         logger.warning("Could not load champion list for OCR matching")
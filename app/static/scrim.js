@@ -7,8 +7,9 @@
   let champByName = {};
   let currentSubTab = "input";
   let editingMatchId = null; // When set, saveMatch uses PUT instead of POST
-  let showAllMatches = false;
-  const MATCH_HISTORY_LIMIT = 15;
+  let matchHistory = [];
+  let matchHistoryCursor = null;
+  const MATCH_HISTORY_PAGE_SIZE = 15;
 
   // ---- PIN Auth ----
   let scrimPin = sessionStorage.getItem("scrimPin") || "";
@@ -721,42 +722,62 @@
         </div>`;
   }
 
-  async function loadMatchHistory() {
+  async function fetchMatchPage(cursor) {
+    const params = new URLSearchParams({ page_size: MATCH_HISTORY_PAGE_SIZE });
+    if (cursor) params.set("cursor", cursor);
+    const res = await fetch(`/api/scrims/matches?${params}`, { headers: scrimHeaders() });
+    if (!res.ok) return null;
+    return res.json();
+  }
+
+  function renderMatchHistory() {
     const body = document.getElementById("matchListBody");
     if (!body) return;
 
-    try {
-      const res = await fetch("/api/scrims/matches", { headers: scrimHeaders() });
-      if (!res.ok) return;
-      const matches = await res.json();
+    if (!matchHistory.length) {
+      body.innerHTML = '<p style="color:#999;font-size:0.85rem">Nenhuma partida registrada ainda.</p>';
+      return;
+    }
 
-      if (!matches.length) {
-        body.innerHTML = '<p style="color:#999;font-size:0.85rem">Nenhuma partida registrada ainda.</p>';
-        return;
-      }
+    const cards = matchHistory.map(renderMatchCard).join("");
 
-      const visible = showAllMatches ? matches : matches.slice(0, MATCH_HISTORY_LIMIT);
-      const hasMore = matches.length > MATCH_HISTORY_LIMIT;
+    const moreBtn = matchHistoryCursor
+      ? `<div style="text-align:center;margin-top:8px">
+          <button class="btn btn-secondary" onclick="window._scrimLoadMoreMatches()">
+            Carregar mais
+          </button>
+         </div>`
+      : "";
 
-      const cards = visible.map(renderMatchCard).join("");
+    body.innerHTML = cards + moreBtn;
+  }
 
-      const toggleBtn = hasMore
-        ? `<div style="text-align:center;margin-top:8px">
-            <button class="btn btn-secondary" onclick="window._scrimToggleShowAll()">
-              ${showAllMatches ? `Mostrar menos` : `Mostrar todas (${matches.length})`}
-            </button>
-           </div>`
-        : "";
+  async function loadMatchHistory() {
+    const body = document.getElementById("matchListBody");
+    if (!body) return;
 
-      body.innerHTML = cards + toggleBtn;
+    try {
+      const page = await fetchMatchPage(null);
+      if (!page) return;
+      matchHistory = page.items;
+      matchHistoryCursor = page.next_cursor;
+      renderMatchHistory();
     } catch (e) {
       body.innerHTML = '<p style="color:#c00">Erro ao carregar partidas</p>';
     }
   }
 
-  window._scrimToggleShowAll = function () {
-    showAllMatches = !showAllMatches;
-    loadMatchHistory();
+  window._scrimLoadMoreMatches = async function () {
+    if (!matchHistoryCursor) return;
+    try {
+      const page = await fetchMatchPage(matchHistoryCursor);
+      if (!page) return;
+      matchHistory = matchHistory.concat(page.items);
+      matchHistoryCursor = page.next_cursor;
+      renderMatchHistory();
+    } catch (e) {
+      alert("Erro ao carregar partidas");
+    }
   };
 
   window._scrimDeleteMatch = async function (id) {
@@ -1038,25 +1059,17 @@
     const params = buildFilterParams("sf");
     const body = document.getElementById("statsBody");
     try {
-      const [statsRes, roleAvgRes, allChampsRes, generalRes, mvpSvpRes, enemyChampsRes, enemyGeneralRes, openSeriesRes] = await Promise.all([
-        fetch("/api/scrims/stats?" + params.toString(), { headers: scrimHeaders() }),
-        fetch("/api/scrims/role-averages?" + params.toString(), { headers: scrimHeaders() }),
-        fetch("/api/scrims/all-champions-by-role?" + params.toString(), { headers: scrimHeaders() }),
-        fetch("/api/scrims/all-champions-general?" + params.toString(), { headers: scrimHeaders() }),
-        fetch("/api/scrims/mvp-svp?" + params.toString(), { headers: scrimHeaders() }),
-        fetch("/api/scrims/enemy-champions-by-role?" + params.toString(), { headers: scrimHeaders() }),
-        fetch("/api/scrims/enemy-champions-general?" + params.toString(), { headers: scrimHeaders() }),
-        fetch("/api/openseries/champions", { headers: scrimHeaders() }),
-      ]);
-      if (!statsRes.ok) { body.innerHTML = '<p style="color:#c00">Erro ao carregar stats</p>'; return; }
-      const data = await statsRes.json();
-      const roleAvg = roleAvgRes.ok ? await roleAvgRes.json() : [];
-      const allChamps = allChampsRes.ok ? await allChampsRes.json() : {};
-      const generalChamps = generalRes.ok ? await generalRes.json() : [];
-      const mvpSvp = mvpSvpRes.ok ? await mvpSvpRes.json() : {};
-      const enemyChamps = enemyChampsRes.ok ? await enemyChampsRes.json() : {};
-      const enemyGeneralChamps = enemyGeneralRes.ok ? await enemyGeneralRes.json() : [];
-      const openSeriesChamps = openSeriesRes.ok ? await openSeriesRes.json() : [];
+      const res = await fetch("/api/scrims/dashboard?" + params.toString(), { headers: scrimHeaders() });
+      if (!res.ok) { body.innerHTML = '<p style="color:#c00">Erro ao carregar stats</p>'; return; }
+      const dashboard = await res.json();
+      const data = dashboard.stats;
+      const roleAvg = dashboard.role_averages || [];
+      const allChamps = dashboard.all_champions_by_role || {};
+      const generalChamps = dashboard.all_champions_general || [];
+      const mvpSvp = dashboard.mvp_svp || {};
+      const enemyChamps = dashboard.enemy_champions_by_role || {};
+      const enemyGeneralChamps = dashboard.enemy_champions_general || [];
+      const openSeriesChamps = dashboard.openseries_champions || [];
       renderStatsBody(data, body, roleAvg, allChamps, generalChamps, mvpSvp, enemyChamps, enemyGeneralChamps, openSeriesChamps);
     } catch (e) {
       body.innerHTML = '<p style="color:#c00">Erro: ' + escHtml(e.message) + "</p>";
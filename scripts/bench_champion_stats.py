@@ -0,0 +1,157 @@
+"""Benchmark get_champion_stats against the previous three-query version.
+
+Builds a synthetic scrim database, checks that both implementations return
+the same rows and prints the median time of each, with and without a date
+filter (the date-filtered path scans match_players instead of the summary
+tables).
+
+Usage (from the repository root):
+
+    python scripts/bench_champion_stats.py --matches 20000
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import scrim_db  # noqa: E402
+
+ROLES = ["top", "jungle", "mid", "bot", "support"]
+
+
+def synthetic_matches(count: int, seed: int = 7) -> list[dict[str, Any]]:
+    rnd = random.Random(seed)
+    champions = [f"Champion{i:03d}" for i in range(120)]
+    opponents = [f"Team{i:02d}" for i in range(30)]
+    patches = ["7.0c", "7.0d", "7.0e", "7.0f"]
+    matches = []
+    for i in range(count):
+        picked = rnd.sample(champions, 14)
+        players = [
+            {
+                "role": role,
+                "team": team,
+                "champion": picked[slot * 5 + r],
+                "kills": rnd.randint(0, 12),
+                "deaths": rnd.randint(0, 10),
+                "assists": rnd.randint(0, 15),
+                "kp_percent": round(rnd.uniform(20, 90), 1),
+                "gold_earned": rnd.randint(6000, 16000) if rnd.random() > 0.1 else None,
+                "damage_dealt": rnd.randint(5000, 40000),
+            }
+            for slot, team in enumerate(["ours", "theirs"])
+            for r, role in enumerate(ROLES)
+        ]
+        bans = [
+            {"champion": picked[10 + b], "team": "ours" if b < 2 else "theirs", "ban_order": b % 2 + 1}
+            for b in range(4)
+        ]
+        matches.append({
+            "patch": rnd.choice(patches),
+            "date": f"2026-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+            "opponent": rnd.choice(opponents),
+            "side": rnd.choice(["blue", "red"]),
+            "result": rnd.choice(["win", "loss"]),
+            "duration": f"{rnd.randint(12, 25)}:{rnd.randint(0, 59):02d}",
+            "notes": None,
+            "players": players,
+            "bans": bans,
+        })
+    return matches
+
+
+def three_query_champion_stats(
+    opponent: str | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    patch: str | None = None,
+) -> list[dict[str, Any]]:
+    """The previous implementation: three queries merged in Python."""
+    rows = scrim_db._aggregate_players(
+        ["champion", "team", "role"], [*scrim_db._PER_GAME_METRICS, "avg_gold", "avg_gpm"], "champion, team, role",
+        opponent=opponent, date_from=date_from, date_to=date_to, patch=patch,
+    )
+    ban_map: dict[str, dict[str, int]] = {}
+    for b in scrim_db._aggregate_bans(opponent, date_from, date_to, patch):
+        ban_map.setdefault(b["champion"], {})[b["team"]] = b["ban_count"]
+    extra_where, params = scrim_db._build_where(opponent, date_from, date_to, patch)
+    with scrim_db._connect() as conn:
+        total_matches = conn.execute(f"SELECT COUNT(*) FROM matches m WHERE 1=1{extra_where}", params).fetchone()[0]
+
+    champ_data: dict[str, dict] = {}
+    for r in rows:
+        cd = champ_data.setdefault(r["champion"], {
+            "champion": r["champion"], "total_games": 0, "total_wins": 0, "our_picks": 0, "their_picks": 0,
+            "our_bans": ban_map.get(r["champion"], {}).get("ours", 0),
+            "their_bans": ban_map.get(r["champion"], {}).get("theirs", 0),
+            "by_role": {}, "_gpm_sum": 0, "_gpm_count": 0,
+        })
+        cd["total_games"] += r["games"]
+        cd["total_wins"] += r["wins"]
+        if r["avg_gpm"]:
+            cd["_gpm_sum"] += r["avg_gpm"] * r["games"]
+            cd["_gpm_count"] += r["games"]
+        cd["our_picks" if r["team"] == "ours" else "their_picks"] += r["games"]
+        cd["by_role"][f"{r['team']}_{r['role']}"] = {
+            "games": r["games"], "wins": r["wins"],
+            "winrate": round(r["wins"] / r["games"] * 100, 1) if r["games"] > 0 else 0,
+            "avg_kills": r["avg_kills"], "avg_deaths": r["avg_deaths"],
+            "avg_assists": r["avg_assists"], "avg_kp": r["avg_kp"],
+        }
+    result = []
+    for cd in champ_data.values():
+        cd["winrate"] = round(cd["total_wins"] / cd["total_games"] * 100, 1) if cd["total_games"] > 0 else 0
+        cd["presence"] = round((cd["total_games"] + cd["our_bans"] + cd["their_bans"]) / max(total_matches, 1) * 100, 1)
+        cd["avg_gpm"] = round(cd.pop("_gpm_sum") / cd["_gpm_count"]) if cd["_gpm_count"] > 0 else None
+        del cd["_gpm_count"]
+        result.append(cd)
+    result.sort(key=lambda x: x["total_games"], reverse=True)
+    return result
+
+
+def median_ms(func: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--matches", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=15)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        scrim_db.DB_PATH = Path(tmp) / "bench.db"
+        scrim_db.init_db()
+        matches = synthetic_matches(args.matches)
+        scrim_db.import_matches(matches[i:i + 500] for i in range(0, len(matches), 500))
+        print(f"{args.matches} matches, {args.matches * 10} player rows")
+
+        # Bypass the result cache: time the query itself.
+        single_statement = scrim_db.get_champion_stats.__wrapped__
+        for label, filters in [
+            ("summary tables", {}),
+            ("summary tables, one opponent", {"opponent": "Team03"}),
+            ("raw scan (date filter)", {"date_from": "2026-03-01"}),
+        ]:
+            assert single_statement(**filters) == three_query_champion_stats(**filters), label
+            old = median_ms(lambda: three_query_champion_stats(**filters), args.repeat)
+            new = median_ms(lambda: single_statement(**filters), args.repeat)
+            print(f"{label:32s} three queries {old:8.2f} ms   one statement {new:8.2f} ms   ({old / new:.2f}x)")
+        scrim_db.close_db()
+
+
+if __name__ == "__main__":
+    main()
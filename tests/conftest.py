@@ -1,5 +1,7 @@
 """Shared test fixtures."""
 
+from typing import Any, Callable
+
 import pytest
 from app.scrim_db import init_db
 
@@ -8,3 +10,37 @@ from app.scrim_db import init_db
 def setup_db():
     """Initialize the SQLite DB schema before any test that needs it."""
     init_db()
+
+
+@pytest.fixture
+def tmp_db(tmp_path, monkeypatch):
+    """Point ``scrim_db`` at a fresh, initialized database under ``tmp_path`` and return its path."""
+    from app import scrim_db
+
+    monkeypatch.setattr(scrim_db, "DB_PATH", tmp_path / "scrims.db")
+    scrim_db.init_db()
+    return scrim_db.DB_PATH
+
+
+@pytest.fixture
+def make_match() -> Callable[..., dict[str, Any]]:
+    """Factory for match dicts as ``insert_match`` and the import endpoint take them.
+
+    Keyword arguments replace the defaults (a 20-minute blue-side win with no
+    players or bans).
+    """
+
+    def make(**overrides: Any) -> dict[str, Any]:
+        return {
+            "patch": "7.0e",
+            "date": "2026-01-01",
+            "opponent": "FixtureTeam",
+            "side": "blue",
+            "result": "win",
+            "duration": "20:00",
+            "players": [],
+            "bans": [],
+            **overrides,
+        }
+
+    return make
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+import asyncio
 import json
 from datetime import datetime, timedelta, timezone
 
+import pytest
 from fastapi.testclient import TestClient
 
 from app.main import app
@@ -11,6 +13,19 @@ from app.main import app
 client = TestClient(app)
 
 
+def _awaitable(func):
+    async def wrapper(*args, **kwargs):
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+@pytest.fixture(autouse=True)
+def _offline_hero_map(monkeypatch):
+    """/meta loads the hero map before it reads the CN cache; keep that off the network."""
+    monkeypatch.setattr("app.main.fetch_hero_map_from_gtimg_async", _awaitable(lambda force_refresh=False: {}))
+
+
 def test_meta_auto_uses_stale_cn_cache_when_live_fetch_fails(monkeypatch):
     stale_items = [
         {
@@ -23,9 +38,9 @@ def test_meta_auto_uses_stale_cn_cache_when_live_fetch_fails(monkeypatch):
         }
     ]
 
-    monkeypatch.setattr("app.main.fetch_cn_payload", lambda tier: (_ for _ in ()).throw(RuntimeError("boom")))
-    monkeypatch.setattr("app.main.get_cached_meta", lambda role, tier: None)
-    monkeypatch.setattr("app.main.get_stale_cached_meta", lambda role, tier: stale_items)
+    monkeypatch.setattr("app.main.fetch_cn_payload_async", _awaitable(lambda tier: (_ for _ in ()).throw(RuntimeError("boom"))))
+    monkeypatch.setattr("app.main.get_cached_meta", lambda role, tier, hero_map: None)
+    monkeypatch.setattr("app.main.get_stale_cached_meta", lambda role, tier, hero_map: stale_items)
 
     response = client.get("/meta", params={"role": "top", "tier": "diamond_plus", "source": "auto"})
 
@@ -95,3 +110,97 @@ def test_fetch_hero_map_uses_stale_cache_when_refresh_fails(tmp_path, monkeypatc
     hero_map = fetch_hero_map_from_gtimg()
 
     assert hero_map["10001"]["hero_name_global"] == "Tryndamere"
+
+
+def test_meta_auto_falls_back_when_deadline_budget_runs_out(monkeypatch):
+    import time
+
+    from app.cn_scheduler import RequestScheduler
+
+    drained = RequestScheduler(rate_per_second=0.01)
+    drained.acquire_blocking("background")
+    stale_items = [
+        {"champion": "hero_10138", "role": "top", "tier": "diamond_plus", "winrate": 0.55, "pickrate": 0.12, "banrate": 0.33}
+    ]
+
+    refreshed: list[str] = []
+
+    def fake_refresh(tier):
+        refreshed.append(tier)
+        return asyncio.sleep(0)
+
+    monkeypatch.setattr("app.fetch_cn_meta.cn_scheduler", drained)
+    monkeypatch.setattr("app.main.get_cached_meta", lambda role, tier, hero_map: None)
+    monkeypatch.setattr("app.main.get_stale_cached_meta", lambda role, tier, hero_map: stale_items)
+    monkeypatch.setattr("app.main.refresh_expired_caches", fake_refresh)
+
+    started = time.monotonic()
+    response = client.get(
+        "/meta",
+        params={"role": "top", "tier": "diamond_plus", "source": "auto", "deadline_ms": 200},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["source"] == "cn_stale_cache"
+    assert time.monotonic() - started < 2
+    assert refreshed == ["diamond_plus"]
+
+
+def test_meta_refreshes_in_background_when_the_hero_map_times_out(monkeypatch):
+    cached_items = [
+        {"champion": "hero_10138", "role": "top", "tier": "diamond_plus", "winrate": 0.55, "pickrate": 0.12, "banrate": 0.33}
+    ]
+    refreshed: list[str] = []
+
+    async def slow_hero_map(force_refresh=False):
+        # Like fetch_hero_map_from_gtimg_async: spends the budget, then falls back to the stale copy.
+        await asyncio.sleep(0.2)
+        return {}
+
+    def fake_refresh(tier):
+        refreshed.append(tier)
+        return asyncio.sleep(0)
+
+    monkeypatch.setattr("app.main.fetch_hero_map_from_gtimg_async", slow_hero_map)
+    monkeypatch.setattr("app.main.get_cached_meta", lambda role, tier, hero_map: cached_items)
+    monkeypatch.setattr("app.main.refresh_expired_caches", fake_refresh)
+
+    response = client.get("/meta", params={"role": "top", "tier": "diamond_plus", "source": "auto", "deadline_ms": 100})
+    assert response.status_code == 200
+    assert response.json()["source"] == "cn_cache"
+    assert refreshed == ["diamond_plus"]
+
+    refreshed.clear()
+    monkeypatch.setattr("app.main.fetch_hero_map_from_gtimg_async", _awaitable(lambda force_refresh=False: {}))
+    assert client.get("/meta", params={"role": "top", "tier": "diamond_plus", "source": "auto"}).status_code == 200
+    assert refreshed == []
+
+
+def test_refresh_expired_caches_runs_at_background_priority_without_a_deadline(monkeypatch):
+    import app.fetch_cn_meta as fetch_cn_meta
+
+    calls: list[tuple[str, str, float | None]] = []
+    stored: list[dict] = []
+
+    async def fake_hero_map(force_refresh=False):
+        calls.append(("hero_map", fetch_cn_meta._request_priority.get(), fetch_cn_meta.remaining_budget()))
+        return {"10001": {"hero_name_global": "Aatrox"}}
+
+    async def fake_payload(tier):
+        calls.append(("payload", fetch_cn_meta._request_priority.get(), fetch_cn_meta.remaining_budget()))
+        return {"result": 0}
+
+    monkeypatch.setattr(fetch_cn_meta, "fetch_hero_map_from_gtimg_async", fake_hero_map)
+    monkeypatch.setattr(fetch_cn_meta, "fetch_cn_payload_async", fake_payload)
+    monkeypatch.setattr(fetch_cn_meta, "get_cached_raw_payload", lambda tier: None)
+    monkeypatch.setattr(fetch_cn_meta, "update_cache", lambda **kwargs: stored.append(kwargs))
+
+    async def expired_request():
+        with fetch_cn_meta.request_priority("interactive"), fetch_cn_meta.request_deadline(0):
+            await fetch_cn_meta.refresh_expired_caches("monarch")
+            return fetch_cn_meta.remaining_budget()
+
+    assert asyncio.run(expired_request()) <= 0
+    assert calls == [("hero_map", "background", None), ("payload", "background", None)]
+    assert stored[0]["tier"] == "monarch"
+    assert stored[0]["hero_map"] == {"10001": {"hero_name_global": "Aatrox"}}
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from app.cn_scheduler import RequestScheduler
+
+
+def test_interactive_requests_are_served_before_background():
+    scheduler = RequestScheduler(rate_per_second=20)
+    order: list[str] = []
+
+    async def _take(priority: str) -> None:
+        await scheduler.acquire(priority)
+        order.append(priority)
+
+    async def _run() -> None:
+        await scheduler.acquire("background")  # drain the initial token
+        await asyncio.gather(_take("background"), _take("background"), _take("interactive"))
+
+    asyncio.run(_run())
+
+    assert order == ["interactive", "background", "background"]
+    stats = scheduler.stats()
+    assert stats["granted"] == {"interactive": 1, "background": 3}
+    assert stats["queue_depth"] == {"interactive": 0, "background": 0}
+    assert stats["avg_wait_seconds"]["background"] > 0
+
+
+def test_acquire_blocking_times_out_and_leaves_queue():
+    scheduler = RequestScheduler(rate_per_second=0.01)
+    scheduler.acquire_blocking("interactive")
+
+    with pytest.raises(TimeoutError):
+        scheduler.acquire_blocking("background", timeout=0.05)
+
+    # Cancellation is delivered to the scheduler loop asynchronously.
+    deadline = time.monotonic() + 1
+    while scheduler.stats()["queue_depth"]["background"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert scheduler.stats()["queue_depth"]["background"] == 0
@@ -245,3 +245,128 @@ def test_summarize_cn_positions_groups_lane_distribution(monkeypatch):
     assert payload["positions"]["1"]["lane_dist"]["单人路"]["count"] == 2
     assert payload["positions"]["1"]["top_bans"][0]["hero_id"] == "10001"
     assert payload["positions"]["2"]["dominant_lanes"] == ["中路"]
+
+
+def test_discover_endpoints_refetches_only_new_scripts(tmp_path, monkeypatch):
+    import app.fetch_cn_meta as fetch_cn_meta
+
+    script_a = "https://lolm.qq.com/act/a20220818raider/js/a.js"
+    script_b = "https://lolm.qq.com/act/a20220818raider/js/b.js"
+    pages = [
+        f'<script src="{script_a}"></script>',
+        f'<script src="{script_a}"></script><script src="{script_b}"></script>',
+    ]
+    bodies = {
+        script_a: "$.getJSON('https://mlol.qt.qq.com/go/a')",
+        script_b: "$.getJSON('https://mlol.qt.qq.com/go/b')",
+    }
+    fetched: list[str] = []
+
+    class _Response:
+        def __init__(self, text: str):
+            self.text = text
+
+    async def fake_request(url, priority="background"):
+        fetched.append(url)
+        if url == fetch_cn_meta.CN_PAGE_URL:
+            return _Response(pages[0])
+        return _Response(bodies[url])
+
+    monkeypatch.setattr(fetch_cn_meta, "ENDPOINTS_CACHE_PATH", tmp_path / "cn_endpoints_cache.json")
+    monkeypatch.setattr(fetch_cn_meta, "request_with_rate_limit_async", fake_request)
+
+    first = fetch_cn_meta.discover_endpoints()
+    assert fetched == [fetch_cn_meta.CN_PAGE_URL, script_a]
+    assert "https://mlol.qt.qq.com/go/a" in first["api_urls"]
+    assert first["scripts"][script_a]["sha256"]
+
+    fetched.clear()
+    pages.pop(0)
+    second = fetch_cn_meta.discover_endpoints()
+
+    assert fetched == [fetch_cn_meta.CN_PAGE_URL, script_b]
+    assert second["fetched_scripts"] == [script_b]
+    assert {"https://mlol.qt.qq.com/go/a", "https://mlol.qt.qq.com/go/b"} <= set(second["api_urls"])
+
+
+def test_discovery_job_retries_failures_on_a_capped_backoff(monkeypatch):
+    import asyncio
+
+    import app.fetch_cn_meta as fetch_cn_meta
+
+    outcomes = [RuntimeError("boom")] * 5 + [{"api_urls": [], "fetched_scripts": []}]
+    sleeps: list[float] = []
+
+    async def fake_discover(priority="background"):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+        if not outcomes:
+            raise asyncio.CancelledError
+
+    monkeypatch.setattr(fetch_cn_meta, "read_discovered_endpoints", lambda: None)
+    monkeypatch.setattr(fetch_cn_meta, "discover_endpoints_async", fake_discover)
+    monkeypatch.setattr(fetch_cn_meta.asyncio, "sleep", fake_sleep)
+
+    try:
+        asyncio.run(fetch_cn_meta.run_discovery_job(interval_seconds=3 * 60 * 60))
+    except asyncio.CancelledError:
+        pass
+
+    assert sleeps == [60, 5 * 60, 30 * 60, 2 * 60 * 60, 2 * 60 * 60, 3 * 60 * 60]
+
+
+def test_update_cache_stores_position_summary_for_lookup(tmp_path, monkeypatch):
+    import app.fetch_cn_meta as fetch_cn_meta
+
+    monkeypatch.setattr(fetch_cn_meta, "CACHE_PATH", tmp_path / "cn_meta_cache.json")
+    monkeypatch.setattr(
+        fetch_cn_meta,
+        "fetch_hero_map_from_gtimg",
+        lambda: (_ for _ in ()).throw(AssertionError("update_cache should use the caller's hero map")),
+    )
+    fetch_cn_meta.update_cache(
+        tier="monarch",
+        source_url=fetch_cn_meta.CN_PAGE_URL,
+        raw_payload=_stats_payload(10001),
+        hero_map={"10001": {"hero_name_global": "Aatrox", "lane": "单人路"}},
+    )
+
+    monkeypatch.setattr(
+        fetch_cn_meta,
+        "build_position_summary",
+        lambda **kwargs: (_ for _ in ()).throw(AssertionError("summary should be precomputed")),
+    )
+    summary = fetch_cn_meta.summarize_cn_positions(tier="monarch")
+
+    assert summary["tier"] == "monarch"
+    assert summary["positions"]["1"]["lane_dist"]["单人路"]["count"] == 1
+    assert summary["positions"]["1"]["top_bans"][0]["champion"] == "Aatrox"
+
+
+def test_summarize_cn_positions_stores_a_live_fetch(tmp_path, monkeypatch):
+    import app.fetch_cn_meta as fetch_cn_meta
+
+    monkeypatch.setattr(fetch_cn_meta, "CACHE_PATH", tmp_path / "cn_meta_cache.json")
+    monkeypatch.setattr(
+        fetch_cn_meta, "fetch_hero_map_from_gtimg", lambda: {"10001": {"hero_name_global": "Aatrox", "lane": "单人路"}}
+    )
+    fetches: list[str] = []
+
+    def fake_fetch(tier):
+        fetches.append(tier)
+        return _stats_payload(10001)
+
+    monkeypatch.setattr(fetch_cn_meta, "fetch_cn_payload", fake_fetch)
+
+    first = fetch_cn_meta.summarize_cn_positions(tier="monarch")
+    second = fetch_cn_meta.summarize_cn_positions(tier="monarch")
+
+    assert fetches == ["monarch"]
+    assert second == first
+    assert fetch_cn_meta.get_cached_raw_payload(tier="monarch") == _stats_payload(10001)
+    assert first["positions"]["1"]["top_bans"][0]["champion"] == "Aatrox"
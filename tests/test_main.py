@@ -3,6 +3,7 @@ from __future__ import annotations
 import json
 from datetime import datetime, timedelta, timezone
 
+import pytest
 from fastapi.testclient import TestClient
 
 from app.main import app
@@ -11,6 +12,19 @@ from app.main import app
 client = TestClient(app)
 
 
+def _awaitable(func):
+    async def wrapper(*args, **kwargs):
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+@pytest.fixture(autouse=True)
+def _offline_hero_map(monkeypatch):
+    """/meta loads the hero map before it reads the CN cache; keep that off the network."""
+    monkeypatch.setattr("app.main.fetch_hero_map_from_gtimg_async", _awaitable(lambda force_refresh=False: {}))
+
+
 class _DummyResponse:
     def __init__(self, payload: dict):
         self._payload = payload
@@ -68,8 +82,8 @@ def _cn_payload_with_duplicates() -> dict:
 
 
 def test_meta_auto_fallbacks_to_sample_when_cn_fails(monkeypatch):
-    monkeypatch.setattr("app.main.fetch_cn_payload", lambda tier: (_ for _ in ()).throw(RuntimeError("boom")))
-    monkeypatch.setattr("app.main.get_cached_meta", lambda role, tier: None)
+    monkeypatch.setattr("app.main.fetch_cn_payload_async", _awaitable(lambda tier: (_ for _ in ()).throw(RuntimeError("boom"))))
+    monkeypatch.setattr("app.main.get_cached_meta", lambda role, tier, hero_map: None)
 
     response = client.get("/meta", params={"role": "top", "tier": "diamond_plus", "source": "auto"})
 
@@ -80,8 +94,8 @@ def test_meta_auto_fallbacks_to_sample_when_cn_fails(monkeypatch):
 
 
 def test_meta_cn_returns_502_when_cn_fails(monkeypatch):
-    monkeypatch.setattr("app.main.get_cached_meta", lambda role, tier: None)
-    monkeypatch.setattr("app.main.fetch_cn_payload", lambda tier: (_ for _ in ()).throw(RuntimeError("boom")))
+    monkeypatch.setattr("app.main.get_cached_meta", lambda role, tier, hero_map: None)
+    monkeypatch.setattr("app.main.fetch_cn_payload_async", _awaitable(lambda tier: (_ for _ in ()).throw(RuntimeError("boom"))))
 
     response = client.get("/meta", params={"role": "top", "tier": "diamond_plus", "source": "cn"})
 
@@ -101,7 +115,7 @@ def test_cn_cache_within_ttl_skips_network_fetch(monkeypatch):
         }
     ]
 
-    monkeypatch.setattr("app.main.get_cached_meta", lambda role, tier: cached_items)
+    monkeypatch.setattr("app.main.get_cached_meta", lambda role, tier, hero_map: cached_items)
 
     called = {"fetch": False}
 
@@ -109,7 +123,7 @@ def test_cn_cache_within_ttl_skips_network_fetch(monkeypatch):
         called["fetch"] = True
         return _cn_payload_positions()
 
-    monkeypatch.setattr("app.main.fetch_cn_payload", fake_fetch)
+    monkeypatch.setattr("app.main.fetch_cn_payload_async", _awaitable(fake_fetch))
 
     response = client.get("/meta", params={"role": "top", "tier": "diamond_plus", "source": "auto"})
 
@@ -133,7 +147,7 @@ def test_meta_cn_response_includes_last_fetch(monkeypatch):
         }
     ]
 
-    monkeypatch.setattr("app.main.get_cached_meta", lambda role, tier: cached_items)
+    monkeypatch.setattr("app.main.get_cached_meta", lambda role, tier, hero_map: cached_items)
     monkeypatch.setattr("app.main.read_cache", lambda: {"fetched_at": "2026-01-02T03:04:05+00:00"})
 
     response = client.get("/meta", params={"role": "top", "tier": "diamond_plus", "source": "cn"})
@@ -158,7 +172,7 @@ def test_meta_name_lang_global_uses_global_champion_name(monkeypatch):
         }
     ]
 
-    monkeypatch.setattr("app.main.get_cached_meta", lambda role, tier: cached_items)
+    monkeypatch.setattr("app.main.get_cached_meta", lambda role, tier, hero_map: cached_items)
 
     response = client.get(
         "/meta",
@@ -185,7 +199,7 @@ def test_meta_name_lang_cn_uses_chinese_champion_name(monkeypatch):
         }
     ]
 
-    monkeypatch.setattr("app.main.get_cached_meta", lambda role, tier: cached_items)
+    monkeypatch.setattr("app.main.get_cached_meta", lambda role, tier, hero_map: cached_items)
 
     response = client.get(
         "/meta",
@@ -230,13 +244,12 @@ def test_meta_source_reports_hero_map_status(monkeypatch):
 
 
 def test_meta_cn_role_to_position_mapping_for_all_roles(monkeypatch):
-    monkeypatch.setattr("app.main.get_cached_meta", lambda role, tier: None)
-    monkeypatch.setattr("app.main.update_cache", lambda tier, source_url, raw_payload: None)
+    monkeypatch.setattr("app.main.get_cached_meta", lambda role, tier, hero_map: None)
+    monkeypatch.setattr("app.main.update_cache", lambda tier, source_url, raw_payload, hero_map: None)
     monkeypatch.setattr("app.fetch_cn_meta.fetch_hero_map_from_gtimg", lambda: {})
-    monkeypatch.setattr("app.main.fetch_hero_map_from_gtimg", lambda: {})
     monkeypatch.setattr(
-        "app.fetch_cn_meta._request_with_rate_limit",
-        lambda url: _DummyResponse(_cn_payload_positions()),
+        "app.fetch_cn_meta.request_with_rate_limit_async",
+        _awaitable(lambda url, priority: _DummyResponse(_cn_payload_positions())),
     )
 
     expected = {
@@ -260,13 +273,12 @@ def test_meta_cn_role_to_position_mapping_for_all_roles(monkeypatch):
 
 
 def test_meta_cn_support_does_not_return_jungle(monkeypatch):
-    monkeypatch.setattr("app.main.get_cached_meta", lambda role, tier: None)
-    monkeypatch.setattr("app.main.update_cache", lambda tier, source_url, raw_payload: None)
+    monkeypatch.setattr("app.main.get_cached_meta", lambda role, tier, hero_map: None)
+    monkeypatch.setattr("app.main.update_cache", lambda tier, source_url, raw_payload, hero_map: None)
     monkeypatch.setattr("app.fetch_cn_meta.fetch_hero_map_from_gtimg", lambda: {})
-    monkeypatch.setattr("app.main.fetch_hero_map_from_gtimg", lambda: {})
     monkeypatch.setattr(
-        "app.fetch_cn_meta._request_with_rate_limit",
-        lambda url: _DummyResponse(_cn_payload_positions()),
+        "app.fetch_cn_meta.request_with_rate_limit_async",
+        _awaitable(lambda url, priority: _DummyResponse(_cn_payload_positions())),
     )
 
     response = client.get(
@@ -282,10 +294,9 @@ def test_meta_cn_support_does_not_return_jungle(monkeypatch):
 
 
 def test_meta_cn_dedup_by_hero_id_keeps_best_score(monkeypatch):
-    monkeypatch.setattr("app.main.get_cached_meta", lambda role, tier: None)
-    monkeypatch.setattr("app.main.update_cache", lambda tier, source_url, raw_payload: None)
-    monkeypatch.setattr("app.main.fetch_cn_payload", lambda tier: _cn_payload_with_duplicates())
-    monkeypatch.setattr("app.main.fetch_hero_map_from_gtimg", lambda: {})
+    monkeypatch.setattr("app.main.get_cached_meta", lambda role, tier, hero_map: None)
+    monkeypatch.setattr("app.main.update_cache", lambda tier, source_url, raw_payload, hero_map: None)
+    monkeypatch.setattr("app.main.fetch_cn_payload_async", _awaitable(lambda tier: _cn_payload_with_duplicates()))
 
     response = client.get("/meta", params={"role": "top", "tier": "rift_peak", "source": "cn"})
 
@@ -299,13 +310,12 @@ def test_meta_cn_dedup_by_hero_id_keeps_best_score(monkeypatch):
 
 
 def test_cache_filter_per_request_does_not_shift_roles(monkeypatch):
-    monkeypatch.setattr("app.main.get_cached_meta", lambda role, tier: None)
-    monkeypatch.setattr("app.main.fetch_cn_payload", lambda tier: _cn_payload_positions())
-    monkeypatch.setattr("app.main.fetch_hero_map_from_gtimg", lambda: {})
+    monkeypatch.setattr("app.main.get_cached_meta", lambda role, tier, hero_map: None)
+    monkeypatch.setattr("app.main.fetch_cn_payload_async", _awaitable(lambda tier: _cn_payload_positions()))
 
     cached_payload: dict = {}
 
-    def _capture_cache(tier, source_url, raw_payload):
+    def _capture_cache(tier, source_url, raw_payload, hero_map):
         cached_payload["payload"] = raw_payload
 
     monkeypatch.setattr("app.main.update_cache", _capture_cache)
@@ -314,10 +324,10 @@ def test_cache_filter_per_request_does_not_shift_roles(monkeypatch):
     assert response_top.status_code == 200
     assert response_top.json()["items"][0]["hero_id"] == "102"
 
-    monkeypatch.setattr("app.main.fetch_cn_payload", lambda tier: (_ for _ in ()).throw(RuntimeError("should not fetch")))
+    monkeypatch.setattr("app.main.fetch_cn_payload_async", _awaitable(lambda tier: (_ for _ in ()).throw(RuntimeError("should not fetch"))))
     monkeypatch.setattr(
         "app.main.get_cached_meta",
-        lambda role, tier: __import__("app.main", fromlist=["build_cn_rows_from_payload"]).build_cn_rows_from_payload(
+        lambda role, tier, hero_map: __import__("app.main", fromlist=["build_cn_rows_from_payload"]).build_cn_rows_from_payload(
             payload=cached_payload["payload"],
             role=role,
             tier=tier,
@@ -333,10 +343,9 @@ def test_cache_filter_per_request_does_not_shift_roles(monkeypatch):
 
 
 def test_meta_cn_uses_fixed_role_position_mapping_with_named_payload(monkeypatch):
-    monkeypatch.setattr("app.main.get_cached_meta", lambda role, tier: None)
-    monkeypatch.setattr("app.main.update_cache", lambda tier, source_url, raw_payload: None)
-    monkeypatch.setattr("app.main.fetch_cn_payload", lambda tier: _cn_payload_positions_named())
-    monkeypatch.setattr("app.main.fetch_hero_map_from_gtimg", lambda: {})
+    monkeypatch.setattr("app.main.get_cached_meta", lambda role, tier, hero_map: None)
+    monkeypatch.setattr("app.main.update_cache", lambda tier, source_url, raw_payload, hero_map: None)
+    monkeypatch.setattr("app.main.fetch_cn_payload_async", _awaitable(lambda tier: _cn_payload_positions_named()))
 
     expected_champion_by_role = {
         "top": "TOP_HERO",
@@ -355,13 +364,12 @@ def test_meta_cn_uses_fixed_role_position_mapping_with_named_payload(monkeypatch
 
 
 def test_meta_cn_cached_raw_payload_filters_per_request_with_fixed_mapping(monkeypatch):
-    monkeypatch.setattr("app.main.fetch_hero_map_from_gtimg", lambda: {})
-    monkeypatch.setattr("app.main.fetch_cn_payload", lambda tier: _cn_payload_positions_named())
-    monkeypatch.setattr("app.main.get_cached_meta", lambda role, tier: None)
+    monkeypatch.setattr("app.main.fetch_cn_payload_async", _awaitable(lambda tier: _cn_payload_positions_named()))
+    monkeypatch.setattr("app.main.get_cached_meta", lambda role, tier, hero_map: None)
 
     cached_payload: dict = {}
 
-    def _capture_cache(tier, source_url, raw_payload):
+    def _capture_cache(tier, source_url, raw_payload, hero_map):
         cached_payload["payload"] = raw_payload
 
     monkeypatch.setattr("app.main.update_cache", _capture_cache)
@@ -370,10 +378,10 @@ def test_meta_cn_cached_raw_payload_filters_per_request_with_fixed_mapping(monke
     assert top_response.status_code == 200
     assert top_response.json()["items"][0]["champion"] == "TOP_HERO"
 
-    monkeypatch.setattr("app.main.fetch_cn_payload", lambda tier: (_ for _ in ()).throw(RuntimeError("should not fetch")))
+    monkeypatch.setattr("app.main.fetch_cn_payload_async", _awaitable(lambda tier: (_ for _ in ()).throw(RuntimeError("should not fetch"))))
     monkeypatch.setattr(
         "app.main.get_cached_meta",
-        lambda role, tier: __import__("app.main", fromlist=["build_cn_rows_from_payload"]).build_cn_rows_from_payload(
+        lambda role, tier, hero_map: __import__("app.main", fromlist=["build_cn_rows_from_payload"]).build_cn_rows_from_payload(
             payload=cached_payload["payload"],
             role=role,
             tier=tier,
@@ -509,3 +517,656 @@ def test_monkeyking_normalized_to_wukong():
 
     # Cleanup
     client.delete(f"/api/scrims/matches/{match_id}")
+
+
+def test_meta_columnar_format_matches_row_format():
+    params = {"role": "top", "tier": "diamond_plus", "source": "sample"}
+    rows_response = client.get("/meta", params=params)
+    columnar_response = client.get("/meta", params={**params, "format": "columnar"})
+
+    assert rows_response.status_code == 200
+    assert columnar_response.status_code == 200
+    rows = rows_response.json()["items"]
+    table = columnar_response.json()["items"]
+
+    assert table["columns"] == list(rows[0].keys())
+    rebuilt = [dict(zip(table["columns"], values)) for values in zip(*table["values"])]
+    assert rebuilt == rows
+
+
+def test_champion_stats_columnar_format():
+    response = client.get("/api/scrims/champion-stats", params={"format": "columnar"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert set(body) == {"columns", "values"}
+    assert len(body["columns"]) == len(body["values"])
+
+
+def test_meta_returns_msgpack_when_requested():
+    import msgpack
+
+    params = {"role": "top", "tier": "diamond_plus", "source": "sample"}
+    json_response = client.get("/meta", params=params)
+    msgpack_response = client.get("/meta", params=params, headers={"Accept": "application/msgpack"})
+
+    assert msgpack_response.status_code == 200
+    assert msgpack_response.headers["content-type"] == "application/msgpack"
+    assert "Accept" in msgpack_response.headers["vary"]
+    assert msgpack.unpackb(msgpack_response.content) == json_response.json()
+    assert json_response.headers["content-type"] == "application/json"
+
+
+def test_scrim_routes_negotiate_msgpack():
+    import msgpack
+
+    response = client.get("/api/scrims/filters", headers={"Accept": "application/msgpack;q=0.9, application/json;q=0.5"})
+
+    assert response.headers["content-type"] == "application/msgpack"
+    assert set(msgpack.unpackb(response.content)) == {"opponents", "patches"}
+
+
+def test_scrim_requests_reuse_pooled_connections():
+    from app import scrim_db
+
+    client.get("/api/scrims/filters")
+    idle_before = [conn for _, conn in scrim_db._pool._idle]
+    client.get("/api/scrims/filters")
+    idle_after = [conn for _, conn in scrim_db._pool._idle]
+
+    assert idle_before and idle_after == idle_before
+    assert scrim_db._pool.thread_connection() is scrim_db._pool.thread_connection()
+
+
+def test_analytics_routes_use_read_only_pool(tmp_db, make_match):
+    import sqlite3
+
+    from app import scrim_db
+
+    client.get("/api/scrims/stats")
+    readers = [conn for _, conn in scrim_db._readers._idle]
+    assert readers and all(conn not in readers for _, conn in scrim_db._pool._idle)
+    assert readers[0].execute("PRAGMA query_only").fetchone()[0] == 1
+    assert readers[0].execute("PRAGMA cache_size").fetchone()[0] == -scrim_db.READER_CACHE_KIB
+    with pytest.raises(sqlite3.OperationalError):
+        readers[0].execute("DELETE FROM matches")
+    readers[0].rollback()
+
+    # Readers see writes committed through the writer pool.
+    before = client.get("/api/scrims/stats", params={"opponent": "ReaderTeam"}).json()
+    scrim_db.insert_match(make_match(date="2026-01-09", opponent="ReaderTeam", side="red"))
+    after = client.get("/api/scrims/stats", params={"opponent": "ReaderTeam"}).json()
+    assert before["overall"]["total_games"] == 0
+    assert after["overall"]["total_games"] == 1
+    assert client.get("/api/scrims/stats").status_code == 200
+
+
+def test_db_session_rolls_back_failed_request(make_match):
+    from fastapi import Depends, FastAPI
+
+    from app import scrim_db
+
+    session_app = FastAPI(dependencies=[Depends(scrim_db.db_session)])
+
+    @session_app.post("/boom")
+    def boom():
+        scrim_db.insert_match(make_match(date="2026-01-02", opponent="RollbackTeam"))
+        raise RuntimeError("boom")
+
+    with TestClient(session_app, raise_server_exceptions=False) as session_client:
+        assert session_client.post("/boom").status_code == 500
+
+    assert scrim_db.list_matches(opponent="RollbackTeam") == []
+
+
+def test_writes_defer_checkpoint_to_background_thread(tmp_db, make_match):
+    from app import scrim_db
+
+    try:
+        scrim_db.insert_match(make_match(date="2026-01-03", opponent="WalTeam", side="red", result="loss"))
+        assert scrim_db._wal_size() > 0
+        assert scrim_db._checkpointer._thread is not None
+    finally:
+        scrim_db.close_db()
+
+    assert scrim_db._wal_size() == 0
+    assert [m["opponent"] for m in scrim_db.list_matches()] == ["WalTeam"]
+
+
+def test_init_db_records_migrations_once_and_creates_indexes(tmp_db):
+    from app import scrim_db
+
+    scrim_db.init_db()
+
+    with scrim_db._connect() as conn:
+        applied = [row["name"] for row in conn.execute("SELECT name FROM migrations ORDER BY rowid")]
+        indexes = {row["name"] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        plan = " ".join(
+            row["detail"]
+            for row in conn.execute("EXPLAIN QUERY PLAN SELECT * FROM match_players WHERE match_id = 1")
+        )
+
+    assert applied == [name for name, _ in scrim_db._MIGRATIONS]
+    assert {"idx_match_players_match", "idx_bans_match", "idx_matches_date_patch_opponent"} <= indexes
+    assert "idx_match_players_match" in plan
+
+
+def test_list_matches_attaches_players_and_bans_to_their_match(tmp_db, make_match):
+    from app import scrim_db
+
+    first = scrim_db.insert_match(make_match(
+        date="2026-01-01", opponent="A",
+        players=[
+            {"role": "top", "team": "theirs", "champion": "Garen"},
+            {"role": "mid", "team": "ours", "champion": "Ahri"},
+        ],
+        bans=[{"champion": "Zed", "team": "ours", "ban_order": 1}],
+    ))
+    second = scrim_db.insert_match(make_match(
+        date="2026-01-02", opponent="B", players=[{"role": "top", "team": "ours", "champion": "Darius"}],
+    ))
+
+    matches = {m["id"]: m for m in scrim_db.list_matches()}
+
+    assert [p["champion"] for p in matches[first]["players"]] == ["Ahri", "Garen"]
+    assert [b["champion"] for b in matches[first]["bans"]] == ["Zed"]
+    assert [p["champion"] for p in matches[second]["players"]] == ["Darius"]
+    assert matches[second]["bans"] == []
+    assert scrim_db.get_match(first)["players"] == matches[first]["players"]
+
+
+def test_match_list_keyset_pagination(make_match):
+    ids = [
+        client.post("/api/scrims/matches", json=make_match(date=f"2026-02-0{day}", opponent="PagedTeam")).json()["id"]
+        for day in (1, 2, 2, 3, 4)
+    ]
+    try:
+        seen = []
+        cursor = None
+        while True:
+            params = {"opponent": "PagedTeam", "page_size": 2}
+            if cursor:
+                params["cursor"] = cursor
+            page = client.get("/api/scrims/matches", params=params).json()
+            seen.extend(m["id"] for m in page["items"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        unpaged = client.get("/api/scrims/matches", params={"opponent": "PagedTeam"}).json()
+        assert seen == [m["id"] for m in unpaged]
+        assert sorted(seen) == sorted(ids)
+        assert client.get("/api/scrims/matches", params={"cursor": "not-a-cursor"}).status_code == 400
+    finally:
+        for match_id in ids:
+            client.delete(f"/api/scrims/matches/{match_id}")
+
+
+def test_derived_stats_are_stored_on_insert_and_update(tmp_db, make_match):
+    from app import scrim_db
+
+    match = make_match(
+        date="2026-01-05", opponent="DerivedTeam",
+        players=[
+            {"role": "mid", "team": "ours", "champion": "Ahri", "kills": 4, "deaths": 0, "assists": 6,
+             "gold_earned": 12000, "damage_dealt": 30000},
+            {"role": "top", "team": "ours", "champion": "Garen", "kills": 1, "deaths": 2, "assists": 3,
+             "gold_earned": 9000, "damage_dealt": 10000},
+        ],
+    )
+    match_id = scrim_db.insert_match(match)
+
+    stored = scrim_db.get_match(match_id)
+    ahri = next(p for p in stored["players"] if p["champion"] == "Ahri")
+    assert stored["duration_s"] == 1200
+    assert (ahri["gpm"], ahri["kda"], ahri["dmg_share"]) == (600.0, 10.0, 75.0)
+
+    scrim_db.update_match(match_id, {**match, "duration": "30:00"})
+    ahri = next(p for p in scrim_db.get_match(match_id)["players"] if p["champion"] == "Ahri")
+    assert ahri["gpm"] == 400.0
+
+
+def test_summary_tables_track_inserts_updates_and_deletes(tmp_db, make_match):
+    from app import scrim_db
+
+    def match(champion, result, kp):
+        return make_match(
+            date="2026-01-06", opponent="SummaryTeam", result=result, duration="18:30",
+            players=[
+                {"role": "mid", "team": "ours", "champion": champion, "kills": 3, "deaths": 1, "assists": 4,
+                 "kp_percent": kp, "gold_earned": 8000},
+                {"role": "mid", "team": "theirs", "champion": "Zed", "kills": 1, "deaths": 3, "assists": 0},
+            ],
+            bans=[{"champion": "Yasuo", "team": "ours", "ban_order": 1}],
+        )
+
+    def assert_summaries_match_raw_scan():
+        # Any date filter bypasses the summary tables.
+        for func in (scrim_db.get_champion_stats, scrim_db.get_all_champions_by_role, scrim_db.get_role_averages):
+            assert func() == func(date_from="2000-01-01")
+
+    first = scrim_db.insert_match(match("Ahri", "win", 60.0))
+    second = scrim_db.insert_match(match("Ahri", "loss", None))
+    assert_summaries_match_raw_scan()
+
+    scrim_db.update_match(second, match("Lux", "win", 40.0))
+    assert_summaries_match_raw_scan()
+
+    scrim_db.delete_match(first)
+    assert_summaries_match_raw_scan()
+    with scrim_db._connect() as conn:
+        champions = {row["champion"] for row in conn.execute("SELECT champion FROM champion_role_stats")}
+    assert champions == {"Lux", "Zed"}
+
+
+def test_champion_stats_rolls_up_roles_bans_and_presence(tmp_db, make_match):
+    from app import scrim_db
+
+    def match(result, ahri_role, gold):
+        return make_match(
+            date="2026-01-08", opponent="RollupTeam", result=result,
+            players=[
+                {"role": ahri_role, "team": "ours", "champion": "Ahri", "kills": 2, "deaths": 1, "assists": 2,
+                 "gold_earned": gold},
+                {"role": "mid", "team": "theirs", "champion": "Zed", "kills": 1, "deaths": 2, "assists": 0},
+            ],
+            bans=[{"champion": "Ahri", "team": "theirs", "ban_order": 1},
+                  {"champion": "Yasuo", "team": "ours", "ban_order": 1}],
+        )
+
+    scrim_db.insert_match(match("win", "mid", 12000))
+    scrim_db.insert_match(match("loss", "mid", 8000))
+    scrim_db.insert_match(match("win", "top", None))
+    scrim_db.insert_match(make_match(date="2026-01-08", opponent="RollupTeam"))
+
+    stats = scrim_db.get_champion_stats()
+    assert [c["champion"] for c in stats] == ["Ahri", "Zed"]  # ban-only Yasuo is left out
+    ahri = stats[0]
+    assert (ahri["total_games"], ahri["total_wins"], ahri["our_picks"], ahri["their_picks"]) == (3, 2, 3, 0)
+    assert (ahri["our_bans"], ahri["their_bans"]) == (0, 3)
+    assert ahri["presence"] == 150.0  # (3 picks + 3 bans) / 4 matches
+    assert ahri["winrate"] == 66.7
+    assert ahri["avg_gpm"] == 500  # only the mid games have gold
+    assert list(ahri["by_role"]) == ["ours_mid", "ours_top"]
+    assert ahri["by_role"]["ours_mid"] == {
+        "games": 2, "wins": 1, "winrate": 50.0,
+        "avg_kills": 2.0, "avg_deaths": 1.0, "avg_assists": 2.0, "avg_kp": None,
+    }
+    assert stats == scrim_db.get_champion_stats(date_from="2000-01-01")
+
+
+def test_search_finds_notes_opponents_and_champions(tmp_db, make_match):
+    from app import scrim_db
+
+    match = make_match(
+        date="2026-01-10", opponent="Dive Kings", result="loss",
+        notes="Perdemos para a comp de dive <Zed>. Próxima vez banir Akali.",
+        players=[{"role": "mid", "team": "theirs", "champion": "Zed"}],
+    )
+    match_id = scrim_db.insert_match(match)
+    scrim_db.import_matches([[{**match, "opponent": "Calm Team", "notes": "Controle de visão", "players": [
+        {"role": "mid", "team": "theirs", "champion": "Ahri"},
+        {"role": "top", "team": "ours", "champion": "Garen"},
+    ]}]])
+
+    response = client.get("/api/scrims/search", params={"q": "dive"})
+    assert response.status_code == 200
+    [hit] = response.json()
+    assert hit["id"] == match_id
+    assert hit["opponent"] == "<mark>Dive</mark> Kings"
+    assert "comp de <mark>dive</mark> &lt;Zed&gt;" in hit["notes"]
+    assert [r["id"] for r in scrim_db.search_matches("proxima ak")] == [match_id]  # accents, prefix
+    assert [r["champions"] for r in scrim_db.search_matches("garen")] == ["Ahri <mark>Garen</mark>"]
+    assert scrim_db.search_matches('"dive" OR (') == []
+    assert client.get("/api/scrims/search", params={"q": ""}).status_code == 422
+
+    scrim_db.update_match(match_id, {**match, "notes": None, "players": [{"role": "mid", "team": "theirs", "champion": "Lux"}]})
+    assert [r["id"] for r in scrim_db.search_matches("lux")] == [match_id]
+    assert scrim_db.search_matches("zed") == []
+    scrim_db.delete_match(match_id)
+    assert scrim_db.search_matches("dive") == []
+
+
+def test_stat_distributions_track_inserts_updates_and_deletes(tmp_db, make_match):
+    from app import scrim_db
+
+    def match(kills, gold, patch="7.0e"):
+        return make_match(
+            patch=patch, date="2026-01-11", opponent="SketchTeam",
+            players=[{"role": "mid", "team": "ours", "champion": "Ahri", "kills": kills, "deaths": 2,
+                      "gold_earned": gold, "damage_dealt": 1000 * kills}],
+        )
+
+    ids = [scrim_db.insert_match(match(k, 9000 + 100 * k, patch)) for k, patch in
+           [(1, "7.0e"), (3, "7.0e"), (20, "7.0f"), (4, "7.0f"), (6, "7.0f")]]
+    [ahri] = scrim_db.get_stat_distributions()
+    assert ahri["games"] == 5
+    assert ahri["kills"] == {"p25": 3, "median": 4, "p75": 6, "p90": 6}  # the 20-kill stomp only moves p100
+    assert ahri["deaths"]["median"] == 2
+    assert ahri["damage_taken"] == {"p25": None, "median": None, "p75": None, "p90": None}
+    assert abs(ahri["gold_earned"]["median"] - 9400) <= 94
+    assert scrim_db.get_stat_distributions(patch="7.0e")[0]["kills"]["p90"] == 1
+
+    scrim_db.update_match(ids[2], match(5, 9500, "7.0f"))
+    scrim_db.delete_match(ids[0])
+    distributions = scrim_db.get_stat_distributions()
+    # Sketches kept up to date by the writes match sketches built from the raw rows.
+    assert distributions == scrim_db.get_stat_distributions(date_from="2000-01-01")
+    assert distributions[0]["games"] == 4 and distributions[0]["kills"]["median"] == 4
+
+    response = client.get("/api/scrims/distributions", params={"champion": "Ahri", "format": "columnar"})
+    assert response.status_code == 200
+    assert response.json()["columns"][:4] == ["champion", "team", "role", "games"]
+    for match_id in ids[1:]:
+        scrim_db.delete_match(match_id)
+    with scrim_db._connect() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM champion_role_sketches").fetchone()[0] == 0
+
+
+def test_form_rolls_last_games_per_role_champion_and_opponent(tmp_db, make_match):
+    from app import scrim_db
+
+    results = ["win", "loss", "loss", "win", "win", "win", "loss", "win"]
+    for day, result in enumerate(results, start=1):
+        scrim_db.insert_match(make_match(
+            date=f"2026-02-{day:02d}", opponent="FormA" if day % 2 else "FormB", result=result,
+            players=[
+                {"role": "mid", "team": "ours", "champion": "Ahri" if day < 6 else "Lux", "kills": day, "deaths": 2,
+                 "assists": 1},
+                {"role": "top", "team": "ours", "champion": "Garen", "kills": 1, "deaths": 1, "assists": 1},
+            ],
+        ))
+    # Moving a match to another date moves it in every window.
+    match_id = scrim_db.list_matches(date_from="2026-02-01", date_to="2026-02-01")[0]["id"]
+    moved = scrim_db.get_match(match_id)
+    scrim_db.update_match(match_id, {**moved, "date": "2026-02-09"})
+    wins = [r == "win" for r in results[1:] + results[:1]]  # chronological after the move
+
+    mid = next(r for r in scrim_db.get_form(window=3, points=4) if r["role"] == "mid")
+    assert (mid["games"], mid["window_games"], mid["winrate"]) == (8, 3, 62.5)
+    assert mid["form"]["winrate"] == round(sum(wins[-3:]) / 3 * 100, 1)
+    assert mid["form"]["kills"] == round((7 + 8 + 1) / 3, 1)
+    assert mid["form"]["kda"] == round((7 + 8 + 1 + 3) / 6, 2)
+    assert mid["series"]["dates"] == ["2026-02-06", "2026-02-07", "2026-02-08", "2026-02-09"]
+    assert mid["series"]["results"] == [int(w) for w in wins[-4:]]
+    assert mid["series"]["winrate"] == [round(sum(wins[i - 2:i + 1]) / 3 * 100, 1) for i in range(4, 8)]
+
+    champions = scrim_db.get_form(by="champion", window=10, points=2, role="mid")
+    assert [(r["champion"], r["games"], r["series"]["dates"]) for r in champions] == [
+        ("Ahri", 5, ["2026-02-05", "2026-02-09"]), ("Lux", 3, ["2026-02-07", "2026-02-08"]),
+    ]
+    opponents = scrim_db.get_form(by="opponent", window=2, points=1)
+    assert {r["opponent"]: r["games"] for r in opponents} == {"FormA": 4, "FormB": 4}
+    assert all(len(r["series"]["dates"]) == 1 and r["window_games"] == 2 for r in opponents)
+
+    response = client.get("/api/scrims/form", params={"by": "opponent", "window": 2, "points": 1})
+    assert response.status_code == 200 and response.json() == opponents
+    assert client.get("/api/scrims/form", params={"by": "patch"}).status_code == 422
+
+
+def test_update_match_writes_only_the_diff(tmp_db, make_match):
+    from app import scrim_db
+
+    match = make_match(
+        date="2026-01-07", opponent="DiffTeam",
+        players=[
+            {"role": "mid", "team": "ours", "champion": "Ahri", "kills": 4, "deaths": 1, "assists": 6},
+            {"role": "top", "team": "ours", "champion": "Garen", "kills": 1, "deaths": 2, "assists": 3},
+            {"role": "mid", "team": "theirs", "champion": "Zed", "kills": 1, "deaths": 4, "assists": 0},
+        ],
+        bans=[
+            {"champion": "Yasuo", "team": "ours", "ban_order": 1},
+            {"champion": "Lux", "team": "theirs", "ban_order": 1},
+        ],
+    )
+    match_id = scrim_db.insert_match(match)
+    with scrim_db._connect() as conn:
+        ids_before = {(r["team"], r["role"]): r["id"] for r in conn.execute("SELECT * FROM match_players")}
+    version = scrim_db._data_version
+
+    unchanged = scrim_db.update_match(match_id, match)
+    assert unchanged["changed"] is False and scrim_db._data_version == version
+
+    edited = {
+        **match,
+        "notes": "fixed kills",
+        "players": [
+            {**match["players"][0], "kills": 5},
+            match["players"][2],
+            {"role": "jungle", "team": "ours", "champion": "Lee Sin", "kills": 0, "deaths": 0, "assists": 2},
+        ],
+        "bans": [match["bans"][0], {"champion": "Ezreal", "team": "theirs", "ban_order": 1}],
+    }
+    changes = scrim_db.update_match(match_id, edited)
+
+    assert changes["changed"] is True
+    assert changes["match"] == ["notes"]
+    assert changes["players"]["updated"] == [{"team": "ours", "role": "mid", "fields": ["kills", "kda"]}]
+    assert changes["players"]["inserted"] == [{"team": "ours", "role": "jungle"}]
+    assert changes["players"]["deleted"] == [{"team": "ours", "role": "top"}]
+    assert changes["bans"]["updated"] == [{"team": "theirs", "ban_order": 1, "fields": ["champion"]}]
+    with scrim_db._connect() as conn:
+        ids_after = {(r["team"], r["role"]): r["id"] for r in conn.execute("SELECT * FROM match_players")}
+    assert ids_after[("ours", "mid")] == ids_before[("ours", "mid")]
+    assert ids_after[("theirs", "mid")] == ids_before[("theirs", "mid")]
+    for func in (scrim_db.get_champion_stats, scrim_db.get_all_champions_by_role, scrim_db.get_pick_priority):
+        assert func() == func(date_from="2000-01-01")
+
+    assert scrim_db.update_match(match_id + 1, edited) is None
+
+
+def test_mvp_svp_by_role_breaks_award_ties_by_role(tmp_db, make_match):
+    from app import scrim_db
+
+    scrim_db.insert_match(make_match(
+        date="2026-01-10", opponent="TieTeam",
+        players=[
+            {"role": role, "team": "ours", "champion": f"Champ{i}", "is_mvp": role == "support", "is_svp": role == "mid"}
+            for i, role in enumerate(["support", "top", "mid", "jungle", "bot"])
+        ],
+    ))
+
+    for filters in ({}, {"date_from": "2000-01-01"}):
+        by_role = scrim_db.get_mvp_svp_summary(**filters)["by_role"]
+        assert [row["role"] for row in by_role] == ["mid", "support", "bot", "jungle", "top"]
+
+
+def test_dashboard_bundles_requested_sections():
+    params = {"opponent": "TestTeam", "date_from": "2026-01-01"}
+    response = client.get("/api/scrims/dashboard", params={**params, "sections": "stats,mvp_svp,enemy_champions_general"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert list(body) == ["stats", "mvp_svp", "enemy_champions_general"]
+    assert body["stats"] == client.get("/api/scrims/stats", params=params).json()
+    assert body["mvp_svp"] == client.get("/api/scrims/mvp-svp", params=params).json()
+    assert client.get("/api/scrims/dashboard", params={"sections": "nope"}).status_code == 400
+
+
+def test_dashboard_fetches_openseries_outside_the_read_transaction(monkeypatch):
+    from app import scrim_db
+
+    seen: dict = {}
+
+    def fake_openseries():
+        conn = scrim_db._session_conn.get()
+        seen["in_transaction"] = conn is not None and conn.in_transaction
+        return [{"champion": "Ahri"}]
+
+    monkeypatch.setattr("app.fetch_openseries.get_openseries_data", fake_openseries)
+    response = client.get("/api/scrims/dashboard", params={"sections": "stats,openseries_champions"})
+
+    assert response.status_code == 200
+    assert response.json()["openseries_champions"] == [{"champion": "Ahri"}]
+    assert seen == {"in_transaction": False}
+
+
+def test_query_cache_evicts_least_recently_used_within_byte_cap():
+    from app.query_cache import MISSING, QueryCache
+
+    cache = QueryCache(max_bytes=400)
+    cache.put(("f", 1), "a" * 150)
+    cache.put(("f", 2), "b" * 150)
+    assert cache.get(("f", 1)) == "a" * 150
+    cache.put(("g", 3), "c" * 150)
+
+    assert cache.get(("f", 2)) is MISSING
+    assert cache.get(("f", 1)) == "a" * 150
+    stats = cache.stats()
+    assert stats["bytes"] <= 400
+    assert stats["functions"]["f"] == {"hits": 2, "misses": 1, "evictions": 1, "hit_rate": 0.667}
+
+
+def test_aggregates_are_cached_until_a_write(tmp_db, make_match):
+    from app import scrim_db
+
+    match = make_match(date="2026-01-07", opponent="CacheTeam", players=[{"role": "mid", "team": "ours", "champion": "Ahri"}])
+    scrim_db.insert_match(match)
+
+    def hits():
+        return scrim_db.cache_stats()["functions"]["get_champion_stats"]["hits"]
+
+    first = scrim_db.get_champion_stats(opponent="CacheTeam")
+    before = hits()
+    assert scrim_db.get_champion_stats(opponent="CacheTeam", patch="") == first
+    assert hits() == before + 1
+
+    scrim_db.insert_match(match)
+    assert scrim_db.get_champion_stats(opponent="CacheTeam")[0]["total_games"] == 2
+    assert hits() == before + 1
+
+
+def test_cache_key_only_folds_empty_strings_into_none():
+    from app import scrim_db
+
+    calls = []
+
+    @scrim_db._cached
+    def cache_key_probe(value=None):
+        calls.append(value)
+        return value
+
+    assert cache_key_probe(0) == 0
+    assert cache_key_probe(None) is None
+    assert cache_key_probe("") is None
+    assert calls == [0, None]
+
+
+def test_bulk_import_ndjson_and_csv_reports_row_errors(make_match):
+    import csv
+    import io
+
+    def match(day):
+        return make_match(
+            date=f"2026-03-{day:02d}", opponent="ImportTeam", side="red", result="loss", duration="21:10",
+            players=[{"role": "mid", "team": "ours", "champion": "MonkeyKing", "kills": 2}],
+            bans=[{"champion": "Zed", "team": "theirs", "ban_order": 1}],
+        )
+
+    ndjson = "\n".join([json.dumps(match(1)), "{not json", json.dumps({**match(2), "side": "green"}), json.dumps(match(3))])
+    csv_buffer = io.StringIO()
+    writer = csv.writer(csv_buffer)
+    writer.writerow(["patch", "date", "opponent", "side", "result", "duration", "notes", "players", "bans"])
+    m = match(4)
+    writer.writerow([m["patch"], m["date"], m["opponent"], m["side"], m["result"], m["duration"], "",
+                     json.dumps(m["players"]), json.dumps(m["bans"])])
+
+    try:
+        ndjson_report = client.post("/api/scrims/import", files={"file": ("scrims.ndjson", ndjson.encode())}).json()
+        csv_report = client.post("/api/scrims/import", files={"file": ("scrims.csv", csv_buffer.getvalue().encode())}).json()
+
+        assert ndjson_report["imported"] == 2
+        assert [error["line"] for error in ndjson_report["errors"]] == [2, 3]
+        assert "side" in ndjson_report["errors"][1]["error"]
+        assert csv_report["imported"] == 1 and csv_report["failed"] == 0
+
+        imported = client.get("/api/scrims/matches", params={"opponent": "ImportTeam"}).json()
+        assert [m["date"] for m in imported] == ["2026-03-04", "2026-03-03", "2026-03-01"]
+        assert all(m["players"][0]["champion"] == "Wukong" for m in imported)
+        assert all(m["bans"][0]["champion"] == "Zed" for m in imported)
+        summary = client.get("/api/scrims/champion-stats", params={"opponent": "ImportTeam"}).json()
+        raw_scan = client.get("/api/scrims/champion-stats", params={"opponent": "ImportTeam", "date_from": "2000-01-01"}).json()
+        assert summary == raw_scan
+    finally:
+        for m in client.get("/api/scrims/matches", params={"opponent": "ImportTeam"}).json():
+            client.delete(f"/api/scrims/matches/{m['id']}")
+
+
+def test_csv_import_reports_extra_fields_and_database_rejections(tmp_db):
+    import csv
+    import io
+    import sqlite3
+
+    from app import scrim_db
+
+    with sqlite3.connect(tmp_db) as conn:
+        conn.execute(
+            """CREATE TRIGGER reject_ban BEFORE INSERT ON bans WHEN NEW.champion = 'Forbidden'
+               BEGIN SELECT RAISE(ABORT, 'forbidden ban'); END"""
+        )
+
+    def row(day, ban="Zed"):
+        players = [{"role": "mid", "team": "ours", "champion": "Ahri"}]
+        bans = [{"champion": ban, "team": "theirs", "ban_order": 1}]
+        return ["7.0e", f"2026-05-{day:02d}", "RejectTeam", "blue", "win", "", "", json.dumps(players), json.dumps(bans)]
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["patch", "date", "opponent", "side", "result", "duration", "notes", "players", "bans"])
+    writer.writerows([row(1), [*row(2), "stray"], row(3, ban="Forbidden"), row(4)])
+
+    response = client.post("/api/scrims/import", files={"file": ("scrims.csv", buffer.getvalue().encode())})
+
+    assert response.status_code == 200
+    report = response.json()
+    assert report["imported"] == 2
+    assert [error["line"] for error in report["errors"]] == [3, 4]
+    assert "more field" in report["errors"][0]["error"]
+    assert "forbidden ban" in report["errors"][1]["error"]
+    assert [m["date"] for m in scrim_db.list_matches(opponent="RejectTeam")] == ["2026-05-04", "2026-05-01"]
+    assert scrim_db.get_champion_stats(opponent="RejectTeam")[0]["total_games"] == 2
+
+
+def test_export_streams_filtered_history_that_reimports(make_match):
+    from app import scrim_db
+
+    match = make_match(
+        date="2026-04-01", opponent="ExportTeam", duration="15:00", notes="line one, \"quoted\"",
+        players=[{"role": "support", "team": "ours", "champion": "Lulu", "assists": 12}],
+        bans=[{"champion": "Zed", "team": "ours", "ban_order": 1}],
+    )
+    match_id = scrim_db.insert_match(match)
+    try:
+        ndjson = client.get("/api/scrims/export", params={"opponent": "ExportTeam"})
+        assert ndjson.headers["content-type"] == "application/x-ndjson"
+        lines = ndjson.text.splitlines()
+        assert [json.loads(line) for line in lines] == scrim_db.list_matches(opponent="ExportTeam")
+
+        exported_csv = client.get("/api/scrims/export", params={"opponent": "ExportTeam", "format": "csv"}).content
+        scrim_db.delete_match(match_id)
+        report = client.post("/api/scrims/import", files={"file": ("scrims.csv", exported_csv)}).json()
+        assert report["imported"] == 1 and report["errors"] == []
+
+        reimported = scrim_db.list_matches(opponent="ExportTeam")[0]
+        match_id = reimported["id"]
+        assert reimported["notes"] == match["notes"]
+        assert reimported["players"][0]["assists"] == 12
+    finally:
+        scrim_db.delete_match(match_id)
+
+
+def test_find_teams_by_players_uses_roster_index(tmp_db):
+    from app import scrim_db
+
+    scrim_db.upsert_team_roster("Alpha", ["Dokja#123", "Shadow", "Ky"])
+    scrim_db.upsert_team_roster("Beta", ["ShadowKing", "Lumen#9"])
+
+    # Tag-stripped, substring in both directions, and too-short partials ignored.
+    assert scrim_db.find_teams_by_players(["dokja", "Shadow", "K"]) == [("Alpha", 2), ("Beta", 1)]
+    assert scrim_db.find_teams_by_players(["lumen#9", "shadowking"]) == [("Beta", 2), ("Alpha", 1)]
+    index = scrim_db._get_roster_index()
+    assert scrim_db._get_roster_index() is index
+
+    scrim_db.upsert_team_roster("Alpha", ["Other"])
+    assert scrim_db._get_roster_index() is not index
+    assert scrim_db.find_teams_by_players(["dokja"]) == []
@@ -0,0 +1,53 @@
+import random
+
+from app.quantile_sketch import RELATIVE_ACCURACY, QuantileSketch
+
+
+def _exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+def test_quantiles_are_within_relative_accuracy():
+    rnd = random.Random(3)
+    values = [rnd.lognormvariate(9, 1) for _ in range(5000)] + [0.0] * 200
+    sketch = QuantileSketch()
+    sketch.update(values)
+
+    for q in (0.0, 0.01, 0.25, 0.5, 0.75, 0.9, 0.99, 1.0):
+        expected = _exact_quantile(values, q)
+        assert abs(sketch.quantile(q) - expected) <= RELATIVE_ACCURACY * expected
+    assert sketch.quantiles([0.25, 0.5, 0.9]) == [sketch.quantile(0.25), sketch.quantile(0.5), sketch.quantile(0.9)]
+    assert QuantileSketch().quantile(0.5) is None
+
+
+def test_small_integers_round_back_exactly():
+    sketch = QuantileSketch()
+    sketch.update([0, 1, 2, 3, 4, 5, 8, 13, 21, 34, 49])
+    assert [round(sketch.quantile(q)) for q in (0, 0.5, 0.9, 1)] == [0, 5, 34, 49]
+
+
+def test_merge_and_removal_are_exact():
+    left, right, both = QuantileSketch(), QuantileSketch(), QuantileSketch()
+    left.update([1, 5, 5, 300, None])
+    right.update([0, 7, 12000])
+    both.update([1, 5, 5, 300, 0, 7, 12000])
+
+    left.merge(right)
+    assert (left.bins, left.zero_count) == (both.bins, both.zero_count)
+
+    left.update([7, 12000], weight=-1)
+    left.add(0, weight=-1)
+    assert left.count == 4 and left.zero_count == 0
+    assert left.quantile(1.0) == QuantileSketch.from_bytes(left.to_bytes()).quantile(1.0)
+
+
+def test_bytes_round_trip_is_compact():
+    sketch = QuantileSketch()
+    sketch.update(range(0, 40000, 7))
+    data = sketch.to_bytes()
+
+    decoded = QuantileSketch.from_bytes(data)
+    assert (decoded.bins, decoded.zero_count) == (sketch.bins, sketch.zero_count)
+    assert len(data) < 3 * len(sketch.bins) + 8
+    assert QuantileSketch.from_bytes(None).count == 0